@@ -0,0 +1,75 @@
+"""
+Compares the binary data file with the pickles it replaced: save and load times and file sizes.
+
+    python -m benchmarks.bench_format --sizes 10000,100000 --notes-ratio 0.1
+"""
+import argparse
+import os
+import pickle
+import tempfile
+import time
+
+from benchmarks.datagen import make_address_book, make_note_book
+from src.utils.binary_format import dump_books, load_books
+
+
+def best_of(func, repeat: int) -> float:
+    """
+    Returns the shortest time func took over repeat calls, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_size(size: int, notes: int, repeat: int, directory: str) -> dict:
+    address_book, note_book = make_address_book(size), make_note_book(notes)
+    pickled, binary = os.path.join(directory, "data.pickle"), os.path.join(directory, "data.bin")
+
+    def save_pickle():
+        with open(pickled, "wb") as f:
+            pickle.dump((address_book, note_book), f)
+
+    def save_binary():
+        with open(binary, "wb") as f:
+            f.write(dump_books(address_book, note_book))
+
+    def load_pickle():
+        with open(pickled, "rb") as f:
+            pickle.load(f)
+
+    return {
+        "save_pickle": best_of(save_pickle, repeat),
+        "save_binary": best_of(save_binary, repeat),
+        "load_pickle": best_of(load_pickle, repeat),
+        "load_binary": best_of(lambda: load_books(binary), repeat),
+        "load_contacts": best_of(lambda: load_books(binary, ("contacts",)), repeat),
+        "size_pickle": os.path.getsize(pickled),
+        "size_binary": os.path.getsize(binary),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated numbers of contacts")
+    parser.add_argument("--notes-ratio", type=float, default=0.1, help="notes per contact")
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args(argv)
+
+    print(f"{'contacts':>9} {'save pickle':>12} {'binary':>8} {'load pickle':>12} {'binary':>8} "
+          f"{'contacts only':>14} {'size pickle':>12} {'binary':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(size) for size in options.sizes.split(",")):
+            result = bench_size(size, int(size * options.notes_ratio), options.repeat, directory)
+            print(
+                f"{size:>9} {result['save_pickle']:>11.3f}s {result['save_binary']:>7.3f}s "
+                f"{result['load_pickle']:>11.3f}s {result['load_binary']:>7.3f}s {result['load_contacts']:>13.3f}s "
+                f"{result['size_pickle'] / 1e6:>10.1f}MB {result['size_binary'] / 1e6:>8.1f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
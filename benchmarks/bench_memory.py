@@ -0,0 +1,49 @@
+"""
+Measures how much memory contacts and notes take once they are loaded.
+
+Builds an AddressBook and a NoteBook from the seeded generator and reports the bytes
+allocated per contact and per note, as counted by tracemalloc, including the indexes
+the books keep.
+
+    python -m benchmarks.bench_memory --sizes 100000,1000000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.datagen import make_address_book, make_note_book
+
+
+def allocated_bytes(build, count: int) -> int:
+    """
+    Returns the bytes still allocated after build(count), and keeps nothing alive.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        book = build(count)
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del book
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100000,1000000", help="comma separated entry counts")
+    options = parser.parse_args(argv)
+
+    make_address_book(5000)  # imports and fills the address parse cache outside the measurement
+    for count in (int(size) for size in options.sizes.split(",")):
+        contacts = allocated_bytes(make_address_book, count)
+        notes = allocated_bytes(make_note_book, count)
+        print(
+            f"{count:>9,} entries: {contacts / count:8.0f} bytes per contact ({contacts / 2 ** 20:7.1f} MiB), "
+            f"{notes / count:8.0f} bytes per note ({notes / 2 ** 20:7.1f} MiB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
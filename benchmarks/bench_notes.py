@@ -0,0 +1,41 @@
+"""
+Compares ranked note search through the inverted index with a substring scan of every note.
+
+    python -m benchmarks.bench_notes --size 20000 --words 400
+"""
+import argparse
+import time
+from benchmarks.datagen import make_note_book
+
+QUERIES = ["budget", "flight hotel", "gym", "quarterly", "insur"]
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=20_000, help="number of notes")
+    parser.add_argument("--words", type=int, default=400, help="words per note")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    book = make_note_book(options.size, words=options.words)
+    print(f"built and indexed {len(book)} notes in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'query':<16}{'index ms':>10}{'scan ms':>10}")
+    for query in QUERIES:
+        indexed, _ = best_of(lambda: book.search(query), options.repeat)
+        scanned, _ = best_of(lambda: book._substring_search(query, book.data.values()), options.repeat)
+        print(f"{query!r:<16}{indexed * 1000:>10.2f}{scanned * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares contact search through the trigram and typo indexes with a full scan of the book.
+
+    python -m benchmarks.bench_search --size 500000
+"""
+import argparse
+import time
+from benchmarks.datagen import make_address_book
+
+QUERIES = ["Smith", "john", "olena boyko", "ez12", "nobody here", "an", "7"]
+TYPOS = ["Jhon", "Shevchneko", "Smiht123", "Kovalneko45", "Olena Boyk"]
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def linear_find_similar(book, name, max_distance=2):
+    # Every query word against every word of every name, as find_similar would without its index
+    from src.models.fuzzy_index import allowed_typos
+
+    matches = []
+    for record in book.data.values():
+        words = record.name.value.lower().split()
+        total = 0
+        for query_word in set(name.lower().split()):
+            limit = allowed_typos(query_word, max_distance)
+            distances = [levenshtein(query_word, word) for word in words if abs(len(word) - len(query_word)) <= limit]
+            total += min([d for d in distances if d <= limit], default=max_distance + 1)
+        if total <= max_distance:
+            matches.append((total, record.name.value))
+    return sorted(matches)
+
+
+def linear_find_all(book, name):
+    # The scan find_all did before the trigram index
+    matching = [record for record in book.data.values() if name.lower() in record.name.value.lower()]
+    matching.sort(key=lambda x: x.name.value)
+    return matching
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=500_000, help="number of contacts")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    book = make_address_book(options.size)
+    print(f"built {len(book)} contacts in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'query':<14}{'matches':>9}{'index ms':>11}{'scan ms':>11}")
+    for query in QUERIES:
+        indexed, result = best_of(lambda: book.find_all(query), options.repeat)
+        scanned, expected = best_of(lambda: linear_find_all(book, query), options.repeat)
+        assert [r.name.value for r in result] == [r.name.value for r in expected]
+        print(f"{query!r:<14}{len(result):>9}{indexed * 1000:>11.2f}{scanned * 1000:>11.2f}")
+
+    start = time.perf_counter()
+    book.find_similar("")
+    print(f"built the typo index in {time.perf_counter() - start:.1f}s")
+    print(f"{'typo':<14}{'matches':>9}{'index ms':>11}{'scan ms':>11}")
+    for query in TYPOS:
+        indexed, result = best_of(lambda: book.find_similar(query), options.repeat)
+        scanned, expected = best_of(lambda: linear_find_similar(book, query), 1)
+        assert [(d, r.name.value) for d, r in result] == expected
+        print(f"{query!r:<14}{len(result):>9}{indexed * 1000:>11.2f}{scanned * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load generator for the server mode: many clients sending a mix of reads and writes.
+
+    python -m benchmarks.bench_server --size 100000 --clients 32 --requests 500
+
+Without --address, a server is started on seeded data in a temporary directory and
+stopped at the end; with it, the requests go to a server that is already running.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from benchmarks.datagen import make_address_book, make_note_book, make_name
+from src.utils.metrics import Histogram
+
+READS = ["search {name}", "phone --name {name}", "birthdays 7", "search-notes {word}", "get-note {note_id}"]
+WRITES = ["add {new_name} 0123456789", "add-note-tag --id {note_id} --tag {word}"]
+
+
+def make_requests(rng, count, write_ratio, size, note_count):
+    from benchmarks.datagen import WORDS
+
+    book_rng = random.Random(42)
+    names = [make_name(book_rng, index) for index in range(min(size, 1000))]  # names in the seeded book
+    requests = []
+    for _ in range(count):
+        template = rng.choice(WRITES if rng.random() < write_ratio else READS)
+        requests.append(template.format(
+            name=rng.choice(names),
+            new_name=f"Load{rng.randrange(10 ** 9)}",
+            word=rng.choice(WORDS),
+            note_id=rng.randint(1, max(note_count, 1)),
+        ))
+    return requests
+
+
+async def client(address, requests, histogram):
+    from src.cli.server import parse_address
+
+    kind, *where = parse_address(address)
+    if kind == "unix":
+        reader, writer = await asyncio.open_unix_connection(where[0], limit=1 << 24)
+    else:
+        reader, writer = await asyncio.open_connection(*where, limit=1 << 24)
+    errors = 0
+    for request_id, line in enumerate(requests):
+        start = time.perf_counter()
+        writer.write(json.dumps({"id": request_id, "line": line}).encode() + b"\n")
+        await writer.drain()
+        answer = json.loads(await reader.readline())
+        histogram.add(time.perf_counter() - start)
+        errors += not answer["ok"]
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def generate_load(address, clients, per_client, write_ratio, size, note_count, seed):
+    rng = random.Random(seed)
+    histogram = Histogram()
+    loads = [make_requests(rng, per_client, write_ratio, size, note_count) for _ in range(clients)]
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(client(address, requests, histogram) for requests in loads))
+    return time.perf_counter() - start, histogram, sum(errors)
+
+
+def start_server(directory, size, notes):
+    from src.utils.data_handler import save_data
+
+    save_data((make_address_book(size), make_note_book(notes)), os.path.join(directory, "data.pkl"))
+    address = os.path.join(directory, "bot.sock")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(
+        [sys.executable, "-c", "from src.cli.interface import main; main()", "--serve", address],
+        cwd=directory,
+        env={**os.environ, "PYTHONPATH": root},
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 600
+    while not os.path.exists(address):
+        if server.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("The server did not start.")
+        time.sleep(0.05)
+    return server, address
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--address", help="a running server, host:port or the path of its socket")
+    parser.add_argument("--size", type=int, default=10_000, help="contacts in the seeded book")
+    parser.add_argument("--notes", type=int, default=1_000, help="notes in the seeded book")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="requests sent by each client")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="share of the requests that change the books")
+    parser.add_argument("--seed", type=int, default=1)
+    options = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = None
+        address = options.address
+        if address is None:
+            start = time.perf_counter()
+            server, address = start_server(directory, options.size, options.notes)
+            print(f"started a server on {options.size} contacts in {time.perf_counter() - start:.1f}s")
+        try:
+            elapsed, histogram, errors = asyncio.run(generate_load(
+                address, options.clients, options.requests, options.write_ratio, options.size, options.notes, options.seed
+            ))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+    latency = histogram.to_dict()
+    print(
+        f"{histogram.count} requests from {options.clients} clients in {elapsed:.2f}s: "
+        f"{histogram.count / elapsed:.0f} requests/s, {errors} errors"
+    )
+    print(f"latency ms: p50 {latency['p50_ms']:.2f}  p95 {latency['p95_ms']:.2f}  p99 {latency['p99_ms']:.2f}  max {latency['max_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Measures how loading and saving the books scales with the number of shards and of worker processes.
+
+    python -m benchmarks.bench_shards --size 1000000 --shards 1,4,8 --workers 1,2,4,8
+
+For every number of shards, the seeded books are saved once, then loaded with every
+number of workers; "save all" writes every shard and "save one" folds a journal holding
+a single change, which only writes the shard of the changed contact. The workers only
+read, decode and write the files: building the records and indexes of a loaded book is
+done in this process whatever their number. The first load with a number of workers
+also starts their processes, which are then kept for the saves, as in the bot.
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.datagen import make_address_book, make_note_book
+from src.utils import shards
+from src.utils.data_handler import flush_data, load_data, open_data, save_data
+
+
+def best_of(func, repeat: int) -> float:
+    """
+    Returns the shortest time func took over repeat calls, in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def save_one(filename):
+    address_book, note_book, journal = open_data(filename, sections=("contacts",))
+    record = next(iter(address_book.data.values()))
+    record.add_phone("0987654321")
+    start = time.perf_counter()
+    flush_data((address_book, note_book), filename, journal, compact_every=0)
+    elapsed = time.perf_counter() - start
+    record.delete_phone("0987654321")
+    journal.close()
+    save_data((address_book, None), filename)
+    return elapsed
+
+
+def bench_shards(books, count, workers, repeat, directory) -> list:
+    filename = os.path.join(directory, f"data-{count}.pkl")
+    shards.SHARDS = count
+    save_data(books, filename)
+    rows = []
+    for worker_count in workers:
+        shards.WORKERS = worker_count
+        rows.append({
+            "workers": worker_count,
+            "load": best_of(lambda: load_data(filename), repeat),
+            "save_all": best_of(lambda: save_data(books, filename), repeat),
+            "save_one": min(save_one(filename) for _ in range(repeat)),
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000, help="contacts in the seeded book")
+    parser.add_argument("--notes-ratio", type=float, default=0.1, help="notes per contact")
+    parser.add_argument("--shards", default="1,4,8", help="comma-separated numbers of shards")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated numbers of worker processes")
+    parser.add_argument("--repeat", type=int, default=1)
+    options = parser.parse_args(argv)
+
+    books = make_address_book(options.size), make_note_book(int(options.size * options.notes_ratio))
+    workers = [int(count) for count in options.workers.split(",")]
+    print(f"{options.size} contacts on {os.cpu_count()} CPUs")
+    print("workers only read, decode and write the shard files; records and indexes are built in one process")
+    print(f"{'shards':>6} {'workers':>8} {'load':>8} {'save all':>9} {'save one':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (int(count) for count in options.shards.split(",")):
+            for row in bench_shards(books, count, workers, options.repeat, directory):
+                print(
+                    f"{count:>6} {row['workers']:>8} {row['load']:>7.3f}s "
+                    f"{row['save_all']:>8.3f}s {row['save_one']:>8.3f}s"
+                )
+    shards.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measures how long the bot takes to start.
+
+Reports the slowest imports as seen by `python -X importtime`, and the time from
+launching `python -m src.main` until the first prompt is shown.
+
+    python -m benchmarks.bench_startup --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT = b"Enter a command:"
+
+
+def import_times(module="src.main"):
+    """
+    Returns {module: cumulative import time in ms} for one fresh import of module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.decode().splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def time_to_first_prompt(workdir):
+    """
+    Starts the bot in workdir and returns the seconds until it shows its prompt.
+    """
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.main"],
+        cwd=workdir,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    try:
+        while PROMPT not in output:
+            chunk = os.read(process.stdout.fileno(), 4096)
+            if not chunk:
+                raise RuntimeError(f"The bot exited before prompting: {output!r}")
+            output += chunk
+        elapsed = time.perf_counter() - start
+        process.stdin.write(b"exit\n")
+        process.stdin.flush()
+        process.wait(timeout=30)
+    finally:
+        if process.poll() is None:
+            process.kill()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="number of slowest imports to list")
+    options = parser.parse_args(argv)
+
+    runs = [import_times() for _ in range(options.runs)]
+    totals = [times["src.main"] for times in runs]
+    print(f"import src.main: median {statistics.median(totals):.1f} ms, best {min(totals):.1f} ms")
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)[: options.top]
+    for name, elapsed in slowest:
+        print(f"  {elapsed:8.1f} ms  {name}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prompts = [time_to_first_prompt(workdir) * 1000 for _ in range(options.runs)]
+    print(f"time to first prompt: median {statistics.median(prompts):.1f} ms, best {min(prompts):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
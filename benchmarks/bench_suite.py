@@ -0,0 +1,139 @@
+"""
+Times the core model and storage operations on seeded synthetic books and writes the results as JSON.
+
+Every size gets a fresh address book and note book from benchmarks.datagen, so runs with the
+same seed time the same data and their JSON files can be compared between revisions:
+
+    python -m benchmarks.bench_suite --sizes 1000,100000,1000000 --output before.json
+    python -m benchmarks.bench_suite --sizes 1000,100000,1000000 --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.datagen import make_address_book, make_note_book, WORDS
+from src.utils.command_parser import parse_book_command
+from src.utils.data_handler import _snapshot_files, load_data, save_data
+
+PARSE_ARGS = (["--name", "John", "Smith", "--oldphone", "1234567890", "--newphone", "0987654321"], "change-phone",
+              [{"key_name": "oldphone", "help": ""}, {"key_name": "newphone", "help": ""}])
+FIND_ALL_QUERIES = ["Smith", "john", "olena boyko", "ez12", "an"]
+
+
+def measure(func, calls: int, repeat: int) -> dict:
+    """
+    Runs func calls times per round for repeat rounds.
+
+    Returns:
+        dict: The median and best time of one call in microseconds, over the rounds.
+    """
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        rounds.append((time.perf_counter() - start) / calls * 1e6)
+    return {"median_us": round(statistics.median(rounds), 3), "best_us": round(min(rounds), 3), "calls": calls}
+
+
+def cycle(items):
+    """
+    Returns a function that hands out items in turn, so repeated calls don't hit one key.
+    """
+    position = -1
+
+    def next_item():
+        nonlocal position
+        position = (position + 1) % len(items)
+        return items[position]
+
+    return next_item
+
+
+def bench_size(size: int, seed: int, repeat: int) -> dict:
+    results = {}
+    rng = random.Random(seed)
+
+    start = time.perf_counter()
+    address_book = make_address_book(size, seed)
+    results["build_address_book_s"] = round(time.perf_counter() - start, 3)
+    start = time.perf_counter()
+    note_book = make_note_book(size, seed)
+    results["build_note_book_s"] = round(time.perf_counter() - start, 3)
+
+    names = cycle(rng.sample(list(address_book.data), min(size, 1000)))
+    results["AddressBook.find"] = measure(lambda: address_book.find(names()), 1000, repeat)
+    queries = cycle(FIND_ALL_QUERIES)
+    results["AddressBook.find_all"] = measure(lambda: address_book.find_all(queries()), 20, repeat)
+    results["AddressBook.get_upcoming_birthdays(7)"] = measure(lambda: address_book.get_upcoming_birthdays(7), 20, repeat)
+    results["AddressBook.get_upcoming_birthdays(30)"] = measure(lambda: address_book.get_upcoming_birthdays(30), 5, repeat)
+
+    words = cycle([" ".join(rng.sample(WORDS, 2)) for _ in range(20)] + ["meet", "zzz"])
+    results["NoteBook.search"] = measure(lambda: note_book.search(words()), 20, repeat)
+    results["NoteBook.generate_id"] = measure(note_book.generate_id, 1000, repeat)
+    results["parse_book_command"] = measure(lambda: parse_book_command(*PARSE_ARGS), 1000, repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "data.pkl")
+        results["save_data"] = measure(lambda: save_data((address_book, note_book), filename), 1, repeat)
+        results["load_data"] = measure(lambda: load_data(filename), 1, repeat)
+        # the books are kept in files of their own next to filename, and maybe in shards
+        results["data_file_bytes"] = sum(os.path.getsize(name) for name in _snapshot_files(filename))
+    return results
+
+
+def compare(results: dict, baseline: dict):
+    """
+    Prints how the median times changed against an earlier run.
+    """
+    for size, operations in results["sizes"].items():
+        before_operations = baseline.get("sizes", {}).get(size, {})
+        for name, value in operations.items():
+            before = before_operations.get(name)
+            if isinstance(value, dict) and isinstance(before, dict) and before["median_us"]:
+                ratio = value["median_us"] / before["median_us"]
+                print(f"{size:>9} {name:<42}{before['median_us']:>14.1f}{value['median_us']:>14.1f}{ratio:>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="comma separated entry counts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per operation; the median is reported")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to write the results to")
+    parser.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    options = parser.parse_args(argv)
+
+    results = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": options.seed,
+        "repeat": options.repeat,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sizes": {},
+    }
+    for size in (int(size) for size in options.sizes.split(",")):
+        print(f"{size:,} entries...", file=sys.stderr)
+        results["sizes"][str(size)] = bench_size(size, options.seed, options.repeat)
+        with open(options.output, "w") as f:  # written after every size, so a long run keeps what it measured
+            json.dump(results, f, indent=2)
+
+    for size, operations in results["sizes"].items():
+        for name, value in operations.items():
+            shown = f"{value['median_us']:.1f} us" if isinstance(value, dict) else value
+            print(f"{size:>9} {name:<42}{shown:>16}")
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        print(f"\n{'size':>9} {'operation':<42}{'before us':>14}{'after us':>14}{'ratio':>9}")
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
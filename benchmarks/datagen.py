@@ -0,0 +1,110 @@
+"""
+Seeded generator of synthetic contacts and notes for the benchmarks.
+
+The same seed always produces the same data, so timings can be compared between revisions.
+"""
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "William", "Elizabeth",
+    "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+    "Olena", "Andrii", "Iryna", "Taras", "Oksana", "Dmytro", "Kateryna", "Serhii", "Natalia", "Yurii",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+    "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+    "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Oliynyk", "Melnyk", "Boyko", "Koval", "Lysenko",
+]
+STREETS = [
+    "Main Street", "Oak Avenue", "Maple Street", "Cedar Road", "Pine Street", "Elm Street",
+    "Washington Avenue", "Lake Drive", "Hill Road", "Park Avenue", "Sunset Boulevard", "River Road",
+]
+CITIES = [
+    ("Springfield", "IL", "62704"), ("Austin", "TX", "78701"), ("Portland", "OR", "97201"),
+    ("Denver", "CO", "80202"), ("Boston", "MA", "02108"), ("Seattle", "WA", "98101"),
+    ("Phoenix", "AZ", "85004"), ("Atlanta", "GA", "30303"), ("Columbus", "OH", "43215"),
+    ("Madison", "WI", "53703"),
+]
+ADDRESS_POOL_SIZE = 1000  # distinct addresses, so parsing them stays within the parse cache
+WORDS = (
+    "meeting call project budget review deadline invoice client travel family doctor school "
+    "birthday gift shopping groceries report draft release plan idea garden car repair bank "
+    "insurance tax holiday ticket hotel flight lunch dinner coffee book movie music gym"
+).split()
+
+
+def make_name(rng: random.Random, index: int) -> str:
+    # The index keeps names unique however many are generated
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{index}"
+
+
+def make_phone(rng: random.Random) -> str:
+    return f"{rng.randrange(10 ** 10):010d}"
+
+
+def make_birthday(rng: random.Random) -> str:
+    day = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 50))
+    return day.strftime("%d.%m.%Y")
+
+
+def make_address(rng: random.Random) -> str:
+    city, state, postal_code = rng.choice(CITIES)
+    return f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {city}, {state} {postal_code}"
+
+
+def address_pool(seed: int = 42, size: int = ADDRESS_POOL_SIZE) -> list:
+    rng = random.Random(seed)
+    return [make_address(rng) for _ in range(size)]
+
+
+def contact_rows(count: int, seed: int = 42):
+    """
+    Yields count contacts as dictionaries with name, phones, email, birthday and,
+    for about half of them, a US address.
+    """
+    rng = random.Random(seed)
+    addresses = address_pool(seed)
+    for index in range(count):
+        name = make_name(rng, index)
+        yield {
+            "name": name,
+            "phones": [make_phone(rng) for _ in range(rng.randint(1, 2))],
+            "email": f"{name.replace(' ', '.').lower()}@example.com",
+            "birthday": make_birthday(rng) if rng.random() < 0.8 else None,
+            "address": rng.choice(addresses) if rng.random() < 0.5 else None,
+        }
+
+
+def note_rows(count: int, seed: int = 42, words: int = 40):
+    """
+    Yields count notes as dictionaries with id, title, text and tags.
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        yield {
+            "id": index + 1,
+            "title": " ".join(rng.choices(WORDS, k=3)).capitalize(),
+            "text": " ".join(rng.choices(WORDS, k=words)),
+            "tags": rng.sample(WORDS, k=rng.randint(0, 3)),
+        }
+
+
+def make_address_book(count: int, seed: int = 42):
+    from src.models.address_book import AddressBook
+    from src.models.record import Record
+
+    book = AddressBook()
+    for row in contact_rows(count, seed):
+        book.add_record(Record.from_dict(row))
+    return book
+
+
+def make_note_book(count: int, seed: int = 42, words: int = 40):
+    from src.models.note import Note
+    from src.models.note_book import NoteBook
+
+    book = NoteBook()
+    for row in note_rows(count, seed, words):
+        book.add_record(Note.from_dict(row))
+    return book
@@ -0,0 +1,153 @@
+"""
+Thin client of the server mode: sends the commands typed at the prompt to a running
+server and prints its answers.
+"""
+import json
+import os
+import socket
+import stat
+import sys
+import tempfile
+from itertools import count
+
+# Commands that read or write files named by the client. A server refuses them, since
+# it would open the files as its own user and in its own directory.
+FILE_COMMANDS = {"import", "export", "export-notes"}
+
+
+def runtime_dir() -> str:
+    """
+    Returns the directory private to the user that holds the sockets of the bot,
+    contact_bot-UID under $XDG_RUNTIME_DIR or the temporary directory, creating it.
+
+    Raises:
+        PermissionError: If the directory is not the user's own or others may use it,
+            for it could then hold a socket or a link planted by someone else.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    path = os.path.join(base, f"contact_bot-{os.getuid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a directory private to you; remove it and try again.")
+    return path
+
+
+def default_address() -> str:
+    """
+    Returns where --serve listens and --connect connects when not told otherwise: a
+    socket only the user can reach, or 127.0.0.1:8765 where there are no Unix sockets.
+    """
+    if os.name != "posix":
+        return "127.0.0.1:8765"
+    return os.path.join(runtime_dir(), "server.sock")
+
+
+def parse_address(address: str):
+    """
+    Splits a server address into what to connect to.
+
+    Returns:
+        tuple: ("unix", path) for a Unix socket, given as a path, or ("tcp", host, port)
+        for "host:port".
+    """
+    if os.sep in address or address.endswith(".sock"):
+        return "unix", address
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid server address {address}. Use host:port or the path of a socket.")
+    return "tcp", host or "127.0.0.1", int(port)
+
+
+class Client:
+    """
+    A connection to a server, sending one request at a time.
+    """
+
+    def __init__(self, address: str, timeout: float = None):
+        kind, *where = parse_address(address)
+        if kind == "unix":
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(timeout)
+            try:
+                self._socket.connect(where[0])
+            except OSError:
+                self._socket.close()
+                raise
+        else:
+            self._socket = socket.create_connection(tuple(where), timeout=timeout)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.settimeout(None)
+        self._file = self._socket.makefile("rwb")
+        self._ids = count(1)
+
+    def request(self, line: str) -> dict:
+        """
+        Runs a line of input on the server.
+
+        Returns:
+            dict: The answer, with "ok" and either "result" or "error".
+
+        Raises:
+            ConnectionError: If the server closed the connection.
+        """
+        request = {"id": next(self._ids), "line": line}
+        self._file.write(json.dumps(request, ensure_ascii=False).encode() + b"\n")
+        self._file.flush()
+        answer = self._file.readline()
+        if not answer:
+            raise ConnectionError("The server closed the connection.")
+        return json.loads(answer)
+
+    def run(self, line: str) -> str:
+        """
+        Runs a line of input on the server and returns the text to show.
+        """
+        from colorama import Fore, Style  # one-shot commands print the answer as it is
+
+        answer = self.request(line)
+        if answer["ok"]:
+            return answer["result"]
+        return f"{Fore.RED}{answer['error']}{Style.RESET_ALL}"
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main_client(address: str):
+    """
+    Client mode: the prompt of the bot, with the commands run by the server at address.
+    """
+    from colorama import Fore, Style
+    from src.cli.interface import get_session
+
+    try:
+        client = Client(address)
+    except OSError as e:
+        print(f"{Fore.RED}Cannot reach the server at {address}: {e}{Style.RESET_ALL}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Connected to {address}.")
+    with client:
+        while True:
+            user_input = get_session().prompt("Enter a command: ").strip()
+            if not user_input:
+                print("Please enter a command.")
+                continue
+            if user_input.lower() in ["close", "exit"]:
+                print("Good bye!")
+                break
+            try:
+                print(client.run(user_input))
+            except ConnectionError as e:
+                print(f"{Fore.RED}{e}{Style.RESET_ALL}", file=sys.stderr)
+                sys.exit(1)
@@ -1,49 +1,78 @@
+from bisect import bisect_left
+
 from prompt_toolkit.completion import Completer, Completion
 
+from src.cli.registry import COMMAND_NAMES
+
 # List of available commands
-commands = [
-    "hello",
-    "add",
-    "add-birthday",
-    "show-birthday",
-    "birthdays",
-    "delete-phone",
-    "change-phone",
-    "change-birthday",
-    "phone",
-    "add-email",
-    "show-email",
-    "change-email",
-    "delete-email",
-    "add-address",
-    "show-address",
-    "change-address",
-    "delete-address",
-    "all",
-    "search",
-    "delete",
-    "add-note",
-    "get-note",
-    "edit-note",
-    "add-note-tag",
-    "delete-note-tag",
-    "list-notes",
-    "search-notes",
-    "delete-note",
-    "help",
-    "close",
-    "exit",
-]
+commands = sorted(COMMAND_NAMES)
+
+COMPLETION_LIMIT = 20  # suggestions shown at a time
+
+
+def complete_command(prefix: str) -> list:
+    position = bisect_left(commands, prefix)
+    matches = []
+    while position < len(commands) and commands[position].startswith(prefix):
+        matches.append(commands[position])
+        position += 1
+    return matches
+
+
+def option_value(text: str):
+    """
+    Finds the option whose value is being typed at the end of text.
+
+    Returns:
+        tuple: The option, like "--name", and the value typed after it so far,
+        or None and "" if the cursor is not in an option's value.
+    """
+    position = text.rfind("--")
+    while position > 0 and text[position - 1] != " ":  # "--" inside a word
+        position = text.rfind("--", 0, position)
+    if position <= 0:
+        return None, ""
+    option, separator, value = text[position:].partition("=")
+    if not separator:
+        option, separator, value = text[position:].partition(" ")
+        if not separator:
+            return None, ""  # still typing the option itself
+    return option, value
+
 
 class CommandCompleter(Completer):
+    """
+    Completes the command, then the values of the options that name something in the
+    books: contact names after --name, note IDs after --id and tags after --tag or --tags.
+
+    The books keep their names, IDs and tags sorted as they change, so a completion is
+    a bisection and a short read, however many contacts and notes there are.
+    """
+
+    def __init__(self, context=None):
+        self.context = context  # CommandContext with the books to complete from
+
     def get_completions(self, document, complete_event):
-        # We are interested only in the first word
         text_before_cursor = document.text_before_cursor
-        if ' ' in text_before_cursor:
-            return  # Do not show completions after a space
-        words = text_before_cursor.split()
-        if len(words) == 1:
-            word_before_cursor = words[0]
-            for command in commands:
-                if command.startswith(word_before_cursor):
-                    yield Completion(command, start_position=-len(word_before_cursor))
+        if ' ' not in text_before_cursor:
+            for command in complete_command(text_before_cursor.lower()):
+                yield Completion(command, start_position=-len(text_before_cursor))
+            return
+        if self.context is None:
+            return
+
+        option, value = option_value(text_before_cursor)
+        if option == "--tags":
+            value = value.split(" ")[-1]  # the tag being typed; --tags takes several
+        elif option in ("--id", "--tag") and " " in value:
+            return  # the value is complete
+        if option == "--name":
+            matches = self.context.address_book.complete_name(value, COMPLETION_LIMIT)
+        elif option == "--id":
+            matches = [str(note_id) for note_id in self.context.note_book.complete_id(value, COMPLETION_LIMIT)]
+        elif option in ("--tag", "--tags"):
+            matches = self.context.note_book.complete_tag(value, COMPLETION_LIMIT)
+        else:
+            return
+        for match in matches:
+            yield Completion(match, start_position=-len(value))
@@ -0,0 +1,127 @@
+"""
+One-shot commands, such as `contact_bot search John`, run by a daemon that keeps the
+books loaded between calls.
+
+The first command starts the daemon in the background, a server on a Unix socket
+private to the user and the data file, in a directory only the user can enter; the following ones connect to it and only pay
+for starting Python. The daemon stops once it has had no clients for a while, saving
+the books as it goes.
+"""
+import os
+import sys
+import time
+import zlib
+from src.cli.client import Client, runtime_dir
+from src.cli.options import DATA_FILE
+
+DAEMON_IDLE_TIMEOUT = 600.0  # Seconds without commands before the daemon stops
+DAEMON_START_TIMEOUT = 300.0  # Longest wait for a new daemon to load the books
+STORE_OPTIONS = ["db", "lazy_addresses", "unique_phones", "max_distance", "shards", "workers"]  # the daemon is started with these
+
+
+def daemon_address(options) -> str:
+    """
+    Returns the socket of the daemon serving the books options would open from the
+    current directory. Each data file and set of options has its own daemon.
+    """
+    data_file = os.path.abspath(options.db or DATA_FILE)
+    key = repr([data_file] + [getattr(options, name) for name in STORE_OPTIONS])
+    digest = f"{zlib.crc32(key.encode()):08x}"
+    return os.path.join(runtime_dir(), f"daemon-{digest}.sock")
+
+
+def daemon_command(options, address) -> list[str]:
+    """
+    Returns the command line that starts the daemon for options on address.
+    """
+    argv = [sys.executable, "-m", "src.main", "--serve", address]
+    argv += ["--idle-timeout", str(options.idle_timeout or DAEMON_IDLE_TIMEOUT)]
+    if options.db:
+        argv += ["--db", options.db]
+    if options.lazy_addresses:
+        argv.append("--lazy-addresses")
+    if options.unique_phones:
+        argv.append("--unique-phones")
+    argv += ["--max-distance", str(options.max_distance)]
+    argv += ["--shards", str(options.shards), "--workers", str(options.workers)]
+    return argv
+
+
+def start_daemon(options, address):
+    """
+    Starts the daemon in the background and waits until it accepts clients.
+
+    Returns:
+        Client: A connection to the new daemon.
+
+    Raises:
+        RuntimeError: If the daemon stopped or did not start in time; its output is
+            kept next to the socket, in a .log file.
+    """
+    import subprocess  # only loaded when the daemon has to be started
+
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    with open(address + ".log", "wb") as log:
+        daemon = subprocess.Popen(
+            daemon_command(options, address),
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            env=env,
+            start_new_session=True,  # outlives the shell and is not sent its Ctrl+C
+        )
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while True:
+        try:
+            return Client(address)
+        except OSError:
+            if daemon.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"The daemon did not start; see {address}.log")
+            time.sleep(0.01)
+
+
+def connect(options) -> Client:
+    """
+    Connects to the daemon for options, starting it if it is not running.
+    """
+    address = daemon_address(options)
+    try:
+        return Client(address)
+    except OSError:
+        pass
+    from src.utils.file_lock import FileLock  # only needed to start the daemon
+
+    with FileLock(address + ".lock"):  # only one of the commands run at once starts it
+        try:
+            return Client(address)
+        except OSError:
+            return start_daemon(options, address)
+
+
+def request(options, line) -> dict:
+    with connect(options) as client:
+        return client.request(line)
+
+
+def main_command(options) -> int:
+    """
+    Runs the command given on the command line on the daemon and prints the result.
+
+    Returns:
+        int: The exit status, 1 if the command could not be run.
+    """
+    line = " ".join(options.command)
+    try:
+        try:
+            answer = request(options, line)
+        except ConnectionError:  # the daemon stopped just as we came; this starts a new one
+            answer = request(options, line)
+    except (ConnectionError, RuntimeError, PermissionError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    if not answer["ok"]:
+        print(answer["error"], file=sys.stderr)
+        return 1
+    print(answer["result"])
+    return 0
@@ -1,39 +1,26 @@
-from prompt_toolkit import PromptSession
-from src.cli.completer import CommandCompleter
-from src.commands.contact_commands import (
-    add_contact,
-    change_phone,
-    change_birthday,
-    delete_phone,
-    show_phone,
-    show_all,
-    search_contact,
-    delete_contact,
-    add_birthday,
-    show_birthday,
-    birthdays,
-    add_email,
-    show_email,
-    change_email,
-    delete_email,
-    add_address,
-    show_address,
-    change_address,
-    delete_address,
-)
-from src.commands.note_commands import add_note, search_notes, delete_note, list_notes, edit_note, get_note_by_id, add_note_tag, delete_note_tag
-from src.utils.data_handler import save_data, load_data
-from typing import List, Tuple
+from src.cli.options import DATA_FILE, get_options
+from src.cli.registry import REGISTRY, INVALID_COMMAND, CommandContext
+from src.models import address as address_model
+from src.utils.autosave import AutoSaver, report_error
+from src.utils.data_handler import LoadError, PickleStore
+from src.utils.metrics import SlowestProfiles, metrics
+from src.utils.pager import pager
+from src.utils import shards
 import re
+import sys
+import time
+from contextlib import nullcontext
 from colorama import Fore, Style, init
 
 
 init()
 
-AUTOSAVE_INTERVAL = 1  # Save after every command
+COMPACT_INTERVAL = 1000  # Fold the journal into a fresh snapshot after this many changes
+AUTOSAVE_IDLE_DELAY = 1.0  # Seconds without changes before a burst of edits is written
+AUTOSAVE_MAX_DELAY = 5.0  # Longest time a change waits to be written during a continuous burst
 
 
-def parse_input(user_input: str) -> Tuple[str, List[str]]:
+def parse_input(user_input: str) -> tuple[str, list[str]]:
     """
     Parses the user input and returns the command and arguments.
 
@@ -41,7 +28,7 @@ def parse_input(user_input: str) -> Tuple[str, List[str]]:
         user_input (str): The user input to be parsed.
 
     Returns:
-        Tuple[str, List[str]]: A tuple containing the command and a list of arguments.
+        tuple[str, list[str]]: A tuple containing the command and a list of arguments.
     """
 
     if not user_input.split():
@@ -52,59 +39,262 @@ def parse_input(user_input: str) -> Tuple[str, List[str]]:
     return cmd, args
 
 
-# Create a PromptSession with custom completer
-session = PromptSession(completer=CommandCompleter())
+def open_store(options):
+    if options.db:
+        from src.utils.sqlite_store import SQLiteStore
+        return SQLiteStore(options.db, migrate_from=DATA_FILE)
+    shards.SHARDS = options.shards
+    shards.WORKERS = options.workers
+    return PickleStore(DATA_FILE, compact_every=COMPACT_INTERVAL)
 
 
-def main():
+_session = None
+
+
+def get_session(context=None):
+    """
+    Returns the PromptSession with the custom completer, creating it on first use.
+    prompt_toolkit is the slowest import of the bot, so it is only loaded when a prompt is shown.
+
+    Args:
+        context (CommandContext): The books the completer suggests names, note IDs and tags from.
+    """
+    global _session
+    if _session is None:
+        from prompt_toolkit import PromptSession
+        from src.cli.completer import CommandCompleter
+
+        _session = PromptSession(completer=CommandCompleter(context))
+    return _session
+
+
+def run_command(command, args, context):
+    """
+    Runs one command against the books and returns its result.
+
+    Args:
+        command (str): The command name.
+        args (list): The arguments of the command.
+        context (CommandContext): The books and the store they are kept in.
+
+    Returns:
+        str: The result to show the user.
+    """
+    entry = REGISTRY.get(command)
+    if entry is None:
+        return INVALID_COMMAND
+    try:
+        return entry.run(args, context)
+    except LoadError as e:  # raised by the first command using a book, outside its input_error
+        return f"{Fore.RED}{e}{Style.RESET_ALL}"
+
+
+def run_line(user_input, context, output=None):
+    """
+    Runs one line of input and prints its result, timing how long it took to parse,
+    run and print.
+    """
+    start = time.perf_counter()
+    command, args = parse_input(user_input)
+    name = command if command in REGISTRY else "unknown"
+    parsed = time.perf_counter()
+    with context.lock if context.lock is not None else nullcontext(), context.transaction():
+        if context.profiler is not None:
+            result = context.profiler.run(name, lambda: run_command(command, args, context))
+        else:
+            result = run_command(command, args, context)
+    ran = time.perf_counter()
+    print(result, file=output)
+    metrics.record_command(name, parsed - start, ran - parsed, time.perf_counter() - ran)
+
+
+def timed_save(save, name):
+    """
+    Runs save() and records how long it took under name.
+    """
+    start = time.perf_counter()
+    try:
+        save()
+    finally:
+        metrics.record(name, "save", time.perf_counter() - start)
+
+
+def configure(book, options):
+    """
+    Applies the settings given on the command line to a book as it is loaded.
+    """
+    if book.kind == "contacts":
+        book.unique_phones = options.unique_phones
+        book.max_distance = options.max_distance
+
+
+def finish(options, context):
+    """
+    Writes the timings and profiles asked for on the command line, once the bot is done.
+    """
+    if options.stats_file:
+        metrics.dump(options.stats_file)
+    if context.profiler is not None:
+        for filename in context.profiler.dump(options.profile):
+            print(f"Profile saved to {filename}", file=sys.stderr)
+
+
+def run_batch(lines, context, checkpoint=0, output=None):
+    """
+    Runs commands read from lines, one per line, printing the result of each.
+
+    Blank lines and lines starting with # are skipped, and close or exit stops the batch.
+    The books are saved after every checkpoint commands if it is set; the caller saves
+    them at the end.
+
+    Returns:
+        tuple: The number of commands run and the seconds they took.
+    """
+    output = output or sys.stdout
+    count = 0
+    start = time.perf_counter()
+    for line in lines:
+        user_input = line.strip()
+        if not user_input or user_input.startswith("#"):
+            continue
+        if user_input.lower() in ["close", "exit"]:
+            break
+        run_line(user_input, context, output)
+        count += 1
+        if checkpoint and count % checkpoint == 0:
+            timed_save(context.store.save, "checkpoint")
+    return count, time.perf_counter() - start
+
+
+def main_server(options, store):
+    """
+    Server mode: serves the commands of clients on options.serve until interrupted, then saves.
+    """
+    import asyncio
+    from src.cli.server import BookServer, serve
+
+    context = CommandContext(store.address_book, store.note_book, store)  # loaded now, not by the reader threads
+    server = BookServer(context)
+    saver = AutoSaver(
+        lambda: timed_save(lambda: store.save(server.lock.writer), "autosave"),
+        idle_delay=AUTOSAVE_IDLE_DELAY,
+        max_delay=AUTOSAVE_MAX_DELAY,
+    )
+    store.on_load(lambda book: book.subscribe(saver))
+    saver.start()
+    try:
+        ready = lambda: print(f"Serving the books on {options.serve}.", flush=True)
+        asyncio.run(serve(server, options.serve, ready, idle_timeout=options.idle_timeout))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        saver.close()
+        timed_save(store.close, "close")
+        finish(options, context)
+        print(f"{Fore.BLUE}Server stopped after {server.requests} requests.{Style.RESET_ALL}", file=sys.stderr)
+
+
+def main_batch(options, store):
+    """
+    Batch mode: runs the commands of options.batch without prompt_toolkit and saves once at the end.
+    """
+    context = CommandContext(store=store)
+    if options.profile:
+        context.profiler = SlowestProfiles(options.profile_top)
+    if options.batch == "-":
+        count, elapsed = run_batch(sys.stdin, context, options.checkpoint)
+    else:
+        with open(options.batch, encoding="utf-8") as f:
+            count, elapsed = run_batch(f, context, options.checkpoint)
+    timed_save(store.close, "close")
+    finish(options, context)
+    rate = count / elapsed if elapsed else 0.0
+    print(
+        f"{Fore.BLUE}{count} commands in {elapsed:.2f} s ({rate:.0f} commands/s).{Style.RESET_ALL}",
+        file=sys.stderr,
+    )
+
+
+def page_through(lock):
+    """
+    Steps through the rest of a paged listing: Enter shows the next page and anything
+    else stops paging, leaving the rest for the `more` command.
+    """
+    while pager.has_more:
+        answer = get_session().prompt("-- Enter: next page, q: stop -- ")
+        if answer.strip():
+            break
+        with lock:
+            print(pager.next_page())
+
+
+def main_command_here(options, store):
+    """
+    One-shot mode without the daemon: runs the command given on the command line and saves.
+    """
+    context = CommandContext(store=store)
+    pager.continued = False  # the session ends with this command
+    run_line(" ".join(options.command), context)
+    timed_save(store.close, "close")
+    finish(options, context)
+
+
+def main(argv=None, options=None):
     """
     The main function of the contact bot program.
 
     This function loads the address book and notebook data from a file, prompts the user for commands,
     and executes the corresponding actions based on the user's input.
 
-    Available commands:
-    - hello: Get a greeting from the bot.
-    - add: Add a new contact with name and other details.
-    - add-birthday: Add a birthday for the specified contact.
-    - show-birthday: Show the birthday for the specified contact.
-    - change-birthday: Change the birthday for the specified contact.
-    - birthdays: Show contacts with birthdays in the next specified number of days.
-    - change-phone: Change the phone number for the specified contact.
-    - delete-phone: Delete the phone number for the specified contact.
-    - phone: Show phone numbers for the specified contact.
-    - all: Show all contacts in the address book.
-    - search: Find a contact.
-    - delete: Delete a contact.
-    - add-note: Add a new note.
-    - get-note: Get a note by its ID.
-    - edit-note: Edit a note by its ID.
-    - add-note-tag: Add a tag to a note.
-    - delete-note-tag: Delete a tag from a note.
-    - search-notes: Find notes by text.
-    - list-notes: List all notes.
-    - delete-note: Delete a note by its ID.
-    - add-email: Add the email for the specified contact.
-    - show-email: Show the email for the specified contact.
-    - change-email: Change the email for the specified contact.
-    - delete-email: Delete the email for the specified contact.
-    - add-address: Add the address for the specified contact.
-    - show-address: Show the address for the specified contact.
-    - change-address: Change the address for the specified contact.
-    - delete-address: Delete the address for the specified contact.
-    - help: Show the list of available commands.
+    The available commands are declared once, in src.cli.registry; `help` lists them.
 
     To exit the program, enter 'close' or 'exit'.
 
     """
-    address_book, note_book = load_data()  # Load the address book and notebook data from a file
-
-    command_count = 0  # Initialize command count for autosave
+    options = options or get_options(argv)
+    if options.connect:
+        from src.cli.client import main_client
+
+        main_client(options.connect)
+        return
+    if options.lazy_addresses:
+        address_model.LAZY_PARSING = True
+    store = open_store(options)
+    store.open(sections=())  # each book is loaded when a command first uses it
+    store.on_load(lambda book: configure(book, options))
+
+    if options.batch:
+        main_batch(options, store)
+        return
+    if options.command:
+        main_command_here(options, store)
+        return
+    if options.serve:
+        main_server(options, store)
+        return
+
+    # Changes mark the saver dirty; it writes them from a background thread, and its
+    # failures are shown before the next prompt instead of over the one being edited
+    failures = []
+    saver = AutoSaver(
+        lambda: timed_save(lambda: store.save(saver.lock), "autosave"),
+        idle_delay=AUTOSAVE_IDLE_DELAY,
+        max_delay=AUTOSAVE_MAX_DELAY,
+        on_error=failures.append,
+    )
+    store.on_load(lambda book: book.subscribe(saver))
+    saver.start()
+    context = CommandContext(store=store, lock=saver.lock)
+    if options.profile:
+        context.profiler = SlowestProfiles(options.profile_top)
 
     print("Welcome. I am an assistant bot!")
 
     while True:
-        user_input = session.prompt("Enter a command: ").strip()  # Prompt the user for input
+        while failures:
+            report_error(failures.pop(0), sys.stdout)
+        user_input = get_session(context).prompt("Enter a command: ").strip()  # Prompt the user for input
 
         if not user_input:  # Check if the user entered an empty string
             print("Please enter a command.")
@@ -112,90 +302,14 @@ def main():
 
         if user_input.lower() in ["close", "exit"]:  # Check if the user wants to exit
             print("Good bye!")
-            save_data((address_book, note_book))
+            saver.close()
+            timed_save(store.close, "close")
+            finish(options, context)
             break
 
-        command, args = parse_input(user_input)
-
-        def switch_commands(command):
-            switcher = {
-                "hello": lambda: "How can I help you?",
-                "add": lambda: add_contact(args, address_book),
-                "add-birthday": lambda: add_birthday(args, address_book),
-                "show-birthday": lambda: show_birthday(args, address_book),
-                "change-birthday": lambda: change_birthday(args, address_book),
-                "birthdays": lambda: birthdays(args, address_book),
-                "change-phone": lambda: change_phone(args, address_book),
-                "delete-phone": lambda: delete_phone(args, address_book),
-                "phone": lambda: show_phone(args, address_book),
-                "all": lambda: show_all(address_book),
-                "search": lambda: search_contact(args, address_book),
-                "delete": lambda: delete_contact(args, address_book),
-                "add-note": lambda: add_note(args, note_book),
-                "get-note": lambda: get_note_by_id(args, note_book),
-                "edit-note": lambda: edit_note(args, note_book),
-                "add-note-tag": lambda: add_note_tag(args, note_book),
-                "delete-note-tag": lambda: delete_note_tag(args, note_book),
-                "search-notes": lambda: search_notes(args, note_book),
-                "list-notes": lambda: list_notes(note_book),
-                "delete-note": lambda: delete_note(args, note_book),
-                "add-email": lambda: add_email(args, address_book),
-                "show-email": lambda: show_email(args, address_book),
-                "change-email": lambda: change_email(args, address_book),
-                "delete-email": lambda: delete_email(args, address_book),
-                "add-address": lambda: add_address(args, address_book),
-                "show-address": lambda: show_address(args, address_book),
-                "change-address": lambda: change_address(args, address_book),
-                "delete-address": lambda: delete_address(args, address_book),
-                "help": lambda: """
-                    add [name] [phone] [email] [birthday]: Add a new contact with name and other details.
-                    search [name]: Find a contact.
-                    change --name [name] --oldphone [old phone] --newphone [new phone]: Change the phone number for the specified contact.
-                    delete --[name]: Delete a contact.
-                    phone --name [name]: Show phone numbers for the specified contact.
-                    all: Show all contacts in the address book.
-                    add-birthday --name [name] --date [birthday]: Add a birthday for the specified contact.
-                    change-birthday --name [name] --date [birthday]: Change a birthday for the specified contact.
-                    show-birthday --name [name]: Show the birthday for the specified contact.
-                    birthdays [days]: Show contacts with birthdays in the next specified number of days.
-                    add-email --name [name] --email [email]: Add the email for the specified contact.
-                    show-email --name [name]: Show the email for the specified contact.
-                    change-email --name [name] --email [new email]: Change the email for the specified contact.
-                    delete-email --name [name]: Delete the email for the specified contact.
-                    add-address --name [name] --address [address]: Add the address for the specified contact.
-                    show-address --name [name]: Show the address for the specified contact.
-                    change-address --name [name] --new address [new address]: Change the address for the specified contact.
-                    delete-address --name [name]: Delete the address for the specified contact.
-                    add-note --title [title] --text [text]: Add a new note.
-                    list-notes: List all notes.
-                    get-note [ID]: Get a note by its ID.
-                    add-note-tag --id [ID] --tag [tag]: Add a tag to a note.
-                    delete-note-tag --id [ID] --tag [tag]: Delete a tag from a note.
-                    search-notes [text]: Find notes by text.
-                    edit-note --id [ID] --title [title] --text [text]: Edit a note by its ID.
-                    delete-note [ID]: Delete a note by its ID.
-                    hello: Get a greeting from the bot.
-                    close or exit: Close the program.
-                """,
-            }
-
-            result = switcher.get(
-                command,
-                lambda: """Invalid command. Available commands: hello, add, add-birthday, show-birthday, change-birthday, birthdays, 
-                change-phone, delete-phone, phone, add-email, show-email, change-email, delete-email, add-address, show-address, 
-                change-address, delete-address, all, search, delete, add-note, get-note, edit-note, add-note-tag, delete-note-tag,
-                search-notes, list-notes, delete-note, close, exit & help""",
-            )
-
-            return result() if callable(result) else result
-
-        print(switch_commands(command))
-
-        command_count += 1
-
-        if command_count >= AUTOSAVE_INTERVAL:
-            save_data((address_book, note_book))
-            command_count = 0
+        run_line(user_input, context)
+        if pager.has_more and sys.stdin.isatty():
+            page_through(saver.lock)
 
 
 if __name__ == "__main__":
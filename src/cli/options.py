@@ -0,0 +1,145 @@
+"""
+The command line options of the bot, kept apart from the bot itself so that a
+one-shot command can be read without loading the books' code.
+"""
+import sys
+from types import SimpleNamespace
+
+DATA_FILE = "data.pkl"
+DEFAULT_ADDRESS = ""  # --serve or --connect without an address; see client.default_address
+
+
+# Every option but the command, as the flag and the settings of its argparse argument.
+# The options of a bot started without any are read from here, without loading argparse.
+OPTIONS = [
+    ("--db", {
+        "metavar": "FILE",
+        "help": f"Keep the books in an SQLite database instead of {DATA_FILE}. "
+        f"A new database is filled from {DATA_FILE} if it exists.",
+    }),
+    ("--lazy-addresses", {
+        "action": "store_true",
+        "help": "Keep addresses as entered and parse them only when they are first shown.",
+    }),
+    ("--unique-phones", {
+        "action": "store_true",
+        "help": "Refuse to add a phone number that already belongs to another contact.",
+    }),
+    ("--max-distance", {
+        "metavar": "N",
+        "type": int,
+        "default": 2,
+        "help": "Number of typos `search` forgives in a name; 0 finds only names containing the search text.",
+    }),
+    ("--batch", {
+        "metavar": "FILE",
+        "help": "Run the commands in FILE, one per line, without prompting; - reads them from standard input.",
+    }),
+    ("--checkpoint", {
+        "metavar": "N",
+        "type": int,
+        "default": 0,
+        "help": "In batch mode, save the books after every N commands as well as at the end.",
+    }),
+    ("--stats-file", {
+        "metavar": "FILE",
+        "help": "Write the command timings shown by `stats` to FILE as JSON on exit.",
+    }),
+    ("--profile", {
+        "metavar": "DIR",
+        "help": "Run every command under cProfile and save the profiles of the slowest ones to DIR on exit.",
+    }),
+    ("--profile-top", {
+        "metavar": "N",
+        "type": int,
+        "default": 5,
+        "help": "Number of slowest commands whose profiles --profile keeps.",
+    }),
+    ("--serve", {
+        "metavar": "ADDRESS",
+        "nargs": "?",
+        "const": DEFAULT_ADDRESS,
+        "help": "Keep the books in memory and serve the commands of clients on ADDRESS, "
+        "host:port or the path of a Unix socket (default: a socket only you can reach). "
+        "Anyone who can reach a TCP port can use the books.",
+    }),
+    ("--connect", {
+        "metavar": "ADDRESS",
+        "nargs": "?",
+        "const": DEFAULT_ADDRESS,
+        "help": "Run the commands typed at the prompt on the server at ADDRESS instead of loading the books.",
+    }),
+    ("--idle-timeout", {
+        "metavar": "SECONDS",
+        "type": float,
+        "help": "Stop the server once it has had no clients for SECONDS. "
+        "A command given on the command line starts its daemon with this timeout.",
+    }),
+    ("--no-daemon", {
+        "action": "store_true",
+        "help": "Run a command given on the command line in this process instead of the background daemon.",
+    }),
+    ("--shards", {
+        "metavar": "N",
+        "type": int,
+        "default": 1,
+        "help": f"Split each book into N files when saving {DATA_FILE}, so that a very large one "
+        "is read by several processes and only the files with changes are written again.",
+    }),
+    ("--workers", {
+        "metavar": "N",
+        "type": int,
+        "default": 1,
+        "help": "Number of processes reading and writing the files of the books at once.",
+    }),
+]
+
+
+def default_options() -> dict:
+    """
+    Returns the value argparse gives every option that is not on the command line.
+    """
+    defaults = {"command": []}
+    for flag, settings in OPTIONS:
+        default = False if settings.get("action") == "store_true" else None
+        defaults[flag[2:].replace("-", "_")] = settings.get("default", default)
+    return defaults
+
+
+def parse_options(argv=None):
+    """
+    Parses the command line options of the bot.
+    """
+    import argparse  # only loaded when the bot is started with options
+
+    parser = argparse.ArgumentParser(prog="contact_bot", description="Contact and note manager")
+    for flag, settings in OPTIONS:
+        parser.add_argument(flag, **settings)
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="A command to run, such as `search John`, instead of starting the prompt. "
+        "It is run by a background daemon that keeps the books loaded between calls.",
+    )
+    options = parser.parse_args(argv)
+    if DEFAULT_ADDRESS in (options.serve, options.connect):
+        from src.cli.client import default_address
+
+        options.serve = default_address() if options.serve == DEFAULT_ADDRESS else options.serve
+        options.connect = default_address() if options.connect == DEFAULT_ADDRESS else options.connect
+    if options.shards < 1 or options.workers < 1:
+        parser.error("--shards and --workers must be at least 1")
+    return options
+
+
+def get_options(argv=None):
+    """
+    Returns the command line options, skipping argparse when there are none or when
+    they are only a command.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return SimpleNamespace(**default_options())
+    if not argv[0].startswith("-"):
+        return SimpleNamespace(**{**default_options(), "command": list(argv)})
+    return parse_options(argv)
@@ -0,0 +1,166 @@
+from contextlib import nullcontext
+from src.commands.contact_commands import (
+    add_contact,
+    change_phone,
+    change_birthday,
+    delete_phone,
+    show_phone,
+    show_all,
+    search_contact,
+    delete_contact,
+    add_birthday,
+    show_birthday,
+    birthdays,
+    add_email,
+    show_email,
+    change_email,
+    delete_email,
+    add_address,
+    show_address,
+    change_address,
+    delete_address,
+    who_called,
+    import_contacts,
+    export_contacts,
+)
+from src.commands.note_commands import add_note, search_notes, delete_note, list_notes, edit_note, get_note_by_id, add_note_tag, delete_note_tag, export_notes
+from src.utils.metrics import metrics
+from src.utils.pager import pager
+
+
+class CommandContext:
+    """
+    What the commands work on: the books, the store they are kept in and the lock
+    guarding them while they are saved. A book not given is taken from the store the
+    first time a command uses it, so a command only loads the books it needs.
+    """
+
+    def __init__(self, address_book=None, note_book=None, store=None, lock=None):
+        self._address_book = address_book
+        self._note_book = note_book
+        self.store = store
+        self.lock = lock
+        self.profiler = None  # SlowestProfiles the commands run under, if profiling
+
+    @property
+    def address_book(self):
+        return self._address_book if self._address_book is not None else self.store.address_book
+
+    @property
+    def note_book(self):
+        return self._note_book if self._note_book is not None else self.store.note_book
+
+    def transaction(self):
+        """
+        Returns the context a command runs in, which keeps the books in step with the
+        other sessions sharing the store.
+        """
+        return self.store.transaction() if self.store is not None else nullcontext()
+
+    def checkpoint(self):
+        """
+        Saves the books as a whole, after changes their listeners were not told about.
+        """
+        if self.store is not None:
+            self.store.checkpoint(self.lock)
+
+
+class Command:
+    """
+    A command of the bot: the function that runs it, called as run(args, context),
+    and the usage and description shown by help. Commands that only read the books
+    say so with writes=False; the server runs them alongside each other.
+    """
+
+    def __init__(self, name, run, usage, description, writes=True):
+        self.name = name
+        self.run = run
+        self.usage = usage
+        self.description = description
+        self.writes = writes
+
+
+COMMANDS = [
+    Command("hello", lambda args, context: "How can I help you?",
+            "hello", "Get a greeting from the bot.", writes=False),
+    Command("add", lambda args, context: add_contact(args, context.address_book),
+            "add [name] [phone] [email] [birthday]", "Add a new contact with name and other details."),
+    Command("search", lambda args, context: search_contact(args, context.address_book),
+            "search [name] --page [N] --limit [N]", "Find a contact.", writes=False),
+    Command("change-phone", lambda args, context: change_phone(args, context.address_book),
+            "change-phone --name [name] --oldphone [old phone] --newphone [new phone]",
+            "Change the phone number for the specified contact."),
+    Command("delete-phone", lambda args, context: delete_phone(args, context.address_book),
+            "delete-phone --name [name] --phone [phone]", "Delete the phone number for the specified contact."),
+    Command("delete", lambda args, context: delete_contact(args, context.address_book),
+            "delete --name [name]", "Delete a contact."),
+    Command("phone", lambda args, context: show_phone(args, context.address_book),
+            "phone --name [name]", "Show phone numbers for the specified contact.", writes=False),
+    Command("who-called", lambda args, context: who_called(args, context.address_book),
+            "who-called [phone]", "Find the contacts a phone number belongs to.", writes=False),
+    Command("import", lambda args, context: import_contacts(args, context.address_book, context.checkpoint),
+            "import [file] --format [csv|vcard|jsonl] --workers [N] --report [file]",
+            "Import contacts from a file."),
+    Command("export", lambda args, context: export_contacts(args, context.address_book),
+            "export [file or -] --format [csv|vcard|jsonl]", "Export contacts to a file or the screen.", writes=False),
+    Command("all", lambda args, context: show_all(args, context.address_book),
+            "all --page [N] --limit [N]", "Show all contacts in the address book, a page at a time.", writes=False),
+    Command("add-birthday", lambda args, context: add_birthday(args, context.address_book),
+            "add-birthday --name [name] --date [birthday]", "Add a birthday for the specified contact."),
+    Command("change-birthday", lambda args, context: change_birthday(args, context.address_book),
+            "change-birthday --name [name] --date [birthday]", "Change a birthday for the specified contact."),
+    Command("show-birthday", lambda args, context: show_birthday(args, context.address_book),
+            "show-birthday --name [name]", "Show the birthday for the specified contact.", writes=False),
+    Command("birthdays", lambda args, context: birthdays(args, context.address_book),
+            "birthdays [days]", "Show contacts with birthdays in the next specified number of days.", writes=False),
+    Command("add-email", lambda args, context: add_email(args, context.address_book),
+            "add-email --name [name] --email [email]", "Add the email for the specified contact."),
+    Command("show-email", lambda args, context: show_email(args, context.address_book),
+            "show-email --name [name]", "Show the email for the specified contact.", writes=False),
+    Command("change-email", lambda args, context: change_email(args, context.address_book),
+            "change-email --name [name] --email [new email]", "Change the email for the specified contact."),
+    Command("delete-email", lambda args, context: delete_email(args, context.address_book),
+            "delete-email --name [name]", "Delete the email for the specified contact."),
+    Command("add-address", lambda args, context: add_address(args, context.address_book),
+            "add-address --name [name] --address [address]", "Add the address for the specified contact."),
+    Command("show-address", lambda args, context: show_address(args, context.address_book),
+            "show-address --name [name]", "Show the address for the specified contact.", writes=False),
+    Command("change-address", lambda args, context: change_address(args, context.address_book),
+            "change-address --name [name] --address [new address]", "Change the address for the specified contact."),
+    Command("delete-address", lambda args, context: delete_address(args, context.address_book),
+            "delete-address --name [name]", "Delete the address for the specified contact."),
+    Command("add-note", lambda args, context: add_note(args, context.note_book),
+            "add-note --title [title] --text [text] --tags [tags]", "Add a new note."),
+    Command("list-notes", lambda args, context: list_notes(args, context.note_book),
+            "list-notes --page [N] --limit [N]", "List all notes, a page at a time.", writes=False),
+    Command("more", lambda args, context: pager.next_page(),
+            "more", "Show the next page of the last listing.", writes=False),
+    Command("get-note", lambda args, context: get_note_by_id(args, context.note_book),
+            "get-note [ID]", "Get a note by its ID.", writes=False),
+    Command("add-note-tag", lambda args, context: add_note_tag(args, context.note_book),
+            "add-note-tag --id [ID] --tag [tag]", "Add a tag to a note."),
+    Command("delete-note-tag", lambda args, context: delete_note_tag(args, context.note_book),
+            "delete-note-tag --id [ID] --tag [tag]", "Delete a tag from a note."),
+    Command("search-notes", lambda args, context: search_notes(args, context.note_book),
+            "search-notes [text]", "Find notes by text.", writes=False),
+    Command("edit-note", lambda args, context: edit_note(args, context.note_book),
+            "edit-note --id [ID] --title [title] --text [text]", "Edit a note by its ID."),
+    Command("delete-note", lambda args, context: delete_note(args, context.note_book),
+            "delete-note [ID]", "Delete a note by its ID."),
+    Command("stats", lambda args, context: metrics.report(),
+            "stats", "Show how long each command has taken to parse, run, print and save.", writes=False),
+    Command("export-notes", lambda args, context: export_notes(args, context.note_book),
+            "export-notes [file or -] --format [csv|jsonl]", "Export notes to a file or the screen.", writes=False),
+]
+EXIT_COMMANDS = ["close", "exit"]
+
+HELP = "\n".join(
+    [f"{command.usage}: {command.description}" for command in COMMANDS]
+    + ["help: Show the list of available commands.", "close or exit: Close the program."]
+)
+COMMANDS.append(Command("help", lambda args, context: HELP, "help", "Show the list of available commands.", writes=False))
+
+REGISTRY = {command.name: command for command in COMMANDS}  # built once, looked up for every command
+COMMAND_NAMES = list(REGISTRY) + EXIT_COMMANDS
+
+INVALID_COMMAND = f"Invalid command. Available commands: {', '.join(REGISTRY)}, close, exit."
@@ -0,0 +1,170 @@
+"""
+Server mode: one process keeps the books in memory and runs the commands of many
+clients, which talk to it in newline-delimited JSON over TCP or a Unix socket.
+
+A request is one line holding {"id": ..., "line": "search John"}, or the command and
+its arguments apart as {"id": ..., "command": "search", "args": ["John"]}. The answer
+is one line holding {"id": ..., "ok": true, "result": "..."}, or "ok": false and an
+"error" if the request could not be run. The answers on a connection come back in the
+order of its requests.
+"""
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.cli.client import FILE_COMMANDS, parse_address
+from src.cli.registry import REGISTRY, INVALID_COMMAND
+from src.utils.data_handler import LoadError
+from src.utils.metrics import metrics
+from src.utils.pager import pager
+from src.utils.rwlock import ReadWriteLock
+
+READ_THREADS = 8  # commands that only read the books run on this many threads at once
+MAX_REQUEST = 1 << 20  # longest request line accepted, in bytes
+
+
+class BookServer:
+    """
+    Runs the commands of the clients on the shared books.
+
+    Commands that only read the books run on a pool of threads alongside each other;
+    a command that changes them waits for the reads in progress and runs alone. The
+    changes reach the disk through the store and the one autosave thread, like in the
+    interactive bot. Before a read, the books take in the changes other sessions saved
+    to the store, if there are any.
+    """
+
+    def __init__(self, context, threads=READ_THREADS):
+        self.context = context
+        self.lock = ReadWriteLock()
+        context.lock = self.lock.writer  # what the autosave thread and checkpoints take
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="command")
+        self.requests = 0
+        self.connections = 0
+        self.last_active = time.monotonic()  # when the last client came or went
+
+    def run(self, command, args) -> str:
+        """
+        Runs one command on a pool thread, as a reader or as the writer.
+        """
+        entry = REGISTRY.get(command)
+        if entry is None:
+            return INVALID_COMMAND
+        if command == "more":
+            return "Listings are not continued between requests; ask for the next one with --page."
+        if command in FILE_COMMANDS:
+            return f"{command} works on files, which the server would open as its own; run it without a server."
+        start = time.perf_counter()
+        pager.continued = False  # the listing is not kept for the client's next request
+        try:
+            if entry.writes:
+                with self.lock.writer, self.context.transaction():
+                    result = entry.run(args, self.context)
+            else:
+                store = self.context.store
+                if store is not None and store.stale():
+                    with self.lock.writer, self.context.transaction():
+                        pass  # catch up with the other sessions before reading
+                with self.lock.reader:
+                    result = entry.run(args, self.context)
+        except LoadError as e:  # a book the command needed could not be loaded
+            return str(e)
+        metrics.record_command(command, 0.0, time.perf_counter() - start, 0.0)
+        return str(result)
+
+    async def execute(self, request: dict) -> dict:
+        if "line" in request:
+            command, *args = str(request["line"]).split() or [""]
+        else:
+            command, args = request.get("command", ""), [str(arg) for arg in request.get("args", [])]
+        result = await asyncio.get_running_loop().run_in_executor(self._pool, self.run, command, args)
+        return {"ok": True, "result": result}
+
+    async def handle(self, reader, writer):
+        """
+        Answers the requests of one client until it disconnects.
+        """
+        self.connections += 1
+        try:
+            while line := await reader.readline():
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    response = await self.execute(request)
+                except (ValueError, AttributeError) as e:
+                    response = {"ok": False, "error": f"Invalid request: {e}"}
+                except Exception as e:
+                    response = {"ok": False, "error": str(e) or type(e).__name__}
+                response["id"] = request_id
+                self.requests += 1
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+            pass  # the client went away or sent a line too long to read
+        finally:
+            writer.close()
+            self.connections -= 1
+            self.last_active = time.monotonic()
+
+    async def start(self, address: str):
+        """
+        Starts listening on address; returns the asyncio server.
+        """
+        kind, *where = parse_address(address)
+        if kind == "unix":
+            if os.path.exists(where[0]):
+                os.remove(where[0])  # left behind by a server that did not stop cleanly
+            return await asyncio.start_unix_server(self.handle, where[0], limit=MAX_REQUEST)
+        return await asyncio.start_server(self.handle, *where, limit=MAX_REQUEST)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+async def stop_when_idle(server: BookServer, idle_timeout: float, stop):
+    """
+    Sets stop once the server has had no clients for idle_timeout seconds.
+    """
+    while not stop.is_set():
+        idle = time.monotonic() - server.last_active
+        if not server.connections and idle >= idle_timeout:
+            stop.set()
+            return
+        await asyncio.sleep(max(idle_timeout - idle, 0.1))
+
+
+async def serve(server: BookServer, address: str, ready=None, stop=None, idle_timeout=None):
+    """
+    Serves requests on address until stop, an asyncio.Event, is set, the process is sent
+    SIGTERM or the task is cancelled.
+
+    Args:
+        ready (callable): Called once the server is listening.
+        idle_timeout (float): If given, the server also stops once it has had no clients
+            for this many seconds.
+    """
+    if stop is None:
+        stop = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # Windows, or a loop outside the main thread
+    listener = await server.start(address)
+    if ready is not None:
+        ready()
+    watcher = None
+    if idle_timeout is not None:
+        server.last_active = time.monotonic()
+        watcher = asyncio.create_task(stop_when_idle(server, idle_timeout, stop))
+    async with listener:
+        try:
+            await stop.wait()
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            kind, *where = parse_address(address)
+            if kind == "unix" and os.path.exists(where[0]):
+                os.remove(where[0])  # before closing, so new clients start a new server instead
@@ -1,10 +1,11 @@
 from src.models.address_book import AddressBook
 from src.models.record import Record
 from src.utils.input_error import input_error
-from src.utils.command_parser import parse_book_command
+from src.utils.command_parser import parse_args, parse_book_command
+from src.utils.pager import pager, paging_options
 from colorama import Fore, Style
+from functools import lru_cache
 import re
-import argparse
 
 
 @input_error
@@ -17,7 +18,8 @@ def add_contact(args, book: AddressBook) -> str:
         book (AddressBook): The address book object to add the contact to.
 
     Returns:
-        str: A message indicating whether the contact was added or updated.
+        str: A message indicating whether the contact was added or updated, after the
+        result of adding each phone.
 
     Raises:
         ValueError: If no name is provided in the arguments.
@@ -37,12 +39,13 @@ def add_contact(args, book: AddressBook) -> str:
     phones = []
     email = None
     birthday = None
+    messages = []
     for arg in args[1:]:
         if arg.isdigit():
             if len(arg) == 10:
                 phones.append(arg)
             else:
-                print(f"{Fore.RED}Error adding phone {arg}: Phone number must be 10 digits.{Style.RESET_ALL}")
+                messages.append(f"{Fore.RED}Error adding phone {arg}: Phone number must be 10 digits.{Style.RESET_ALL}")
         elif re.fullmatch(r"[^@]+@[^@]+\.[^@]+", arg):
             email = arg
         elif re.fullmatch(r"\d{2}\.\d{2}\.\d{4}", arg):
@@ -58,16 +61,17 @@ def add_contact(args, book: AddressBook) -> str:
         message = "Contact added."
     for phone in phones:
         try:
-            print(record.add_phone(phone))
+            messages.append(record.add_phone(phone))
         except ValueError as e:
-            print(f"{Fore.RED}Error adding phone {phone}: {e}{Style.RESET_ALL}")
+            messages.append(f"{Fore.RED}Error adding phone {phone}: {e}{Style.RESET_ALL}")
     if email:
         record.add_email(email)
     if address:
         record.add_address(address)
     if birthday:
         record.add_birthday(birthday)
-    return f"{Fore.GREEN}{message} {name}{Style.RESET_ALL}"
+    messages.append(f"{Fore.GREEN}{message} {name}{Style.RESET_ALL}")
+    return "\n".join(messages)
 
 
 # PHONE COMMANDS
@@ -121,14 +125,40 @@ def delete_phone(args, book):
     return f"{Fore.YELLOW}Phone {data['phone']} deleted from {contact_name}.{Style.RESET_ALL}"
 
 
+@input_error
+def who_called(args, book: AddressBook) -> str:
+    """
+    Finds the contacts a phone number belongs to.
+
+    Args:
+        args (list): The phone number, which may be split into several parts.
+        book (AddressBook): The address book to look the number up in.
+
+    Returns:
+        str: The names of the contacts with that number.
+    """
+    if len(args) < 1:
+        raise ValueError("Please provide the phone number.")
+    phone = "".join(args)
+    records = book.find_by_phone(phone)
+    if not records:
+        return f"{Fore.RED}No contact has the number {phone}.{Style.RESET_ALL}"
+    names = ", ".join(record.name.value for record in records)
+    return f"{Fore.GREEN}{phone} belongs to {names}.{Style.RESET_ALL}"
+
+
 @input_error
 def search_contact(args, book):
     """
     Search for a contact in the address book based on the provided arguments.
 
+    Contacts whose names contain the text come first; after them come the contacts
+    whose names are within a few typos of it, closest first.
+
     Args:
         args (list): A list of arguments. If the list contains two elements, it is assumed to be the first and last name of the contact.
         If the list contains only one element, it is assumed to be the name of the contact.
+        `--max-distance N` sets the number of typos forgiven; 0 turns the typo search off.
         book (AddressBook): An instance of the AddressBook class representing the address book.
 
     Returns:
@@ -136,52 +166,75 @@ def search_contact(args, book):
         If no contact is found, a message indicating that no contact was found is returned.
 
     """
+    args, page, limit = paging_options(args)
+    max_distance = book.max_distance
+    if "--max-distance" in args:
+        position = args.index("--max-distance")
+        value = args[position + 1] if position + 1 < len(args) else ""
+        if not value.isdigit():
+            raise ValueError("--max-distance needs a number.")
+        max_distance = int(value)
+        del args[position:position + 2]
     # Check if the user provided a first and last name
     if len(args) < 1:
         raise ValueError("Please provide the search text.")
     name = " ".join(args)
 
     # Search for the contact in the address book
-    search_results = book.find_all(name)
+    search_results = [(0, record) for record in book.find_all(name)]
+    if max_distance:
+        exact = {record.name.value for _, record in search_results}
+        search_results += [
+            (distance, record)
+            for distance, record in book.find_similar(name, max_distance)
+            if record.name.value not in exact
+        ]
 
-    res = []
     # Check if the search results are empty
     if len(search_results) == 0:
-        res.append(f"{Fore.RED}No contact found with the name {name}.{Style.RESET_ALL}")
-        return "\n".join(res)
-
-    # Format the search results
-    res.append("=================")
-    res.append("= = = = = = = = =")
-    res.append("=================")
-    res.append(f"{Fore.GREEN}Search results - {len(search_results)}:{Style.RESET_ALL}")
-    res.append("=========")
-
-    for record in search_results:
-        contact_phones = (
-            ", ".join(phone.value for phone in record.phones)
-            if record.phones
-            else "No phone numbers"
-        )
+        return f"{Fore.RED}No contact found with the name {name}.{Style.RESET_ALL}"
+
+    header = "\n".join([
+        "=================",
+        "= = = = = = = = =",
+        "=================",
+        f"{Fore.GREEN}Search results - {len(search_results)}:{Style.RESET_ALL}",
+        "=========",
+        "",
+    ])
+    return pager.start(search_results, lambda number, result: _format_search_result(*result), page, limit, header)
+
+
+def _format_search_result(distance, record):
+    if not distance:
+        return _format_found_contact(record)
+    typos = "typo" if distance == 1 else "typos"
+    return f"{Fore.YELLOW}Close match, {distance} {typos} away:{Style.RESET_ALL}\n{_format_found_contact(record)}"
+
+
+def _format_found_contact(record):
+    contact_phones = (
+        ", ".join(phone.value for phone in record.phones)
+        if record.phones
+        else "No phone numbers"
+    )
 
-        contact_emails = record.email if record.email else "No emails"
-        contact_address = record.address if record.address else "No address"
-        contact_birthday = (
-            record.birthday.value.strftime("%d.%m.%Y")
-            if record.birthday
-            else "No birthday"
-        )
+    contact_emails = record.email if record.email else "No emails"
+    contact_address = record.address if record.address else "No address"
+    contact_birthday = (
+        record.birthday.value.strftime("%d.%m.%Y")
+        if record.birthday
+        else "No birthday"
+    )
 
-        contact_details = (
-            f"{Fore.LIGHTMAGENTA_EX}{Style.BRIGHT}Contact name:{Style.RESET_ALL}{Style.BRIGHT} {record.name}{Style.RESET_ALL}\n"
-            f"{Fore.GREEN}Phones:{Style.RESET_ALL} {contact_phones}\n"
-            f"{Fore.GREEN}Emails:{Style.RESET_ALL} {contact_emails}\n"
-            f"{Fore.GREEN}Birthday:{Style.RESET_ALL} {contact_birthday}\n"
-            f"{Fore.GREEN}Address:{Style.RESET_ALL}\n{contact_address}\n"
-            f"===+=========+==="
-        )
-        res.append(contact_details)
-    return "\n".join(res)
+    return (
+        f"{Fore.LIGHTMAGENTA_EX}{Style.BRIGHT}Contact name:{Style.RESET_ALL}{Style.BRIGHT} {record.name}{Style.RESET_ALL}\n"
+        f"{Fore.GREEN}Phones:{Style.RESET_ALL} {contact_phones}\n"
+        f"{Fore.GREEN}Emails:{Style.RESET_ALL} {contact_emails}\n"
+        f"{Fore.GREEN}Birthday:{Style.RESET_ALL} {contact_birthday}\n"
+        f"{Fore.GREEN}Address:{Style.RESET_ALL}\n{contact_address}\n"
+        f"===+=========+==="
+    )
 
 
 # EMAIL COMMANDS
@@ -242,30 +295,46 @@ def delete_email(args, book) -> str:
     return f"{Fore.YELLOW}Email deleted{Style.RESET_ALL}"
 
 
+def _format_listed_contact(number, record):
+    check_phones = f"{Fore.GREEN}Phones:{Style.RESET_ALL} {', '.join(phone.value for phone in record.phones)}\n" if record.phones else f"{Fore.MAGENTA}No phones{Style.RESET_ALL}\n"
+    check_address = f"{Fore.GREEN}Address:{Style.RESET_ALL}\n{record.address}\n" if record.address else f"{Fore.MAGENTA}No address{Style.RESET_ALL}\n"
+    check_email = f"{Fore.GREEN}Email:{Style.RESET_ALL}\n{record.email}\n" if record.email else f"{Fore.MAGENTA}No email{Style.RESET_ALL}\n"
+    check_birthday = f"{Fore.GREEN}Birthday:{Style.RESET_ALL}\n{record.birthday}\n" if record.birthday else f"{Fore.MAGENTA}No birthday{Style.RESET_ALL}\n"
+    return (
+        f"{Fore.LIGHTMAGENTA_EX}{Style.BRIGHT}{number}. Contact name:{Style.RESET_ALL}{Style.BRIGHT} {record.name}{Style.RESET_ALL}\n"
+        f"{check_phones}"
+        f"{check_email}"
+        f"{check_birthday}"
+        f"{check_address}"
+        f"{Fore.GREEN}-- -- -- -- -- --{Style.RESET_ALL}"
+    )
+
+
 @input_error
-def show_all(book):
-    if book.data:
-        all_records = f"===============================\n"
-        all_records += f"=====There are {len(book.data.values())} contacts=====\n"
-        all_records += f"===============================\n"
-        for index, record in enumerate(book.data.values()):
-            check_phones = f"{Fore.GREEN}Phones:{Style.RESET_ALL} {', '.join(phone.value for phone in record.phones)}\n" if record.phones else f"{Fore.MAGENTA}No phones{Style.RESET_ALL}\n"
-            check_address = f"{Fore.GREEN}Address:{Style.RESET_ALL}\n{record.address}\n" if record.address else f"{Fore.MAGENTA}No address{Style.RESET_ALL}\n"
-            check_email = f"{Fore.GREEN}Email:{Style.RESET_ALL}\n{record.email}\n" if record.email else f"{Fore.MAGENTA}No email{Style.RESET_ALL}\n"
-            check_birthday = f"{Fore.GREEN}Birthday:{Style.RESET_ALL}\n{record.birthday}\n" if record.birthday else f"{Fore.MAGENTA}No birthday{Style.RESET_ALL}\n"
-            all_records += (
-                f"{Fore.LIGHTMAGENTA_EX}{Style.BRIGHT}{index+1}. Contact name:{Style.RESET_ALL}{Style.BRIGHT} {record.name}{Style.RESET_ALL}\n"
-                f"{check_phones}"
-                f"{check_email}"
-                f"{check_birthday}"
-                f"{check_address}"
-                f"{Fore.GREEN}-- -- -- -- -- --{Style.RESET_ALL}\n"
-            )
-            
-        return all_records
-    else:
+def show_all(args, book):
+    """
+    Shows the contacts one page at a time; `more` shows the next page.
+
+    Args:
+        args (list): Optionally --page [N] and --limit [N].
+        book (AddressBook): The address book to list.
+    """
+    _, page, limit = paging_options(args)
+    names = list(book.data)  # only the keys; records are looked up when their page is shown
+    if not names:
         return f"{Fore.RED}No contacts saved.{Style.RESET_ALL}"
 
+    def render(number, name):
+        record = book.data.get(name)  # None if deleted since the listing started
+        return _format_listed_contact(number, record) if record is not None else None
+
+    header = (
+        f"===============================\n"
+        f"=====There are {len(names)} contacts=====\n"
+        f"===============================\n"
+    )
+    return pager.start(names, render, page, limit, header)
+
 
 @input_error
 def delete_contact(args, book):
@@ -429,3 +498,93 @@ def delete_address(args, book: AddressBook) -> str:
         return f"{Fore.RED}Record for {contact_name} not found.{Style.RESET_ALL}"
     record.delete_address()
     return f"{Fore.YELLOW}Address deleted{Style.RESET_ALL}"
+
+
+# Built on first use and kept, like the parsers of the note commands
+@lru_cache(maxsize=None)
+def _import_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import contacts from a file")
+    parser.add_argument("file", help="CSV, vCard or JSONL file")
+    parser.add_argument("--format", choices=["csv", "vcard", "jsonl"], help="Format of the file")
+    parser.add_argument("--workers", type=int, help="Number of worker processes")
+    parser.add_argument("--report", help="CSV file to write the rejected rows to")
+    return parser
+
+
+@lru_cache(maxsize=None)
+def _export_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export contacts to a file")
+    parser.add_argument("file", help="CSV, vCard or JSONL file, or - for the screen")
+    parser.add_argument("--format", choices=["csv", "vcard", "jsonl"], help="Format of the file")
+    return parser
+
+
+@input_error
+def import_contacts(args, book: AddressBook, checkpoint=None) -> str:
+    """
+    Imports contacts from a CSV, vCard or JSONL file.
+
+    Args:
+        args (list): The file name, then optionally --format, --workers and --report.
+        book (AddressBook): The address book to import the contacts into.
+        checkpoint (callable): Saves the whole book once the import is done or stops.
+
+    Returns:
+        str: A summary of the import and the first rejected rows.
+    """
+    from src.utils.importer import ImportReport, import_contacts as import_file  # loaded only for imports
+
+    try:
+        parsed = parse_args(_import_parser(), args)
+    except SystemExit:
+        raise ValueError(f"{Fore.RED}Please provide the file to import: import [file] --format [csv|vcard|jsonl]{Style.RESET_ALL}")
+
+    report = ImportReport()
+    try:
+        import_file(parsed.file, book, parsed.format, parsed.workers, report=report)
+    except OSError as e:
+        return f"{Fore.RED}Could not read {parsed.file}: {e.strerror}{Style.RESET_ALL}"
+    finally:
+        if checkpoint is not None and report.added + report.replaced:
+            checkpoint()  # the contacts added before a failure are kept too
+
+    result = f"{Fore.GREEN}{report}{Style.RESET_ALL}"
+    if report.errors:
+        if parsed.report:
+            report.write_errors(parsed.report)
+            result += f"\n{Fore.YELLOW}Rejected rows written to {parsed.report}.{Style.RESET_ALL}"
+        for line_number, error in report.errors[:10]:
+            result += f"\n{Fore.RED}Line {line_number}: {error}{Style.RESET_ALL}"
+        if len(report.errors) > 10:
+            result += f"\n{Fore.RED}... and {len(report.errors) - 10} more.{Style.RESET_ALL}"
+    return result
+
+
+@input_error
+def export_contacts(args, book: AddressBook) -> str:
+    """
+    Exports the contacts to a CSV, vCard or JSONL file, or to the screen with "-".
+
+    Args:
+        args (list): The file name, then optionally --format.
+        book (AddressBook): The address book to export.
+
+    Returns:
+        str: The number of contacts exported.
+    """
+    from src.utils.exporter import export_contacts as export_file  # loaded only for exports
+
+    try:
+        parsed = parse_args(_export_parser(), args)
+    except SystemExit:
+        raise ValueError(f"{Fore.RED}Please provide the file to export to: export [file] --format [csv|vcard|jsonl]{Style.RESET_ALL}")
+
+    try:
+        count = export_file(book, parsed.file, parsed.format)
+    except OSError as e:
+        return f"{Fore.RED}Could not write {parsed.file}: {e.strerror}{Style.RESET_ALL}"
+    return f"{Fore.GREEN}{count} contacts exported.{Style.RESET_ALL}"
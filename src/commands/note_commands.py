@@ -1,19 +1,61 @@
-import argparse
 from src.models.note_book import NoteBook
 from src.models.note import Note
+from src.utils.command_parser import parse_args
 from src.utils.input_error import input_error
+from src.utils.pager import pager, paging_options
 from colorama import Fore, Style
+from functools import lru_cache
 
 
-@input_error
-def add_note(args, notebook: NoteBook) -> str:
+# Parsers are built on first use and kept; building one costs more than running the command.
+# argparse is only loaded then, not at startup.
+@lru_cache(maxsize=None)
+def _add_note_parser():
+    import argparse
+
     parser = argparse.ArgumentParser(description="Add a new note")
     parser.add_argument('--title', required=True, help='Title of the note', nargs='+')
     parser.add_argument('--text', required=True, help='Text of the note', nargs='+')
     parser.add_argument('--tags', required=False, help='Tags for the note', nargs='+')
+    return parser
+
 
+@lru_cache(maxsize=None)
+def _add_note_tag_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Add a tag to a note")
+    parser.add_argument('--id', required=True, help='ID of the note', type=int)
+    parser.add_argument('--tag', required=True, help='Tag to add', type=str)
+    return parser
+
+
+@lru_cache(maxsize=None)
+def _delete_note_tag_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Delete a tag from a note")
+    parser.add_argument('--id', required=True, help='ID of the note', type=int)
+    parser.add_argument('--tag', required=True, help='Tag to delete', type=str)
+    return parser
+
+
+@lru_cache(maxsize=None)
+def _edit_note_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Edit a note")
+    parser.add_argument('--id', required=True, help='ID of the note', type=int)
+    parser.add_argument('--title', required=False, help='Title of the note', nargs='+')
+    parser.add_argument('--text', required=False, help='Text of the note', nargs='+')
+    return parser
+
+
+@input_error
+def add_note(args, notebook: NoteBook) -> str:
+    parser = _add_note_parser()
     try:
-        parsed = parser.parse_args(args)
+        parsed = parse_args(parser, args)
     except SystemExit:
         raise ValueError(f"{Fore.RED}Invalid input. Please provide the title and text of the note.{Style.RESET_ALL}")
 
@@ -41,12 +83,15 @@ def search_notes(args, notebook: NoteBook):
 
 
 @input_error
-def list_notes(notebook: NoteBook):
-    notes = notebook.get_list()
-    if notes:
-        result = f"{Fore.BLUE}List of notes:{Style.RESET_ALL}\n"
-        result += "\n".join(str(note) for note in notes)
-        return result
+def list_notes(args, notebook: NoteBook):
+    _, page, limit = paging_options(args)
+    note_ids = list(notebook.data)  # notes are looked up when their page is shown
+    if note_ids:
+        def render(number, note_id):
+            note = notebook.get_by_id(note_id)
+            return str(note) if note is not None else None
+
+        return pager.start(note_ids, render, page, limit, f"{Fore.BLUE}List of notes:{Style.RESET_ALL}\n")
     else:
         return f"{Fore.RED}No notes found.{Style.RESET_ALL}"
 
@@ -63,12 +108,9 @@ def get_note_by_id(args, notebook: NoteBook):
 
 @input_error
 def add_note_tag(args, notebook: NoteBook):
-    parser = argparse.ArgumentParser(description="Add a tag to a note")
-    parser.add_argument('--id', required=True, help='ID of the note', type=int)
-    parser.add_argument('--tag', required=True, help='Tag to add', type=str)
-
+    parser = _add_note_tag_parser()
     try:
-        parsed = parser.parse_args(args)
+        parsed = parse_args(parser, args)
     except SystemExit:
         raise ValueError(f"{Fore.RED}Invalid input. Please provide the note ID and tag to add.{Style.RESET_ALL}")
 
@@ -83,12 +125,9 @@ def add_note_tag(args, notebook: NoteBook):
 
 @input_error
 def delete_note_tag(args, notebook: NoteBook):
-    parser = argparse.ArgumentParser(description="Delete a tag from a note")
-    parser.add_argument('--id', required=True, help='ID of the note', type=int)
-    parser.add_argument('--tag', required=True, help='Tag to delete', type=str)
-
+    parser = _delete_note_tag_parser()
     try:
-        parsed = parser.parse_args(args)
+        parsed = parse_args(parser, args)
     except SystemExit:
         raise ValueError(f"{Fore.RED}Invalid input. Please provide the note ID and tag to delete.{Style.RESET_ALL}")
 
@@ -103,13 +142,9 @@ def delete_note_tag(args, notebook: NoteBook):
 
 @input_error
 def edit_note(args, notebook: NoteBook):
-    parser = argparse.ArgumentParser(description="Edit a note")
-    parser.add_argument('--id', required=True, help='ID of the note', type=int)
-    parser.add_argument('--title', required=False, help='Title of the note', nargs='+')
-    parser.add_argument('--text', required=False, help='Text of the note', nargs='+')
-
+    parser = _edit_note_parser()
     try:
-        parsed = parser.parse_args(args)
+        parsed = parse_args(parser, args)
     except SystemExit:
         raise ValueError(f"{Fore.RED}Invalid input. Please provide the note ID to edit.{Style.RESET_ALL}")
 
@@ -138,3 +173,29 @@ def delete_note(args, notebook: NoteBook):
         return f"{Fore.GREEN}Note {note_id} deleted successfully.{Style.RESET_ALL}"
     else:
         return f"{Fore.BLUE}Note {note_id} not found.{Style.RESET_ALL}"
+
+
+@lru_cache(maxsize=None)
+def _export_notes_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export notes to a file")
+    parser.add_argument("file", help="CSV or JSONL file, or - for the screen")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Format of the file")
+    return parser
+
+
+@input_error
+def export_notes(args, notebook: NoteBook):
+    from src.utils.exporter import export_notes as export_file  # loaded only for exports
+
+    try:
+        parsed = parse_args(_export_notes_parser(), args)
+    except SystemExit:
+        raise ValueError(f"{Fore.RED}Please provide the file to export to: export-notes [file] --format [csv|jsonl]{Style.RESET_ALL}")
+
+    try:
+        count = export_file(notebook, parsed.file, parsed.format)
+    except OSError as e:
+        return f"{Fore.RED}Could not write {parsed.file}: {e.strerror}{Style.RESET_ALL}"
+    return f"{Fore.GREEN}{count} notes exported.{Style.RESET_ALL}"
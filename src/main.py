@@ -1,4 +1,24 @@
-from src.cli.interface import main
+import os
+import sys
+from src.cli.options import get_options
+
+
+def main():
+    """
+    Starts the bot, or runs the command given on the command line on the daemon
+    without loading the bot's own code in this process.
+    """
+    options = get_options()
+    if options.command and not options.no_daemon and os.name == "posix":
+        from src.cli.client import FILE_COMMANDS
+        from src.cli.daemon import main_command
+
+        if options.command[0] not in FILE_COMMANDS:  # files are opened here, by the caller
+            sys.exit(main_command(options))
+    from src.cli.interface import main as main_bot
+
+    main_bot(options=options)
+
 
 if __name__ == "__main__":
     main()
@@ -1,34 +1,104 @@
-import pyap
-from src.models.field import Field
+from functools import lru_cache
+from src.models.field import Field, set_slot_state
+
+PARSE_CACHE_SIZE = 4096  # parsed addresses kept, most recently used first
+LAZY_PARSING = False  # keep the raw string and parse it only when the address is first read
+
+ADDRESS_KEYS = ("street", "city", "state", "postal_code", "country")
+
+
+def normalize_address(address: str) -> str:
+    return " ".join(address.split())
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(normalized_address: str) -> tuple:
+    import pyap  # slow to import, so only loaded when an address is parsed
+
+    parsed_address = pyap.parse(normalized_address, country='US')[0]
+    return (
+        parsed_address.street_number + " " + parsed_address.street_name,
+        parsed_address.city,
+        parsed_address.region1,
+        parsed_address.postal_code,
+        parsed_address.country_id,
+    )
+
+
+def parse_address(address: str) -> dict:
+    """ parses an address string into its parts, reusing earlier results for the same address """
+    return dict(zip(ADDRESS_KEYS, _parse(normalize_address(address))))
+
+
+def parse_stats() -> dict:
+    """ returns the hit and miss counters of the address parse cache """
+    info = _parse.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
 
 class Address(Field):
     """ creates dictionary with address details from provided string """
-    def __init__(self, address: str) -> dict:
-        self.__address = {}
-        self.address = address
+    # The parsed parts are kept as the tuple cached by _parse, shared by every
+    # Address of the same string, and turned into a dictionary when read.
+    __slots__ = ("__parts", "raw")
+
+    def __init__(self, address: str, lazy: bool = None) -> dict:
+        if LAZY_PARSING if lazy is None else lazy:
+            self.__parts = None  # parsed on first read
+            self.raw = address
+        else:
+            self.address = address
 
     @property
     def address(self):
-        return self.__address
+        return dict(zip(ADDRESS_KEYS, self._parts()))
 
     @address.setter
     def address(self, address):
-        self.__address = {}  # Reset the address dictionary before assigning new values
-        parsed_address = pyap.parse(address, country='US')[0]
-        self.__address["street"] = parsed_address.street_number + " " + parsed_address.street_name
-        self.__address["city"] = parsed_address.city
-        self.__address["state"] = parsed_address.region1
-        self.__address["postal_code"] = parsed_address.postal_code
-        self.__address["country"] = parsed_address.country_id
+        self.__parts = _parse(normalize_address(address))
+        self.raw = address
+
+    def _parts(self) -> tuple:
+        if self.__parts is None:
+            self.__parts = _parse(normalize_address(self.raw))
+        return self.__parts
+
+    @classmethod
+    def restore(cls, raw, parts):
+        """ rebuilds an already parsed address without running the parser again """
+        address = cls.__new__(cls)
+        address.__parts = tuple(parts[key] for key in ADDRESS_KEYS)
+        address.raw = raw
+        return address
+
+    def __setstate__(self, state):
+        if isinstance(state, dict) and "_Address__address" in state:  # pickled before __slots__
+            parts = state["_Address__address"]
+            state = {
+                "_Address__parts": tuple(parts[key] for key in ADDRESS_KEYS) if parts else None,
+                "raw": state.get("raw"),  # not kept by the oldest addresses
+            }
+        set_slot_state(self, state)
+
+    def to_text(self):
+        """ returns a string that parses back into this address """
+        if self.raw:
+            return self.raw
+        street, city, state, postal_code, _ = self._parts()
+        return f"{street}, {city}, {state} {postal_code}"
 
     def __str__(self):
-        if self.address:
+        try:
+            address = self.address
+        except IndexError:  # a lazily kept address that turned out not to parse
+            return f"{self.raw}\n(not recognized as a US address)\n"
+        if address:
             address_detail = (
-                f"street:      {self.address['street']}\n"
-                f"city:        {self.address['city']}\n"
-                f"postal code: {self.address['postal_code']}\n"
-                f"state:       {self.address['state']}\n"
-                f"country:     {self.address['country']}\n"
+                f"street:      {address['street']}\n"
+                f"city:        {address['city']}\n"
+                f"postal code: {address['postal_code']}\n"
+                f"state:       {address['state']}\n"
+                f"country:     {address['country']}\n"
             )
             return address_detail
         else:
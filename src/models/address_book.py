@@ -1,28 +1,203 @@
 from collections import UserDict
+from contextlib import contextmanager
 from datetime import datetime
+from src.models.birthday_index import BirthdayIndex
+from src.models.fuzzy_index import FuzzyNameIndex
+from src.models.name_index import TrigramIndex
+from src.models.phone_index import PhoneIndex
+from src.models.prefix_index import PrefixIndex
 from src.models.record import Record
 
+
 class AddressBook(UserDict):
+    kind = "contacts"
+    unique_phones = False  # refuse to give a phone number to two contacts
+    max_distance = 2  # typos forgiven by find_similar
+    _replaying = False  # changes committed before are being applied again
+
+    def __init__(self, *args, **kwargs):
+        self._listeners = []
+        self._fuzzy = None
+        super().__init__(*args, **kwargs)
+        self._reindex()
+
+    def __getstate__(self):
+        return {"data": self.data}  # the indexes are rebuilt on load
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._listeners = []
+        self._fuzzy = None
+        self.replace_data(self.data)
+
+    def replace_data(self, data):
+        """
+        Takes over the records of data, loaded elsewhere, keeping the listeners of the book.
+        """
+        self.data = data
+        for record in self.data.values():
+            record._book = self
+        self._reindex()
+
+    def _reindex(self):
+        """
+        Builds the search indexes from scratch.
+        """
+        self._names = TrigramIndex(self.data)
+        self._completions = PrefixIndex(self.data)
+        self._fuzzy = None  # built by the first find_similar
+        self._birthdays = BirthdayIndex(
+            (name, record.birthday.value) for name, record in self.data.items() if record.birthday
+        )
+        self._phones = PhoneIndex(
+            (name, [phone.value for phone in record.phones]) for name, record in self.data.items()
+        )
+
+    def _index(self, record):
+        """
+        Brings the indexes up to date with the record.
+        """
+        name = record.name.value
+        self._names.add(name)
+        if name not in self._completions:
+            self._completions.add(name)
+        self._birthdays.set(name, record.birthday.value if record.birthday else None)
+        self._phones.set(name, [phone.value for phone in record.phones])
+
+    def _unindex(self, record):
+        self._names.remove(record.name.value)
+        self._completions.remove(record.name.value)
+        self._birthdays.remove(record.name.value)
+        self._phones.remove(record.name.value)
+
+    def _phone_owners(self, phone) -> set:
+        return self._phones.owners(phone)
+
+    def _check_phone(self, record, phone):
+        """
+        Raises ValueError if phones are unique and phone already belongs to another contact.
+        """
+        if not self.unique_phones or self._replaying:
+            return
+        others = self._phone_owners(phone) - {record.name.value}
+        if others:
+            raise ValueError(f"Phone {phone} already belongs to {', '.join(sorted(others))}.")
+
+    def _check_address(self, address):
+        """
+        Raises ValueError if the book cannot keep address; any address it can be given is kept here.
+        """
+
+    def subscribe(self, listener):
+        """
+        Registers a callable that is told about every change made to the book or its records.
+
+        Args:
+            listener (callable): Called as listener(book_kind, op, key, args) after each change.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    @contextmanager
+    def replaying(self):
+        """
+        Applies changes that were already committed, by another session or before a
+        restart, without checking them against the settings of this one again: a phone
+        another session gave to two contacts stays with both.
+        """
+        self._replaying = True
+        try:
+            yield self
+        finally:
+            self._replaying = False
+
+    @contextmanager
+    def batch(self):
+        """
+        Holds back the change notifications while many records are added at once.
+        The listeners hear nothing about the batch, so the book is saved as a whole after it.
+        """
+        listeners, self._listeners = self._listeners, []
+        try:
+            yield self
+        finally:
+            self._listeners = listeners
+
+    def _emit(self, op, key, args=()):
+        for listener in self._listeners:
+            listener(self.kind, op, key, list(args))
+
+    def _record_changed(self, record, op, args):
+        self._index(record)
+        self._emit(op, record.name.value, args)
+
     def add_record(self, record):
+        for phone in record.phones:
+            self._check_phone(record, phone.value)
+        previous = self.data.get(record.name.value)
+        if previous is not None and previous is not record:
+            previous._book = None
+            self._unindex(previous)
+        record._book = self
         self.data[record.name.value] = record
+        self._index(record)
+        if self._fuzzy is not None:
+            self._fuzzy.add(record.name.value)
+        if self._listeners:
+            self._emit("add_record", record.name.value, [record.to_dict()])
 
     def find(self, name):
         if name in self.data:
             return self.data[name]
         raise KeyError(f"Record for {name} not found.")
 
+    def find_by_phone(self, phone):
+        """
+        Returns the contacts that have the phone number, sorted by name.
+        """
+        return [self.data[name] for name in sorted(self._phone_owners(phone))]
+
     def find_all(self, name):
-        # list of Record objects
-        matching_contacts: list[Record] = []
-        for record in self.data.values():
-            if name.lower() in record.name.value.lower():
-                matching_contacts.append(record)
-        matching_contacts.sort(key=lambda x: x.name.value)
+        # list of Record objects, narrowed down by the trigram index
+        matching_contacts: list[Record] = [self.data[match] for match in sorted(self._names.search(name))]
         return matching_contacts
 
+    def complete_name(self, prefix, limit=20):
+        """
+        Returns up to limit contact names starting with prefix, ignoring case, in order.
+        """
+        return self._completions.complete(prefix, limit)
+
+    def find_similar(self, name, max_distance=None):
+        """
+        Finds the contacts whose names are within a few typos of name.
+
+        The typo index is built on the first call and kept up to date by add_record
+        and delete from then on.
+
+        Args:
+            name (str): The name, or part of it, as typed.
+            max_distance (int): The most edits allowed; defaults to max_distance of the book.
+
+        Returns:
+            list: Tuples of the edit distance and the Record, closest first.
+        """
+        if max_distance is None:
+            max_distance = self.max_distance
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyNameIndex(self.data)
+        return [(distance, self.data[match]) for distance, match in self._fuzzy.search(name, max_distance)]
+
     def delete(self, name):
         if name in self.data:
-            del self.data[name]
+            record = self.data.pop(name)
+            record._book = None
+            self._unindex(record)
+            if self._fuzzy is not None:
+                self._fuzzy.remove(name)
+            self._emit("delete", name)
             return f"Record for {name} deleted."
         raise KeyError(f"Record for {name} not found.")
 
@@ -34,28 +209,10 @@ class AddressBook(UserDict):
             days (int): The number of days to consider for upcoming birthdays. Default is 7.
 
         Returns:
-            list: A list of tuples containing the name and date of upcoming birthdays.
+            list: A list of tuples containing the name and date of upcoming birthdays, sorted by date.
         """
         today = datetime.today().date()
-        upcoming_birthdays = []
-
-        for record in self.data.values():
-            if record.birthday:
-                birthday = record.birthday.value
-                birthday_this_year = datetime(
-                    today.year, birthday.month, birthday.day
-                ).date()
-
-                if birthday_this_year < today:
-                    birthday_this_year = datetime(
-                        today.year + 1, birthday.month, birthday.day
-                    ).date()
-
-                days_before_birthday = (birthday_this_year - today).days
-
-                if days_before_birthday <= days:
-                    upcoming_birthdays.append(
-                        (record.name.value, birthday_this_year.strftime("%d.%m.%Y"))
-                    )
-
-        return upcoming_birthdays
+        return [
+            (name, birthday.strftime("%d.%m.%Y"))
+            for birthday, name in self._birthdays.upcoming(days, today)
+        ]
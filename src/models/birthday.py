@@ -2,6 +2,8 @@ from src.models.field import Field
 from datetime import datetime, date
 
 class Birthday(Field):
+    __slots__ = ()
+
     def __init__(self, value):
         try:
             self.value = datetime.strptime(value, "%d.%m.%Y").date()
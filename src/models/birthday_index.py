@@ -0,0 +1,86 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+
+def is_leap_year(year: int) -> bool:
+    # calendar.isleap without importing calendar, which is slow to load
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def birthday_in_year(month: int, day: int, year: int) -> date:
+    """
+    Returns the date a birthday falls on in the given year.
+    People born on 29 February celebrate on 28 February in non-leap years.
+    """
+    if month == 2 and day == 29 and not is_leap_year(year):
+        day = 28
+    return date(year, month, day)
+
+
+def next_birthday(birthday, today):
+    """
+    Returns the date of the next birthday on or after today.
+    """
+    birthday_this_year = birthday_in_year(birthday.month, birthday.day, today.year)
+    if birthday_this_year < today:
+        birthday_this_year = birthday_in_year(birthday.month, birthday.day, today.year + 1)
+    return birthday_this_year
+
+
+class BirthdayIndex:
+    """
+    Contact names sorted by the (month, day) of their birthday.
+
+    The birthdays coming up in the next N days are found by bisecting to today's
+    position and walking forward, wrapping around the end of the year, so a query
+    only looks at the birthdays it returns.
+    """
+
+    def __init__(self, birthdays=()):
+        self._keys = []  # sorted (month, day, name)
+        self._by_name = {}  # name -> (month, day)
+        for name, birthday in birthdays:
+            self.set(name, birthday)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def set(self, name, birthday):
+        """
+        Files name under the month and day of birthday, or takes it out if birthday is None.
+        """
+        key = (birthday.month, birthday.day) if birthday else None
+        previous = self._by_name.get(name)
+        if previous == key:
+            return
+        if previous is not None:
+            del self._keys[bisect_left(self._keys, (*previous, name))]
+            del self._by_name[name]
+        if key is not None:
+            insort(self._keys, (*key, name))
+            self._by_name[name] = key
+
+    def remove(self, name):
+        self.set(name, None)
+
+    def upcoming(self, days: int, today: date = None) -> list:
+        """
+        Returns the birthdays from today to days days ahead, inclusive, sorted by date.
+
+        Returns:
+            list: A list of (date, name) tuples.
+        """
+        today = today or date.today()
+        if days < 0 or not self._keys:
+            return []
+        last_day = today + timedelta(days=days)
+        start = bisect_left(self._keys, (today.month, today.day))
+        upcoming = []
+        for position in range(len(self._keys)):
+            month, day, name = self._keys[(start + position) % len(self._keys)]
+            year = today.year if start + position < len(self._keys) else today.year + 1
+            birthday = birthday_in_year(month, day, year)
+            if birthday > last_day:
+                break
+            upcoming.append((birthday, name))
+        return upcoming
@@ -6,6 +6,7 @@ class Email(Field):
     """
     creates email if valid value provided <name@domain>
     """
+    __slots__ = ("__email",)
 
     def __init__(self, email: str) -> str:
         self.__email = None
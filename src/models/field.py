@@ -1,6 +1,49 @@
+def slot_names(cls) -> list:
+    """
+    Returns the attribute names stored in the __slots__ of cls and its base classes.
+    """
+    names = []
+    for klass in cls.__mro__:
+        for name in klass.__dict__.get("__slots__", ()):
+            if name in ("__weakref__", "__dict__"):
+                continue
+            if name.startswith("__") and not name.endswith("__"):
+                name = f"_{klass.__name__.lstrip('_')}{name}"  # private names are mangled
+            names.append(name)
+    return names
+
+
+def get_slot_state(obj, skip=()) -> dict:
+    return {
+        name: getattr(obj, name)
+        for name in slot_names(type(obj))
+        if name not in skip and hasattr(obj, name)
+    }
+
+
+def set_slot_state(obj, state):
+    """
+    Restores attributes from pickled state. Objects pickled before the class had
+    __slots__ carry their attributes as a plain __dict__, which is accepted too.
+    """
+    if isinstance(state, tuple):  # (instance dict, slot values)
+        instance_dict, slots = state
+        state = {**(instance_dict or {}), **(slots or {})}
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
 class Field:
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
     def __str__(self):
-        return str(self.value)
\ No newline at end of file
+        return str(self.value)
+
+    def __getstate__(self):
+        return get_slot_state(self)
+
+    def __setstate__(self, state):
+        set_slot_state(self, state)
@@ -3,19 +3,17 @@ from datetime import datetime
 from src.models.birthday import (
     Birthday,
 )  # this is the import is only here to fix the issue with old pickle files, that expect this class in this file
-
-class Field:
-    def __init__(self, value):
-        self.value = value
-
-    def __str__(self):
-        return str(self.value)
+from src.models.field import Field
 
 class Name(Field):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name)
 
 class Phone(Field):
+    __slots__ = ()
+
     def __init__(self, phone_number):
         if not re.fullmatch(r"\d{10}", phone_number):
             raise ValueError("Phone number must be 10 digits.")
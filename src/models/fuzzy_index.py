@@ -0,0 +1,113 @@
+from bisect import bisect_left, insort
+
+
+def allowed_typos(word: str, max_distance: int) -> int:
+    # Two typos in a three-letter word would match almost any short word
+    return max(0, min(max_distance, len(word) - 2))
+
+
+class FuzzyNameIndex:
+    """
+    Typo-tolerant index over contact names.
+
+    The lowercased words of the names are kept in a sorted list, which stands in for
+    a trie: the words starting with a prefix are a slice of it, found by bisection.
+    A query word is matched by walking that trie depth first while filling in one row
+    of the edit distance table per character, and a branch is left as soon as every
+    entry of its row is over the allowed distance. Only the prefixes within reach of
+    the query are visited, instead of comparing it with every word.
+
+    A query matches a name when each of its words is within the allowed number of
+    edits of some word of the name; the name's distance is the sum of those edits.
+    """
+
+    def __init__(self, names=()):
+        self._names = {}  # word -> the name it appears in, or a set of them if there are several
+        self._word_lists = {}  # name -> its words
+        for name in names:
+            self._add_words(name)
+        self._sorted = sorted(self._names)
+
+    def __len__(self):
+        return len(self._word_lists)
+
+    def add(self, name: str):
+        if name not in self._word_lists:
+            for word in self._add_words(name):
+                insort(self._sorted, word)
+
+    def _add_words(self, name: str) -> list:
+        """
+        Files name under its words and returns the words that were not indexed before.
+        """
+        new_words = []
+        words = self._word_lists[name] = tuple(set(name.lower().split()))
+        for word in words:
+            names = self._names.get(word)
+            if names is None:
+                self._names[word] = name  # most words belong to one name; a set is made for the others
+                new_words.append(word)
+            elif isinstance(names, set):
+                names.add(name)
+            else:
+                self._names[word] = {names, name}
+        return new_words
+
+    def remove(self, name: str):
+        for word in self._word_lists.pop(name, ()):
+            names = self._names[word]
+            if isinstance(names, set):
+                names.discard(name)
+                if len(names) == 1:
+                    self._names[word] = names.pop()
+            elif names == name:
+                del self._names[word]
+                del self._sorted[bisect_left(self._sorted, word)]
+
+    def names(self, word: str):
+        names = self._names.get(word, ())
+        return (names,) if isinstance(names, str) else names
+
+    def similar_words(self, query: str, max_distance: int):
+        """
+        Yields (distance, word) for every indexed word within max_distance edits of query.
+        """
+        words = self._sorted
+        stack = [("", 0, len(words), list(range(len(query) + 1)))]
+        while stack:
+            prefix, start, end, row = stack.pop()
+            depth = len(prefix)
+            if start < end and len(words[start]) == depth:  # the prefix is a word itself
+                if row[-1] <= max_distance:
+                    yield row[-1], words[start]
+                start += 1
+            while start < end:
+                char = words[start][depth]
+                branch_end = bisect_left(words, prefix + chr(ord(char) + 1), start, end)
+                next_row = [row[0] + 1]
+                for column, query_char in enumerate(query, 1):
+                    next_row.append(
+                        min(next_row[-1] + 1, row[column] + 1, row[column - 1] + (query_char != char))
+                    )
+                if min(next_row) <= max_distance:
+                    stack.append((prefix + char, start, branch_end, next_row))
+                start = branch_end
+
+    def search(self, query: str, max_distance: int) -> list:
+        """
+        Returns (distance, name) for the names that match query, closest first.
+        """
+        found = None
+        for word in set(query.lower().split()):
+            distances = {}  # name -> distance of its closest word from this query word
+            for distance, match in self.similar_words(word, allowed_typos(word, max_distance)):
+                for name in self.names(match):
+                    if distance < distances.get(name, max_distance + 1):
+                        distances[name] = distance
+            if found is None:
+                found = distances
+            else:
+                found = {name: total + distances[name] for name, total in found.items() if name in distances}
+            if not found:
+                return []
+        return sorted((distance, name) for name, distance in (found or {}).items() if distance <= max_distance)
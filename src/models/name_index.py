@@ -0,0 +1,64 @@
+from collections import defaultdict
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Substring index over contact names.
+
+    Every normalized (lowercased) name is filed under each of its three-character
+    substrings. A query of three or more characters can only match names that contain
+    all of its trigrams, so only the names filed under its rarest trigram are checked.
+    Shorter queries fall back to checking every name.
+    """
+
+    def __init__(self, names=()):
+        self._postings = defaultdict(set)  # trigram -> names containing it
+        self._normalized = {}  # name -> lowercased name
+        for name in names:
+            self.add(name)
+
+    def __len__(self):
+        return len(self._normalized)
+
+    def add(self, name: str):
+        if name in self._normalized:
+            return
+        normalized = name.lower()
+        self._normalized[name] = normalized
+        for trigram in trigrams(normalized):
+            self._postings[trigram].add(name)
+
+    def remove(self, name: str):
+        normalized = self._normalized.pop(name, None)
+        if normalized is None:
+            return
+        for trigram in trigrams(normalized):
+            names = self._postings[trigram]
+            names.discard(name)
+            if not names:
+                del self._postings[trigram]
+
+    def search(self, query: str) -> list:
+        """
+        Returns the names that contain query, ignoring case, in no particular order.
+        """
+        query = query.lower()
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return [name for name, normalized in self._normalized.items() if query in normalized]
+
+        candidates = None
+        for trigram in query_trigrams:
+            names = self._postings.get(trigram)
+            if not names:
+                return []
+            if candidates is None or len(names) < len(candidates):
+                candidates = names
+        if len(query_trigrams) == 1:
+            return list(candidates)  # the query is the trigram itself
+        normalized = self._normalized
+        return [name for name in candidates if query in normalized[name]]
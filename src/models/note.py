@@ -1,5 +1,11 @@
+from src.models.field import get_slot_state, set_slot_state
+
+
 class Note:
+    __slots__ = ("id", "title", "text", "tags", "_book", "__weakref__")
+
     def __init__(self, note_id: int, title: str, text: str, tags=None):
+        self._book = None  # NoteBook the note belongs to, told about every change
         if tags is None:
             tags = []
         self.id = note_id
@@ -7,6 +13,25 @@ class Note:
         self.text = text
         self.tags = tags
 
+    def _changed(self, op, *args):
+        if self._book is not None:
+            self._book._note_changed(self, op, args)
+
+    def __getstate__(self):
+        # the book re-attaches its notes when it is unpickled
+        return get_slot_state(self, skip=("_book",))
+
+    def __setstate__(self, state):
+        self._book = None
+        set_slot_state(self, state)
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "text": self.text, "tags": list(self.tags)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Note":
+        return cls(data["id"], data["title"], data["text"], list(data.get("tags") or []))
+
     def get_id(self):
         return self.id
 
@@ -15,13 +40,23 @@ class Note:
         tags = ", ".join(self.tags)
         return f"{self.id}. {self.title}: {short_text} [{tags}]"
 
+    def edit(self, title=None, text=None):
+        if title:
+            self.title = title
+        if text:
+            self.text = text
+        self._changed("edit", title, text)
+        return True
+
     def add_tag(self, tag):
         self.tags.append(tag)
+        self._changed("add_tag", tag)
         return True
 
     def delete_tag(self, tag):
         if tag in self.tags:
             self.tags.remove(tag)
+            self._changed("delete_tag", tag)
             return True
         return False
 
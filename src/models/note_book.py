@@ -1,8 +1,138 @@
+from bisect import bisect_left
 from collections import UserDict
+from contextlib import contextmanager
 import re
+from src.models.note_index import NoteIndex
+from src.models.prefix_index import PrefixIndex
 
 
 class NoteBook(UserDict):
+    kind = "notes"
+
+    def __init__(self, *args, **kwargs):
+        self._listeners = []
+        super().__init__(*args, **kwargs)
+        self._reindex()
+
+    def __getstate__(self):
+        return {"data": self.data}  # the index is rebuilt on load
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._listeners = []
+        self.replace_data(self.data)
+
+    def replace_data(self, data):
+        """
+        Takes over the notes of data, loaded elsewhere, keeping the listeners of the book.
+        """
+        self.data = data
+        for note in self.data.values():
+            note._book = self
+        self._reindex()
+
+    def _reindex(self):
+        """
+        Builds the search index from scratch.
+        """
+        self._text_index = NoteIndex(self.data.values())
+        self._max_id = max(self.data, default=0)
+        self._ids = sorted(self.data)  # for completing IDs
+        self._note_tags = {note_id: tuple(note.tags) for note_id, note in self.data.items() if note.tags}
+        self._tags = PrefixIndex(tag for tags in self._note_tags.values() for tag in tags)
+
+    def _index(self, note):
+        note_id = note.get_id()
+        self._text_index.add(note)
+        if note_id > self._max_id:
+            self._max_id = note_id
+        position = bisect_left(self._ids, note_id)
+        if position == len(self._ids) or self._ids[position] != note_id:
+            self._ids.insert(position, note_id)
+        self._set_tags(note_id, tuple(note.tags))
+
+    def _unindex(self, note):
+        note_id = note.get_id()
+        self._text_index.remove(note_id)
+        if note_id == self._max_id:
+            self._max_id = max(self.data, default=0)  # only when the newest note goes
+        position = bisect_left(self._ids, note_id)
+        if position < len(self._ids) and self._ids[position] == note_id:
+            del self._ids[position]
+        self._set_tags(note_id, ())
+
+    def _set_tags(self, note_id, tags):
+        previous = self._note_tags.get(note_id, ())
+        if tags == previous:
+            return
+        for tag in previous:
+            self._tags.remove(tag)
+        for tag in tags:
+            self._tags.add(tag)
+        if tags:
+            self._note_tags[note_id] = tags
+        else:
+            del self._note_tags[note_id]
+
+    def complete_id(self, prefix, limit=20):
+        """
+        Returns up to limit note IDs whose digits start with prefix, smallest first.
+
+        The IDs starting with the digits of prefix fill one range of numbers per length,
+        each of them found by bisection in the sorted IDs.
+        """
+        ids = self._ids
+        if not prefix:
+            return ids[:limit]
+        if not prefix.isdigit() or prefix.startswith("0"):
+            return []
+        matches = []
+        low, high = int(prefix), int(prefix) + 1
+        while ids and low <= ids[-1] and len(matches) < limit:
+            position = bisect_left(ids, low)
+            while position < len(ids) and ids[position] < high and len(matches) < limit:
+                matches.append(ids[position])
+                position += 1
+            low, high = low * 10, high * 10
+        return matches
+
+    def complete_tag(self, prefix, limit=20):
+        """
+        Returns up to limit tags in use starting with prefix, ignoring case, in order.
+        """
+        return self._tags.complete(prefix, limit)
+
+    def subscribe(self, listener):
+        """
+        Registers a callable that is told about every change made to the book or its notes.
+
+        Args:
+            listener (callable): Called as listener(book_kind, op, key, args) after each change.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self._listeners.remove(listener)
+
+    @contextmanager
+    def batch(self):
+        """
+        Holds back the change notifications while many notes are changed at once.
+        """
+        listeners, self._listeners = self._listeners, []
+        try:
+            yield self
+        finally:
+            self._listeners = listeners
+
+    def _emit(self, op, key, args=()):
+        for listener in self._listeners:
+            listener(self.kind, op, key, list(args))
+
+    def _note_changed(self, note, op, args):
+        self._index(note)
+        self._emit(op, note.get_id(), args)
+
     def generate_id(self):
         """
         Generates a unique ID for a new entry in the note book.
@@ -10,43 +140,79 @@ class NoteBook(UserDict):
         Returns:
             int: The generated ID.
         """
-        return max(self.data.keys(), default=0) + 1
+        return self._max_id + 1
 
     def add_record(self, note):
+        previous = self.data.get(note.get_id())
+        if previous is not None and previous is not note:
+            previous._book = None
+            self._unindex(previous)
+        note._book = self
         self.data[note.get_id()] = note
+        self._index(note)
+        if self._listeners:
+            self._emit("add_record", note.get_id(), [note.to_dict()])
 
-    def search(self, needle):
+    def search(self, needle, limit=20):
         """
-        Search for notes that match the given needle.
+        Search for notes that match the given needle, best matches first.
+
+        Notes are ranked with BM25 over the words of their titles, text and tags;
+        words in the title weigh the most.
 
         Args:
-            needle (str): The search term to match against note titles, text, and tags.
+            needle (str): The search words to match against note titles, text, and tags.
+            limit (int): The maximum number of results, or None for all of them.
 
         Returns:
             list: A list of strings representing the matching notes, including their IDs, titles, and snippets.
         """
+        ranked, terms = self._text_index.search(needle, limit)
+        if not ranked:
+            return []
+        # Words are indexed lowercased, so find them in the notes case-insensitively
+        pattern = re.compile(
+            r"(?<!\w)(?:" + "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True)) + ")",
+            re.IGNORECASE,
+        )
+        results = []
+        for note_id, _ in ranked:
+            note = self.data[note_id]
+            results.append(self._format_match(note, pattern) or f'{note_id}. "{note.title}"')
+        return results
+
+    def _substring_search(self, needle, notes):
+        """
+        Returns the notes that contain needle as it is, in the order they are given.
+        """
         pattern = re.compile(re.escape(needle), re.IGNORECASE)
         results = []
-        for note in self.data.values():
-            title_match = pattern.search(note.title)
-            text_match = pattern.search(note.text)
-            tags_match = pattern.search(" ".join(note.tags))
-            snippet = ""
-            if title_match:
-                snippet = self.__get_snippet(
-                    note.title, title_match.start(), 30, "title"
-                )
-            elif text_match:
-                snippet = self.__get_snippet(note.text, text_match.start(), 30, "text")
-            elif tags_match:
-                snippet = self.__get_snippet(
-                    " ".join(note.tags), tags_match.start(), 30, "tags"
-                )
-
-            if snippet:
-                results.append(f'{note.get_id()}. "{note.title}" ({snippet})')
+        for note in notes:
+            result = self._format_match(note, pattern)
+            if result:
+                results.append(result)
         return results
 
+    def _format_match(self, note, pattern):
+        title_match = pattern.search(note.title)
+        text_match = pattern.search(note.text)
+        tags_match = pattern.search(" ".join(note.tags))
+        snippet = ""
+        if title_match:
+            snippet = self.__get_snippet(
+                note.title, title_match.start(), 30, "title"
+            )
+        elif text_match:
+            snippet = self.__get_snippet(note.text, text_match.start(), 30, "text")
+        elif tags_match:
+            snippet = self.__get_snippet(
+                " ".join(note.tags), tags_match.start(), 30, "tags"
+            )
+
+        if snippet:
+            return f'{note.get_id()}. "{note.title}" ({snippet})'
+        return None
+
     def get_list(self):
         return list(self.data.values())
 
@@ -57,17 +223,16 @@ class NoteBook(UserDict):
         if note_id not in self.data:
             return False
 
-        if title:
-            self.data[note_id].title = title
-        if text:
-            self.data[note_id].text = text
-        return True
+        return self.data[note_id].edit(title, text)
 
     def delete(self, note_id):
         if note_id not in self.data:
             return False
 
-        del self.data[note_id]
+        note = self.data.pop(note_id)
+        note._book = None
+        self._unindex(note)
+        self._emit("delete", note_id)
         return True
 
     def delete_tag(self, note_id, tag):
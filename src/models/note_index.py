@@ -0,0 +1,114 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall(text.lower())
+
+
+class NoteIndex:
+    """
+    Inverted index over note titles, texts and tags, ranked with BM25.
+
+    Every term maps to the notes containing it with a weighted term frequency:
+    title and tag words count more than words in the text. Notes are re-indexed
+    whenever they change, so a search only touches the postings of its terms.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MAX_PREFIX_TERMS = 50  # terms a query word without exact hits expands to
+
+    def __init__(self, notes=(), title_boost: float = 3.0, tag_boost: float = 2.0):
+        self.title_boost = title_boost
+        self.tag_boost = tag_boost
+        self._postings = {}  # term -> {note id: weighted term frequency}
+        self._doc_terms = {}  # note id -> tuple of its terms, the weights live in the postings
+        self._doc_lengths = {}  # note id -> weighted length
+        self._total_length = 0.0
+        self._terms = []  # every indexed term, sorted, for prefix lookups
+        for note in notes:
+            self.add(note)
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, note):
+        self.remove(note.id)
+        weights = Counter()
+        for term in tokenize(note.title):
+            weights[term] += self.title_boost
+        for term in tokenize(note.text):
+            weights[term] += 1.0
+        for tag in note.tags:
+            for term in tokenize(tag):
+                weights[term] += self.tag_boost
+
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._terms, term)
+            postings[note.id] = weight
+        length = sum(weights.values())
+        self._doc_terms[note.id] = tuple(weights)
+        self._doc_lengths[note.id] = length
+        self._total_length += length
+
+    def remove(self, note_id):
+        terms = self._doc_terms.pop(note_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[note_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+        self._total_length -= self._doc_lengths.pop(note_id)
+
+    def _expand(self, term: str) -> list:
+        if term in self._postings:
+            return [term]
+        start = bisect_left(self._terms, term)
+        expanded = []
+        for candidate in self._terms[start:start + self.MAX_PREFIX_TERMS]:
+            if not candidate.startswith(term):
+                break
+            expanded.append(candidate)
+        return expanded
+
+    def search(self, query: str, limit: int = None):
+        """
+        Ranks the notes matching any word of query.
+
+        Query words without an exact match also match the words they are a prefix of.
+
+        Returns:
+            tuple: A list of (note id, score) pairs, best first, and the set of matched terms.
+        """
+        count = len(self._doc_terms)
+        if not count:
+            return [], set()
+        average_length = self._total_length / count or 1.0
+        scores = {}
+        matched_terms = set()
+        for word in set(tokenize(query)):
+            for term in self._expand(word):
+                matched_terms.add(term)
+                postings = self._postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for note_id, tf in postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self._doc_lengths[note_id] / average_length)
+                    scores[note_id] = scores.get(note_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+
+        if limit is None:
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked, matched_terms
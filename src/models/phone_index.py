@@ -0,0 +1,48 @@
+def normalize_phone(phone: str) -> str:
+    """
+    Reduces a phone number to the 10 digits it is stored with,
+    so caller IDs like "+1 (012) 345-6789" are found too.
+    """
+    digits = "".join(char for char in str(phone) if char.isdigit())
+    return digits[-10:]
+
+
+class PhoneIndex:
+    """
+    Reverse lookup from phone numbers to the names of the contacts that have them.
+    """
+
+    def __init__(self, records=()):
+        self._owners = {}  # phone -> set of names
+        self._phones = {}  # name -> set of phones
+        for name, phones in records:
+            self.set(name, phones)
+
+    def __len__(self):
+        return len(self._owners)
+
+    def set(self, name, phones):
+        """
+        Makes phones the numbers filed under name.
+        """
+        phones = set(phones)
+        previous = self._phones.get(name, set())
+        if phones == previous:
+            return
+        for phone in previous - phones:
+            owners = self._owners[phone]
+            owners.discard(name)
+            if not owners:
+                del self._owners[phone]
+        for phone in phones - previous:
+            self._owners.setdefault(phone, set()).add(name)
+        if phones:
+            self._phones[name] = phones
+        else:
+            self._phones.pop(name, None)
+
+    def remove(self, name):
+        self.set(name, ())
+
+    def owners(self, phone) -> set:
+        return self._owners.get(normalize_phone(phone), set())
@@ -0,0 +1,55 @@
+from bisect import bisect_left, insort
+
+
+class PrefixIndex:
+    """
+    Sorted list of words for completing prefixes, ignoring case.
+
+    The words starting with a prefix sit next to each other in the list, so they are
+    found by bisection and reading the run that follows, however long the list is.
+    Words added more than once are counted, and leave the list only when removed as
+    many times.
+    """
+
+    def __init__(self, words=()):
+        self._counts = {}
+        for word in words:
+            self._counts[word] = self._counts.get(word, 0) + 1
+        self._sorted = sorted(self._counts, key=str.lower)
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def __contains__(self, word):
+        return word in self._counts
+
+    def add(self, word: str):
+        count = self._counts.get(word, 0)
+        self._counts[word] = count + 1
+        if not count:
+            insort(self._sorted, word, key=str.lower)
+
+    def remove(self, word: str):
+        count = self._counts.get(word, 0)
+        if count > 1:
+            self._counts[word] = count - 1
+        elif count:
+            del self._counts[word]
+            lower = word.lower()
+            position = bisect_left(self._sorted, lower, key=str.lower)
+            while self._sorted[position] != word:  # words that differ only in case
+                position += 1
+            del self._sorted[position]
+
+    def complete(self, prefix: str, limit: int = 20) -> list:
+        """
+        Returns up to limit words starting with prefix, in order.
+        """
+        prefix = prefix.lower()
+        words = self._sorted
+        position = bisect_left(words, prefix, key=str.lower)
+        matches = []
+        while position < len(words) and len(matches) < limit and words[position].lower().startswith(prefix):
+            matches.append(words[position])
+            position += 1
+        return matches
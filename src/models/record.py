@@ -3,25 +3,71 @@ from src.models.fields import Name, Phone
 from src.models.email_ import Email
 from src.models.address import Address
 from src.models.birthday import Birthday
+from src.models.field import get_slot_state, set_slot_state
 from colorama import Fore, Style
 
 class Record:
+    __slots__ = ("name", "address", "phones", "email", "birthday", "_book", "__weakref__")
+
     def __init__(self, name, address=None, phones=None, email=None, birthday=None):
+        self._book = None  # AddressBook the record belongs to, told about every change
         self.name = Name(name)
         self.address = Address(address) if address else None
         self.phones = phones if phones else []
         self.email = Email(email) if email else None
         self.birthday = Birthday(birthday) if birthday else None
 
+    def _changed(self, op, *args):
+        if self._book is not None:
+            self._book._record_changed(self, op, args)
+
+    def __getstate__(self):
+        # the book re-attaches its records when it is unpickled
+        return get_slot_state(self, skip=("_book",))
+
+    def __setstate__(self, state):
+        self._book = None
+        set_slot_state(self, state)
+
+    def _has_phone(self, phone) -> bool:
+        if self._book is not None:
+            return self.name.value in self._book._phone_owners(phone)
+        return any(p.value == phone for p in self.phones)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the record as plain data that from_dict can rebuild it from.
+        """
+        return {
+            "name": self.name.value,
+            "phones": [phone.value for phone in self.phones],
+            "email": self.email.email if self.email else None,
+            "birthday": self.birthday.value.strftime("%d.%m.%Y") if self.birthday else None,
+            "address": self.address.to_text() if self.address else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Record":
+        phones = [Phone(phone) for phone in data.get("phones") or []]
+        record = cls(data["name"], None, phones, data.get("email"), data.get("birthday"))
+        if data.get("address"):
+            # a stored address was accepted once, maybe without parsing it: it is parsed when first shown
+            record.address = Address(data["address"], lazy=True)
+        return record
+
     def add_phone(self, phone):
         new_phone = Phone(str(phone))
-        if any(p.value == new_phone.value for p in self.phones):
+        if self._has_phone(new_phone.value):
             return f"{Fore.MAGENTA}Phone {phone} already exists for {self.name.value}.{Style.RESET_ALL}"
+        if self._book is not None:
+            self._book._check_phone(self, new_phone.value)
         self.phones.append(new_phone)
+        self._changed("add_phone", new_phone.value)
         return f"{Fore.GREEN}Phone {phone} added to {self.name.value}.{Style.RESET_ALL}"
 
     def add_email(self, email: str) -> str:
         self.email = Email(email)
+        self._changed("add_email", email)
         return f"Email {email} added to {self.name.value}."
 
     def show_email(self) -> str:
@@ -29,30 +75,42 @@ class Record:
 
     def change_email(self, new_email: str) -> None:
         self.email = Email(new_email)
+        self._changed("change_email", new_email)
         return "Email updated"
 
     def delete_email(self) -> None:
         self.email = None
+        self._changed("delete_email")
 
     def add_birthday(self, birthday):
         self.birthday = Birthday(birthday)
+        self._changed("add_birthday", birthday)
         return f"Birthday {birthday} added to {self.name.value}."
 
-    def add_address(self, address: str) -> str:
+    def add_address(self, address: str, lazy: bool = None) -> str:
         if not address:
             raise ValueError("No address provided.")
-        self.address = Address(address)
+        self.address = self._new_address(address, lazy)
+        self._changed("add_address", address)
         return f"Address added to {self.name.value}"
 
     def show_address(self) -> str:
         return self.address
 
-    def change_address(self, new_address: str) -> None:
-        self.address = Address(new_address)
+    def change_address(self, new_address: str, lazy: bool = None) -> None:
+        self.address = self._new_address(new_address, lazy)
+        self._changed("change_address", new_address)
         return f"Address for {self.name.value} updated"
 
+    def _new_address(self, address: str, lazy: bool = None) -> Address:
+        new_address = Address(address, lazy)
+        if self._book is not None:
+            self._book._check_address(new_address)
+        return new_address
+
     def delete_address(self) -> None:
         self.address = None
+        self._changed("delete_address")
 
     def __str__(self):
         phones = "; ".join(p.value for p in self.phones)
@@ -71,17 +129,26 @@ class Record:
 
     def change_birthday(self, new_birthday: str) -> None:
         self.birthday = Birthday(new_birthday)
+        self._changed("change_birthday", new_birthday)
 
     def change_phone(self, old_phone: str, new_phone: str) -> None:
+        if not self._has_phone(old_phone):
+            raise ValueError(f"Phone {old_phone} not found for {self.name.value}")
+        if self._book is not None:
+            self._book._check_phone(self, new_phone)
         for phone in self.phones:
             if phone.value == old_phone:
                 phone.value = new_phone
+                self._changed("change_phone", old_phone, new_phone)
                 return f"{Fore.YELLOW}Phone {old_phone} changed to {new_phone}.{Style.RESET_ALL}"
         raise ValueError(f"Phone {old_phone} not found for {self.name.value}")
 
     def delete_phone(self, phone: str) -> None:
+        if not self._has_phone(phone):
+            raise ValueError(f"Phone {phone} not found for {self.name.value}")
         for p in self.phones:
             if p.value == phone:
                 self.phones.remove(p)
+                self._changed("delete_phone", phone)
                 return
         raise ValueError(f"Phone {phone} not found for {self.name.value}")
@@ -0,0 +1,437 @@
+import json
+import sqlite3
+import weakref
+from collections.abc import MutableMapping
+from datetime import date, timedelta
+from src.models.address import Address
+from src.models.address_book import AddressBook
+from src.models.birthday_index import is_leap_year, next_birthday
+from src.models.fields import Phone
+from src.models.fuzzy_index import FuzzyNameIndex
+from src.models.note import Note
+from src.models.note_book import NoteBook
+from src.models.phone_index import normalize_phone
+from src.models.record import Record
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    name TEXT PRIMARY KEY,
+    name_lower TEXT NOT NULL,
+    email TEXT,
+    birthday TEXT,
+    birth_md INTEGER,
+    address TEXT,
+    address_parts TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_name_lower ON contacts (name_lower);
+CREATE INDEX IF NOT EXISTS contacts_email ON contacts (email);
+CREATE INDEX IF NOT EXISTS contacts_birth_md ON contacts (birth_md);
+
+CREATE TABLE IF NOT EXISTS phones (
+    name TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    PRIMARY KEY (name, position)
+);
+CREATE INDEX IF NOT EXISTS phones_phone ON phones (phone);
+
+CREATE TABLE IF NOT EXISTS contact_words (
+    word TEXT NOT NULL,
+    name TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS contact_words_word ON contact_words (word);
+CREATE INDEX IF NOT EXISTS contact_words_name ON contact_words (name);
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    text TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    search_text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_tags (
+    tag TEXT NOT NULL,
+    note_id INTEGER NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+    tag_lower TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag ON note_tags (tag);
+CREATE INDEX IF NOT EXISTS note_tags_note_id ON note_tags (note_id);
+"""
+
+# Run once the tables have the columns added since they were first created
+INDEXES = """
+CREATE INDEX IF NOT EXISTS note_tags_tag_lower ON note_tags (tag_lower, tag);
+"""
+
+
+def connect(filename: str) -> sqlite3.Connection:
+    """
+    Opens the database, creating the tables and indexes if they don't exist yet.
+    The connection may be committed from the autosave thread.
+    """
+    connection = sqlite3.connect(filename, check_same_thread=False)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(SCHEMA)
+    _upgrade(connection)
+    connection.executescript(INDEXES)
+    return connection
+
+
+def _name_words(name: str) -> set:
+    return set(name.lower().split())  # the words FuzzyNameIndex files a name under
+
+
+def _upgrade(connection: sqlite3.Connection):
+    """
+    Fills in the columns and tables that databases created by older versions lack, from
+    the other ones. Lowercased in Python, since SQLite's lower() only knows ASCII.
+    """
+    if connection.execute("SELECT 1 FROM contacts").fetchone() and not connection.execute(
+        "SELECT 1 FROM contact_words"
+    ).fetchone():
+        with connection:
+            connection.executemany(
+                "INSERT INTO contact_words VALUES (?, ?)",
+                [(word, name) for (name,) in connection.execute("SELECT name FROM contacts") for word in _name_words(name)],
+            )
+    columns = {row[1] for row in connection.execute("PRAGMA table_info(note_tags)")}
+    if "tag_lower" not in columns:
+        with connection:
+            connection.execute("ALTER TABLE note_tags ADD COLUMN tag_lower TEXT NOT NULL DEFAULT ''")
+            connection.executemany(
+                "UPDATE note_tags SET tag_lower = ? WHERE rowid = ?",
+                [(tag.lower(), rowid) for rowid, tag in connection.execute("SELECT rowid, tag FROM note_tags")],
+            )
+
+
+class SQLiteRows(MutableMapping):
+    """
+    Dictionary-like view of a table that builds the objects only when they are read.
+
+    Objects that are still referenced are handed out again instead of being rebuilt,
+    so changes made through one of them are seen through the others.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, owner):
+        self.connection = connection
+        self.owner = owner  # book the objects report their changes to
+        self._live = weakref.WeakValueDictionary()
+
+    def __getitem__(self, key):
+        item = self._live.get(key)
+        if item is None:
+            row = self.connection.execute(self.SELECT_ONE, (key,)).fetchone()
+            if row is None:
+                raise KeyError(key)
+            item = self._live[key] = self._build(row)
+            item._book = self.owner
+        return item
+
+    def __setitem__(self, key, item):
+        self.save(item)
+        self._live[key] = item
+
+    def __delitem__(self, key):
+        if self.connection.execute(self.DELETE, (key,)).rowcount == 0:
+            raise KeyError(key)
+        self._live.pop(key, None)
+
+    def __contains__(self, key):
+        return self.connection.execute(self.EXISTS, (key,)).fetchone() is not None
+
+    def __iter__(self):
+        for (key,) in self.connection.execute(self.SELECT_KEYS):
+            yield key
+
+    def __len__(self):
+        return self.connection.execute(self.COUNT).fetchone()[0]
+
+    def select(self, where: str = "", params=()):
+        """
+        Yields the objects of the rows matching the where clause, building them one at a time.
+        """
+        for row in self.connection.execute(self.SELECT_ALL + where, params):
+            item = self._live.get(row[0])
+            if item is None:
+                item = self._live[row[0]] = self._build(row)
+                item._book = self.owner
+            yield item
+
+    def values(self):
+        return self.select()
+
+
+def _address_parts(address):
+    """
+    Returns the parts of address as JSON, or None if it has none or they do not parse.
+    """
+    if not address:
+        return None
+    try:
+        return json.dumps(address.address)
+    except IndexError:  # an address kept without parsing, which pyap does not recognize
+        return None
+
+
+class SQLiteRecords(SQLiteRows):
+    SELECT_ALL = "SELECT name, email, birthday, address, address_parts FROM contacts "
+    SELECT_ONE = SELECT_ALL + "WHERE name = ?"
+    SELECT_KEYS = "SELECT name FROM contacts"
+    EXISTS = "SELECT 1 FROM contacts WHERE name = ?"
+    DELETE = "DELETE FROM contacts WHERE name = ?"
+    COUNT = "SELECT COUNT(*) FROM contacts"
+
+    def _build(self, row) -> Record:
+        name, email, birthday, address, address_parts = row
+        phones = [
+            Phone(phone)
+            for (phone,) in self.connection.execute(
+                "SELECT phone FROM phones WHERE name = ? ORDER BY position", (name,)
+            )
+        ]
+        record = Record(name, None, phones, email, birthday)
+        if address_parts:
+            record.address = Address.restore(address, json.loads(address_parts))
+        elif address:
+            record.address = Address(address, lazy=True)  # kept as entered, such as by a migrated book
+        return record
+
+    def save(self, record: Record):
+        name = record.name.value
+        birthday = record.birthday.value if record.birthday else None
+        self.connection.execute(
+            "INSERT OR REPLACE INTO contacts VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                name,
+                name.lower(),
+                record.email.email if record.email else None,
+                birthday.strftime("%d.%m.%Y") if birthday else None,
+                birthday.month * 100 + birthday.day if birthday else None,
+                record.address.to_text() if record.address else None,
+                _address_parts(record.address),
+            ),
+        )
+        self.connection.execute("DELETE FROM phones WHERE name = ?", (name,))
+        self.connection.executemany(
+            "INSERT INTO phones VALUES (?, ?, ?)",
+            [(name, position, phone.value) for position, phone in enumerate(record.phones)],
+        )
+        self.connection.execute("DELETE FROM contact_words WHERE name = ?", (name,))
+        self.connection.executemany("INSERT INTO contact_words VALUES (?, ?)", [(word, name) for word in _name_words(name)])
+
+
+class SQLiteNameWords(FuzzyNameIndex):
+    """
+    The typo index of FuzzyNameIndex over the contact_words table instead of a list in
+    memory. The trie of the words is walked the same way, each branch being found with
+    a range query on the word index, so only the prefixes within reach of the query
+    are read and memory does not grow with the book.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+
+    def names(self, word: str):
+        return [name for (name,) in self.connection.execute("SELECT name FROM contact_words WHERE word = ?", (word,))]
+
+    def _first_word(self, after: str, prefix: str):
+        row = self.connection.execute(
+            "SELECT word FROM contact_words WHERE word > ? AND word < ? ORDER BY word LIMIT 1",
+            (after, prefix + "\U0010ffff"),
+        ).fetchone()
+        return row[0] if row else None
+
+    def similar_words(self, query: str, max_distance: int):
+        stack = [("", list(range(len(query) + 1)))]
+        while stack:
+            prefix, row = stack.pop()
+            if prefix and row[-1] <= max_distance and self.names(prefix):  # the prefix is a word itself
+                yield row[-1], prefix
+            word = self._first_word(prefix, prefix)
+            while word is not None:
+                char = word[len(prefix)]
+                next_row = [row[0] + 1]
+                for column, query_char in enumerate(query, 1):
+                    next_row.append(
+                        min(next_row[-1] + 1, row[column] + 1, row[column - 1] + (query_char != char))
+                    )
+                if min(next_row) <= max_distance:
+                    stack.append((prefix + char, next_row))
+                word = self._first_word(prefix + char + "\U0010ffff", prefix)  # on to the next branch
+
+
+class SQLiteNotes(SQLiteRows):
+    SELECT_ALL = "SELECT id, title, text, tags FROM notes "
+    SELECT_ONE = SELECT_ALL + "WHERE id = ?"
+    SELECT_KEYS = "SELECT id FROM notes ORDER BY id"
+    EXISTS = "SELECT 1 FROM notes WHERE id = ?"
+    DELETE = "DELETE FROM notes WHERE id = ?"
+    COUNT = "SELECT COUNT(*) FROM notes"
+
+    def _build(self, row) -> Note:
+        note_id, title, text, tags = row
+        return Note(note_id, title, text, json.loads(tags))
+
+    def save(self, note: Note):
+        search_text = "\0".join((note.title, note.text, " ".join(note.tags))).lower()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO notes VALUES (?, ?, ?, ?, ?)",
+            (note.id, note.title, note.text, json.dumps(note.tags), search_text),
+        )
+        self.connection.execute("DELETE FROM note_tags WHERE note_id = ?", (note.id,))
+        self.connection.executemany(
+            "INSERT INTO note_tags (tag, note_id, tag_lower) VALUES (?, ?, ?)",
+            [(tag, note.id, tag.lower()) for tag in note.tags],
+        )
+
+
+class SQLiteAddressBook(AddressBook):
+    """
+    AddressBook kept in an SQLite database. Records are read from the database when
+    they are looked up, and every change to a record is written straight back.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__()
+        self.data = SQLiteRecords(connection, self)
+
+    def __getstate__(self):
+        raise TypeError("SQLiteAddressBook lives in its database and cannot be pickled.")
+
+    # The database keeps its own indexes
+    def _reindex(self):
+        pass
+
+    def _index(self, record):
+        pass
+
+    def _unindex(self, record):
+        pass
+
+    def _check_address(self, address):
+        # The parts are stored next to the address, so it is parsed before the record changes
+        try:
+            address.address
+        except IndexError:
+            raise ValueError("Address not recognized as a US address.") from None
+
+    def _record_changed(self, record, op, args):
+        self.data.save(record)
+        super()._record_changed(record, op, args)
+
+    def find_all(self, name):
+        return list(
+            self.data.select("WHERE instr(name_lower, ?) > 0 ORDER BY name", (name.lower(),))
+        )
+
+    def find_similar(self, name, max_distance=None):
+        # The words of the names are walked in the database, not indexed in memory
+        if max_distance is None:
+            max_distance = self.max_distance
+        matches = SQLiteNameWords(self.data.connection).search(name, max_distance)
+        return [(distance, self.data[match]) for distance, match in matches]
+
+    def complete_name(self, prefix, limit=20):
+        # A range over the name_lower index instead of LIKE, which would scan the table
+        prefix = prefix.lower()
+        rows = self.data.connection.execute(
+            "SELECT name FROM contacts WHERE name_lower >= ? AND name_lower < ? ORDER BY name_lower LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit),
+        )
+        return [name for (name,) in rows]
+
+    def _phone_owners(self, phone):
+        rows = self.data.connection.execute(
+            "SELECT name FROM phones WHERE phone = ?", (normalize_phone(phone),)
+        )
+        return {name for (name,) in rows}
+
+    def find_by_phone(self, phone):
+        return list(
+            self.data.select(
+                "WHERE name IN (SELECT name FROM phones WHERE phone = ?) ORDER BY name", (normalize_phone(phone),)
+            )
+        )
+
+    def find_by_email(self, email):
+        return list(self.data.select("WHERE email = ?", (email,)))
+
+    def get_upcoming_birthdays(self, days=7):
+        today = date.today()
+        last_day = today + timedelta(days=max(days, 0))
+        start = today.month * 100 + today.day
+        end = last_day.month * 100 + last_day.day
+        if end == 228 and not is_leap_year(last_day.year):
+            end = 229  # 29 February birthdays are celebrated on the 28th this year
+        if days >= 365:
+            where, params = "WHERE birth_md IS NOT NULL", ()
+        elif start <= end:
+            where, params = "WHERE birth_md BETWEEN ? AND ?", (start, end)
+        else:  # the window wraps past the end of the year
+            where, params = "WHERE birth_md >= ? OR birth_md <= ?", (start, end)
+
+        upcoming_birthdays = []
+        for record in self.data.select(where, params):
+            birthday_this_year = next_birthday(record.birthday.value, today)
+            if (birthday_this_year - today).days <= days:
+                upcoming_birthdays.append((birthday_this_year, record.name.value))
+        upcoming_birthdays.sort()
+        return [(name, birthday.strftime("%d.%m.%Y")) for birthday, name in upcoming_birthdays]
+
+
+class SQLiteNoteBook(NoteBook):
+    """
+    NoteBook kept in an SQLite database. Notes are read from the database when
+    they are looked up, and every change to a note is written straight back.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        super().__init__()
+        self.data = SQLiteNotes(connection, self)
+
+    def __getstate__(self):
+        raise TypeError("SQLiteNoteBook lives in its database and cannot be pickled.")
+
+    # The database keeps its own indexes
+    def _reindex(self):
+        pass
+
+    def _index(self, note):
+        pass
+
+    def _unindex(self, note):
+        pass
+
+    def _note_changed(self, note, op, args):
+        self.data.save(note)
+        super()._note_changed(note, op, args)
+
+    def generate_id(self):
+        return (self.data.connection.execute("SELECT MAX(id) FROM notes").fetchone()[0] or 0) + 1
+
+    def search(self, needle, limit=20):
+        notes = self.data.select("WHERE instr(search_text, ?) > 0 ORDER BY id", (needle.lower(),))
+        return self._substring_search(needle, notes)[:limit]
+
+    def complete_id(self, prefix, limit=20):
+        if prefix and (not prefix.isdigit() or prefix.startswith("0")):
+            return []
+        rows = self.data.connection.execute(
+            "SELECT id FROM notes WHERE CAST(id AS TEXT) LIKE ? ORDER BY length(id), id LIMIT ?",
+            (prefix + "%", limit),
+        )
+        return [note_id for (note_id,) in rows]
+
+    def complete_tag(self, prefix, limit=20):
+        # A range over the tag_lower index, which ignores case like NoteBook.complete_tag
+        prefix = prefix.lower()
+        rows = self.data.connection.execute(
+            "SELECT DISTINCT tag_lower, tag FROM note_tags WHERE tag_lower >= ? AND tag_lower < ? "
+            "ORDER BY tag_lower, tag LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit),
+        )
+        return [tag for _, tag in rows]
+
+    def find_by_tag(self, tag):
+        return list(self.data.select("WHERE id IN (SELECT note_id FROM note_tags WHERE tag = ?)", (tag,)))
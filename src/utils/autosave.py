@@ -0,0 +1,102 @@
+import sys
+import threading
+import time
+from colorama import Fore, Style
+
+
+class AutoSaver:
+    """
+    Saves the books from a background thread so the prompt never waits for the disk.
+
+    The saver subscribes to the books: every change marks it dirty, and a burst of changes
+    is written with one call to save once the books have been idle for idle_delay seconds,
+    or at the latest max_delay seconds after the first unsaved change.
+
+    Commands must run while holding lock; save takes it for as long as it reads the books.
+
+    A save that fails is passed to on_error, from the background thread, and tried again
+    with the next burst; by default the error is written to stderr.
+    """
+
+    def __init__(self, save, idle_delay: float = 1.0, max_delay: float = 5.0, on_error=None):
+        self.save = save
+        self.idle_delay = idle_delay
+        self.max_delay = max_delay
+        self.on_error = on_error if on_error is not None else report_error
+        self.lock = threading.RLock()
+        self._changed = threading.Condition()
+        self._first_change = None  # time of the oldest unsaved change
+        self._last_change = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+
+    def __call__(self, book, op, key, args):
+        self.mark_dirty()
+
+    @property
+    def dirty(self) -> bool:
+        return self._first_change is not None
+
+    def mark_dirty(self):
+        with self._changed:
+            now = time.monotonic()
+            if self._first_change is None:
+                self._first_change = now
+            self._last_change = now
+            self._changed.notify()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def flush(self):
+        """
+        Saves right away if anything changed since the last save.
+        """
+        with self._changed:
+            if self._first_change is None:
+                return
+            self._first_change = self._last_change = None
+        self._save()
+
+    def close(self):
+        """
+        Stops the background thread and saves whatever is still unsaved.
+        """
+        with self._changed:
+            self._closed = True
+            self._changed.notify()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                while self._first_change is None and not self._closed:
+                    self._changed.wait()
+                # Let the burst settle: wait until it goes quiet or the oldest change gets too old
+                while not self._closed:
+                    deadline = min(self._last_change + self.idle_delay, self._first_change + self.max_delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._changed.wait(remaining)
+                if self._closed:
+                    return  # close() saves what is left
+                self._first_change = self._last_change = None
+            self._save()
+
+    def _save(self):
+        try:
+            self.save()
+        except Exception as e:
+            self.on_error(e)
+            self.mark_dirty()  # try again with the next burst
+
+
+def report_error(error: Exception, file=None):
+    """
+    Shows a failed autosave, on stderr unless another file is given.
+    """
+    print(f"{Fore.RED}Autosave failed: {error}{Style.RESET_ALL}", file=file if file is not None else sys.stderr)
@@ -0,0 +1,416 @@
+"""
+The binary format of the data file.
+
+The file starts with a fixed header: the magic bytes, the schema version, the sequence
+number of the last journal entry folded into the books and a table of sections, each
+with its offset, length and CRC-32, followed by the CRC-32 of the header itself. The
+sections follow; there is one for the contacts and one for the notes, so a reader can
+seek past the ones it does not need.
+
+A section is a run of columns rather than of objects: every field of every record is
+written next to the same field of the others, strings joined into one UTF-8 blob and
+numbers into one array, so a column is encoded or decoded with a single call. Records
+are rebuilt from the columns without running their validation again, as unpickling did.
+All numbers are little-endian.
+"""
+import gc
+import struct
+import sys
+import zlib
+from array import array
+from contextlib import contextmanager
+from datetime import date
+from src.models.address import ADDRESS_KEYS, Address
+from src.models.address_book import AddressBook
+from src.models.birthday import Birthday
+from src.models.email_ import Email
+from src.models.fields import Name, Phone
+from src.models.note import Note
+from src.models.note_book import NoteBook
+from src.models.record import Record
+
+MAGIC = b"CBOOKS\r\n"  # the line ending catches files mangled by a text-mode copy
+SCHEMA_VERSION = 1
+SECTIONS = ("contacts", "notes")
+
+_TAGS = {"contacts": b"CONT", "notes": b"NOTE"}
+_HEADER = struct.Struct("<8sHHQI")  # magic, schema version, flags, journal seq, section count
+_SECTION = struct.Struct("<4sQQI")  # tag, offset, length, CRC-32
+_CRC = struct.Struct("<I")
+_STRINGS = struct.Struct("<BBIQ")  # split mode, has None values, count, bytes of text
+_INTS = struct.Struct("<cBI")  # array typecode, item size, count
+_JOINED, _LENGTHS = 0, 1  # strings split on NUL, or by their lengths when one holds a NUL
+_STR, _INT = "s", "i"  # kinds of column
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class FormatError(ValueError):
+    """
+    The data file is damaged or was written by a newer version of the bot.
+    """
+
+
+def is_binary(prefix: bytes) -> bool:
+    """
+    Tells whether a file starting with prefix is in this format rather than a pickle.
+    """
+    return prefix.startswith(MAGIC)
+
+
+def _int_code(values) -> str:
+    if not values:
+        return "B"
+    low, high = min(values), max(values)
+    if low < 0:
+        return "q"
+    for code in "BHIQ":
+        if high < 1 << (8 * array(code).itemsize):
+            return code
+    raise FormatError(f"Number {high} is too large to store.")
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def ints(self, values):
+        code = _int_code(values)
+        column = array(code, values)
+        if _BIG_ENDIAN:
+            column.byteswap()
+        self.parts.append(_INTS.pack(code.encode(), column.itemsize, len(column)))
+        self.parts.append(column.tobytes())
+
+    def strings(self, values):
+        nulls = None
+        if None in values:
+            nulls = bytes(value is None for value in values)
+            values = ["" if value is None else value for value in values]
+        text = "\0".join(values)
+        mode = _JOINED if text.count("\0") == max(len(values) - 1, 0) else _LENGTHS
+        if mode == _LENGTHS:
+            text = "".join(values)
+        blob = text.encode("utf-8", "surrogatepass")
+        self.parts.append(_STRINGS.pack(mode, nulls is not None, len(values), len(blob)))
+        if nulls is not None:
+            self.parts.append(nulls)
+        if mode == _LENGTHS:
+            self.ints([len(value) for value in values])
+        self.parts.append(blob)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def _take(self, size):
+        start, self.offset = self.offset, self.offset + size
+        if self.offset > len(self.data):
+            raise FormatError("A section ends before its last column.")
+        return self.data[start:self.offset]
+
+    def ints(self) -> array:
+        code, itemsize, count = _INTS.unpack(self._take(_INTS.size))
+        column = array(code.decode())
+        if column.itemsize != itemsize:
+            raise FormatError(f"Numbers of {itemsize} bytes cannot be read as {code.decode()!r} here.")
+        column.frombytes(self._take(itemsize * count))
+        if _BIG_ENDIAN:
+            column.byteswap()
+        return column
+
+    def strings(self) -> list:
+        mode, has_nulls, count, size = _STRINGS.unpack(self._take(_STRINGS.size))
+        nulls = self._take(count) if has_nulls else None
+        lengths = self.ints() if mode == _LENGTHS else None
+        text = str(self._take(size), "utf-8", "surrogatepass")
+        if not count:
+            values = []
+        elif mode == _JOINED:
+            values = text.split("\0")
+        else:
+            values, start = [], 0
+            for length in lengths:
+                values.append(text[start:start + length])
+                start += length
+        if nulls is not None:
+            values = [None if null else value for value, null in zip(values, nulls)]
+        return values
+
+
+@contextmanager
+def gc_paused():
+    """
+    Holds off the cycle collector, which would otherwise scan the growing heap over and
+    over while hundreds of thousands of objects are created and none can be freed yet.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _fields(cls, values) -> list:
+    """
+    Builds Field objects holding values, without running their checks again.
+    """
+    new = cls.__new__
+    fields = []
+    append = fields.append
+    for value in values:
+        field = new(cls)
+        field.value = value
+        append(field)
+    return fields
+
+
+def _contact_columns(records) -> list:
+    records = list(records)
+    addresses = [address for address in (getattr(record, "address", None) for record in records) if address]
+    parsed = [address._Address__parts for address in addresses if address._Address__parts is not None]
+    columns = [
+        (_STR, [record.name.value for record in records]),
+        (_INT, [len(record.phones) for record in records]),
+        (_STR, [phone.value for record in records for phone in record.phones]),
+        (_STR, [email.email if email else None for email in (getattr(record, "email", None) for record in records)]),
+        (_INT, [birthday.value.toordinal() if birthday else 0 for birthday in (getattr(record, "birthday", None) for record in records)]),
+        # 0: no address, 1: kept as entered and not parsed yet, 2: parsed
+        (_INT, [
+            0 if not address else 1 if address._Address__parts is None else 2
+            for address in (getattr(record, "address", None) for record in records)
+        ]),
+        (_STR, [address.raw or None for address in addresses]),
+    ]
+    for index in range(len(ADDRESS_KEYS)):
+        columns.append((_STR, [parts[index] for parts in parsed]))
+    return columns
+
+
+def _read_contacts(data: bytes) -> tuple:
+    reader = _Reader(data)
+    names, phone_counts, phones, emails = reader.strings(), reader.ints(), reader.strings(), reader.strings()
+    birthdays, address_kinds, raws = reader.ints(), reader.ints(), reader.strings()
+    parts = [reader.strings() for _ in ADDRESS_KEYS]
+    return names, phone_counts, phones, emails, birthdays, address_kinds, raws, parts
+
+
+def _build_contacts(columns) -> dict:
+    names, phone_counts, phones, emails, birthdays, address_kinds, raws, parts = columns
+    phones = _fields(Phone, phones)
+    raws = iter(raws)
+    shared_parts = {}  # addresses with the same parts share one tuple, like the parse cache does
+    parts = iter([shared_parts.setdefault(row, row) for row in zip(*parts)])
+
+    new_record, new_email, new_birthday, new_address = Record.__new__, Email.__new__, Birthday.__new__, Address.__new__
+    fromordinal = date.fromordinal
+    records = {}
+    position = 0
+    for name, field, phone_count, email_value, ordinal, address_kind in zip(
+        names, _fields(Name, names), phone_counts, emails, birthdays, address_kinds
+    ):
+        record = new_record(Record)
+        record._book = None
+        record.name = field
+        record.phones = phones[position:position + phone_count]
+        position += phone_count
+        email = None
+        if email_value is not None:
+            email = new_email(Email)
+            email._Email__email = email_value
+        record.email = email
+        birthday = None
+        if ordinal:
+            birthday = new_birthday(Birthday)
+            birthday.value = fromordinal(ordinal)
+        record.birthday = birthday
+        address = None
+        if address_kind:
+            address = new_address(Address)
+            address.raw = next(raws)
+            address._Address__parts = next(parts) if address_kind == 2 else None
+        record.address = address
+        records[name] = record
+    return records
+
+
+def _note_columns(notes) -> list:
+    notes = list(notes)
+    return [
+        (_INT, [note.id for note in notes]),
+        (_STR, [note.title for note in notes]),
+        (_STR, [note.text for note in notes]),
+        (_INT, [len(note.tags) for note in notes]),
+        (_STR, [tag for note in notes for tag in note.tags]),
+    ]
+
+
+def _read_notes(data: bytes) -> tuple:
+    reader = _Reader(data)
+    return reader.ints(), reader.strings(), reader.strings(), reader.ints(), reader.strings()
+
+
+def _build_notes(columns) -> dict:
+    ids, titles, texts, tag_counts, tags = columns
+    new_note = Note.__new__
+    notes = {}
+    position = 0
+    for note_id, title, text, tag_count in zip(ids, titles, texts, tag_counts):
+        note = new_note(Note)
+        note._book = None
+        note.id = note_id
+        note.title = title
+        note.text = text
+        note.tags = tags[position:position + tag_count]
+        position += tag_count
+        notes[note_id] = note
+    return notes
+
+
+def _encode(columns) -> bytes:
+    writer = _Writer()
+    for kind, values in columns:
+        if kind == _INT:
+            writer.ints(values)
+        else:
+            writer.strings(values)
+    return writer.getvalue()
+
+
+def _pack(sections, seq) -> bytes:
+    offset = _HEADER.size + _SECTION.size * len(sections) + _CRC.size
+    header = [_HEADER.pack(MAGIC, SCHEMA_VERSION, 0, seq, len(sections))]
+    for name, data in sections:
+        header.append(_SECTION.pack(_TAGS[name], offset, len(data), zlib.crc32(data)))
+        offset += len(data)
+    header = b"".join(header)
+    return b"".join([header, _CRC.pack(zlib.crc32(header))] + [data for _, data in sections])
+
+
+def dump_books(address_book, note_book, seq: int = 0) -> bytes:
+    """
+    Encodes the books into the contents of a data file; a book given as None gets no
+    section.
+
+    Args:
+        seq (int): Sequence number of the last journal entry the books include.
+    """
+    sections = []
+    if address_book is not None:
+        sections.append(("contacts", _encode(_contact_columns(address_book.data.values()))))
+    if note_book is not None:
+        sections.append(("notes", _encode(_note_columns(note_book.data.values()))))
+    return _pack(sections, seq)
+
+
+def section_columns(section: str, records) -> list:
+    """
+    Takes the fields of records, contacts or notes, out into columns of plain strings
+    and numbers, which encode_section can turn into a file in another process.
+    """
+    return _contact_columns(records) if section == "contacts" else _note_columns(records)
+
+
+def encode_section(section: str, columns, seq: int = 0) -> bytes:
+    """
+    Encodes the columns of section_columns into the contents of a data file holding only that section.
+    """
+    return _pack([(section, _encode(columns))], seq)
+
+
+def _read_header(f, filename):
+    fixed = f.read(_HEADER.size)
+    if len(fixed) < _HEADER.size or not is_binary(fixed):
+        raise FormatError(f"{filename} is not a data file of the bot.")
+    _, version, _, seq, count = _HEADER.unpack(fixed)
+    if version > SCHEMA_VERSION:
+        raise FormatError(f"{filename} was written by a newer version of the bot (schema {version}).")
+    table = f.read(_SECTION.size * count + _CRC.size)
+    if len(table) < _SECTION.size * count + _CRC.size or _CRC.unpack(table[-_CRC.size:])[0] != zlib.crc32(fixed + table[:-_CRC.size]):
+        raise FormatError(f"{filename} is damaged: its header does not match its checksum.")
+    names = {tag: name for name, tag in _TAGS.items()}
+    sections = {}
+    for index in range(count):
+        tag, offset, length, crc = _SECTION.unpack_from(table, index * _SECTION.size)
+        if tag in names:  # sections added by later versions are skipped
+            sections[names[tag]] = (offset, length, crc)
+    return seq, sections
+
+
+def read_seq(filename) -> int:
+    """
+    Returns the sequence number of the last journal entry folded into the data file,
+    reading only its header.
+    """
+    with open(filename, "rb") as f:
+        return _read_header(f, filename)[0]
+
+
+def _read_section(f, filename, table, name) -> bytes:
+    if name not in table:
+        raise FormatError(f"{filename} has no {name} section.")
+    offset, length, crc = table[name]
+    f.seek(offset)
+    data = f.read(length)
+    if len(data) != length or zlib.crc32(data) != crc:
+        raise FormatError(f"{filename} is damaged: its {name} section does not match its checksum.")
+    return data
+
+
+def read_section(filename, section: str):
+    """
+    Reads and checks one section of a data file, decoded into columns of plain strings
+    and numbers, which are cheap to send back from another process.
+
+    Returns:
+        tuple: The columns, for build_records, and the sequence number of the last
+        journal entry they include.
+
+    Raises:
+        FormatError: If the file is damaged or was written by a newer version.
+    """
+    with open(filename, "rb") as f:
+        seq, table = _read_header(f, filename)
+        data = _read_section(f, filename, table, section)
+    return (_read_contacts(data) if section == "contacts" else _read_notes(data)), seq
+
+
+def build_records(section: str, columns) -> dict:
+    """
+    Rebuilds the records of read_section, keyed like the data of their book.
+    """
+    return _build_contacts(columns) if section == "contacts" else _build_notes(columns)
+
+
+def load_books(filename, sections=SECTIONS):
+    """
+    Reads the books from a data file, seeking past the sections that are not asked for.
+
+    Args:
+        sections (tuple): The sections to read, "contacts" and/or "notes".
+
+    Returns:
+        tuple: The address book and the note book, None for a section not read, and the
+        sequence number of the last journal entry they include.
+
+    Raises:
+        FormatError: If the file is damaged or was written by a newer version.
+    """
+    books = {"contacts": None, "notes": None}
+    with open(filename, "rb") as f, gc_paused():
+        seq, table = _read_header(f, filename)
+        for name in sections:
+            data = _read_section(f, filename, table, name)
+            if name == "contacts":
+                books[name] = AddressBook()
+                books[name].replace_data(_build_contacts(_read_contacts(data)))
+            else:
+                books[name] = NoteBook()
+                books[name].replace_data(_build_notes(_read_notes(data)))
+    return books["contacts"], books["notes"], seq
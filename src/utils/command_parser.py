@@ -1,11 +1,16 @@
-import argparse
+import time
 from colorama import Fore, Style
+from src.utils.metrics import metrics
 
 
 def parse_book_command(args, command: str, data_keys: list = []):
     """
     Parses the command arguments for adding a contact to the address book.
 
+    Every option is followed by one or more words: --name and each of the data keys
+    are required. The arguments are split by hand rather than with argparse, which
+    takes far longer to build a parser than the command takes to run.
+
     Args:
         args (list): The command arguments.
         command (str): The name of the command.
@@ -18,43 +23,57 @@ def parse_book_command(args, command: str, data_keys: list = []):
         ValueError: If the input is invalid and does not provide the name and expected arguments.
     """
 
-    combined_args_text = " ".join(
-        [f"--{key['key_name']} {key['key_name']}" for key in data_keys]
-    )
+    start = time.perf_counter()
+    try:
+        return _split_options(args, data_keys)
+    finally:
+        metrics.parse_time += time.perf_counter() - start
+
+
+def parse_args(parser, args):
+    """
+    Parses args with an argparse parser, counting the time as argument parsing in the metrics.
+    """
+    start = time.perf_counter()
+    try:
+        return parser.parse_args(args)
+    finally:
+        metrics.parse_time += time.perf_counter() - start
+
 
-    parser = argparse.ArgumentParser(
-        description=f"{command} --name <name> {combined_args_text}"
+def _split_options(args, data_keys):
+    invalid = ValueError(
+        f"{Fore.YELLOW} Invalid input. Please provide the name and expected arguments.{Style.RESET_ALL}"
     )
+    options = ["name"] + [key["key_name"] for key in data_keys]
+    values = {}
+    current = None
+    for arg in args:
+        if arg.startswith("--"):
+            option, _, value = arg[2:].partition("=")
+            option = _match_option(option, options)
+            if option is None:
+                raise invalid
+            current = values[option] = []  # a repeated option replaces the earlier one
+            if value:
+                current.append(value)
+        elif current is None:
+            raise invalid  # words before the first option
+        else:
+            current.append(arg)
+    if any(not values.get(option) for option in options):
+        raise invalid
 
-    parser.add_argument("--name", required=True, help="Name of the contact", nargs="+")
+    contact_name = " ".join(values["name"])
+    data = {key["key_name"]: " ".join(values[key["key_name"]]) for key in data_keys}
+    return contact_name, data
 
-    for key in data_keys:
-        parser.add_argument(
-            f"--{key['key_name']}", required=True, help=key["help"], nargs="+"
-        )
 
-    try:
-        parsed = parser.parse_args(args)
-        contact_name = " ".join(parsed.name) if parsed.name else None
-
-        # check if data_keys list is not empty and is iterable
-        if not data_keys or not isinstance(data_keys, list):
-            return contact_name, {}
-
-        data = {
-            key["key_name"]: (
-                " ".join(
-                    getattr(parsed, key["key_name"])
-                )  # join the list of values to combine them into a single string
-                if getattr(parsed, key["key_name"])  # check if the key is not None
-                else None
-            )
-            for key in data_keys
-        }
-
-        return contact_name, data
-
-    except SystemExit:
-        raise ValueError(
-            f"{Fore.YELLOW} Invalid input. Please provide the name and expected arguments.{Style.RESET_ALL}"
-        )
+def _match_option(option: str, options: list):
+    """
+    Returns the option named by option, which may be shortened as long as it stays unambiguous.
+    """
+    if option in options:
+        return option
+    matches = [candidate for candidate in options if option and candidate.startswith(option)]
+    return matches[0] if len(matches) == 1 else None
@@ -1,14 +1,624 @@
+import os
 import pickle
+from contextlib import ExitStack, contextmanager, nullcontext
 from src.models.address_book import AddressBook
 from src.models.note_book import NoteBook
+from src.utils import shards
+from src.utils.binary_format import MAGIC, SECTIONS, is_binary, load_books, read_seq, section_columns
+from src.utils.file_lock import FileLock
+from src.utils.journal import Journal, apply_entry, mark_changed, read_journal, read_journal_from, repair_journal
+from src.utils.shards import find_layouts, read_shards, shard_of, shard_paths, split, write_shards
 
-def save_data(data, filename="data.pkl"):
-    with open(filename, "wb") as f:
-        pickle.dump(data, f)
 
-def load_data(filename="data.pkl"):
+COMPACT_EVERY = 1000  # Fold the journal into a fresh snapshot after this many changes
+
+
+class LoadError(ValueError):
+    """
+    A book could not be read from its files or brought up to date with the journal.
+    """
+
+
+# Classes that old data files expect to find somewhere else
+LEGACY_CLASSES = {
+    ("src.models.fields", "Birthday"): ("src.models.birthday", "Birthday"),
+}
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        module, name = LEGACY_CLASSES.get((module, name), (module, name))
+        return super().find_class(module, name)
+
+
+def journal_path(filename):
+    return filename + ".journal"
+
+
+def lock_path(filename):
+    return filename + ".lock"
+
+
+def file_id(filename):
+    """
+    Returns what tells one version of a file from another: its inode, size and
+    modification time, or None if it does not exist.
+    """
     try:
-        with open(filename, "rb") as f:
-            return pickle.load(f)
+        stat = os.stat(filename)
     except FileNotFoundError:
-        return AddressBook(), NoteBook()  # Return new books if the file is not found
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _is_binary(filename):
+    with open(filename, "rb") as f:
+        return is_binary(f.read(len(MAGIC)))
+
+
+def _load_snapshot(filename, sections=SECTIONS):
+    """
+    Reads the books and the sequence number of the last journal entry folded into them.
+
+    Data files are written in the binary format of src.utils.binary_format, which can
+    skip the sections that are not asked for. Files written before it are pickles and
+    are read whole: the sequence number comes before the books, after them in older
+    files, and files written before the journal existed hold only the books.
+    """
+    if _is_binary(filename):
+        address_book, note_book, seq = load_books(filename, sections)
+        return (address_book, note_book), seq
+    with open(filename, "rb") as f:
+        header = _Unpickler(f).load()
+        if isinstance(header, dict) and "journal_seq" in header:
+            return _Unpickler(f).load(), header["journal_seq"]
+        try:
+            seq = pickle.load(f)["journal_seq"]
+        except EOFError:
+            seq = 0
+    return header, seq
+
+
+def segment_path(filename, section):
+    """
+    Returns the file a section of the books, "contacts" or "notes", is kept in; the files
+    of its shards, if it is split into several, are named after it.
+    """
+    return f"{filename}.{section}"
+
+
+def _snapshot_files(filename):
+    names = [filename] if os.path.exists(filename) else []
+    for section in SECTIONS:
+        for paths in find_layouts(segment_path(filename, section)).values():
+            names.extend(paths)
+    return names
+
+
+def snapshot_id(filename):
+    """
+    Returns what tells one version of the snapshot from another: the file_id of every
+    file it is kept in, the shards of each book and the single data file that older
+    versions wrote. Empty if nothing was saved yet.
+    """
+    return tuple(sorted((name, file_id(name)) for name in _snapshot_files(filename)))
+
+
+def _section_files(filename, section):
+    """
+    Returns the files to read a section from: its shards in the configured number, else
+    the set of shards written last, else the single data file of an older version. Empty
+    for a section never saved.
+    """
+    layouts = find_layouts(segment_path(filename, section))
+    if shards.SHARDS in layouts:
+        return layouts[shards.SHARDS]
+    if layouts:
+        return max(layouts.values(), key=lambda paths: max(os.path.getmtime(path) for path in paths))
+    return [filename] if os.path.exists(filename) else []
+
+
+def _moved(filename, section):
+    """
+    Tells whether a section was read from other files than its shards in the configured
+    number, and has to be written again as a whole.
+    """
+    paths = _section_files(filename, section)
+    return bool(paths) and paths != shard_paths(segment_path(filename, section), shards.SHARDS)
+
+
+def _single_file_seq(filename):
+    if _is_binary(filename):
+        return read_seq(filename)
+    with open(filename, "rb") as f:
+        header = _Unpickler(f).load()
+    if isinstance(header, dict) and "journal_seq" in header:
+        return header["journal_seq"]
+    return _load_snapshot(filename)[1]  # an older file: the books come first
+
+
+def _section_seqs(filename, section):
+    """
+    Returns the sequence number of the last journal entry folded into each shard of a section.
+    """
+    paths = _section_files(filename, section)
+    if paths == [filename]:
+        return [_single_file_seq(filename)]
+    return [read_seq(path) for path in paths] or [0]
+
+
+def snapshot_seq(filename):
+    """
+    Returns the sequence number of the last journal entry folded into the snapshot,
+    without reading the books.
+    """
+    return max(max(_section_seqs(filename, section)) for section in SECTIONS)
+
+
+def _folded(entry, seqs):
+    """
+    Tells whether a journal entry is already in the shard of its record, given the
+    sequence numbers of the shards of its book.
+    """
+    return entry["seq"] <= seqs[shard_of(entry["key"], len(seqs))]
+
+
+def _load_section(filename, section):
+    """
+    Reads one book from the snapshot, its shards several at a time.
+
+    Returns:
+        tuple: The book and the sequence numbers of its shards, as _section_seqs.
+    """
+    paths = _section_files(filename, section)
+    if paths == [filename]:
+        (address_book, note_book), seq = _load_snapshot(filename, (section,))
+        return (address_book if section == "contacts" else note_book), [seq]
+    book = AddressBook() if section == "contacts" else NoteBook()
+    if not paths:
+        return book, [0]  # a new book
+    records, seqs = read_shards(paths, section)
+    book.replace_data(records)
+    return book, seqs
+
+
+def _apply(entry, books):
+    apply_entry(entry, books.get("contacts"), books.get("notes"))
+
+
+def _dump_sections(filename, books, changed):
+    """
+    Takes the records of the shards to write out of the books, into columns that
+    _write_sections can write without touching the books.
+
+    Args:
+        changed (dict): The keys of the records changed in each book, as Journal.books;
+            only their shards are written, or every shard of a book given None.
+
+    Returns:
+        dict: The file and the columns of every shard to write, by section.
+
+    Raises:
+        ValueError: If a book with changes is not loaded.
+    """
+    dumps = {}
+    for section, keys in changed.items():
+        book = books.get(section)
+        if book is None:
+            raise ValueError(f"The {section} have changes to save but are not loaded.")
+        paths = shard_paths(segment_path(filename, section), shards.SHARDS)
+        if keys is None or not all(os.path.exists(path) for path in paths):
+            indexes = range(len(paths))
+        else:
+            indexes = sorted({shard_of(key, len(paths)) for key in keys})
+        records = split(book.data, len(paths))
+        dumps[section] = [(paths[index], section_columns(section, records[index])) for index in indexes]
+    return dumps
+
+
+def _write_sections(filename, dumps, seq):
+    """
+    Writes the shards of _dump_sections, then removes the files they replace.
+    """
+    for section, dump in dumps.items():
+        write_shards(dump, section, seq)
+    _remove_replaced(filename, dumps)
+
+
+def _remove_replaced(filename, sections):
+    """
+    Removes the files of another number of shards once a section has all its shards in
+    the configured number, and the single data file of an older version once every section has.
+    """
+    for section in sections:
+        segment = segment_path(filename, section)
+        if all(os.path.exists(path) for path in shard_paths(segment, shards.SHARDS)):
+            for count, paths in find_layouts(segment).items():
+                if count != shards.SHARDS:
+                    for path in paths:
+                        os.remove(path)
+    if os.path.exists(filename) and not any(_moved(filename, section) for section in SECTIONS):
+        os.remove(filename)
+
+
+def _staged_path(path):
+    """
+    Returns the file a shard is written to before it is put in place of path.
+    """
+    return f"{path}.new-{os.getpid()}"
+
+
+def save_data(data, filename="data.pkl", journal=None):
+    """
+    Writes a full snapshot of the books and empties the journal folded into it.
+
+    Each book is written to files of its own next to filename, split into shards.SHARDS
+    shards. A data file written by an older version, pickled or holding both books, is
+    removed once both have been saved.
+
+    Args:
+        data (tuple): The address book and the note book; None for a book that is not
+            loaded, which is then left as it is on disk.
+        filename (str): The snapshot file.
+        journal (Journal): The journal the books are being logged to, if any.
+    """
+    books = dict(zip(SECTIONS, data))
+    if journal is not None:
+        seq, changed = journal.seq, journal.books
+    else:
+        entries = list(read_journal(journal_path(filename)))
+        seq, changed = max((entry["seq"] for entry in entries), default=0), {entry["book"] for entry in entries}
+    loaded = [section for section in SECTIONS if books[section] is not None]
+    for section in set(changed).difference(loaded):
+        raise ValueError(f"The {section} have changes to save but are not loaded.")
+
+    _write_sections(filename, _dump_sections(filename, books, dict.fromkeys(loaded)), seq)
+
+    if journal is not None:
+        journal.reset(seq)
+    elif os.path.exists(journal_path(filename)):
+        os.remove(journal_path(filename))
+
+
+def flush_data(data, filename="data.pkl", journal=None, lock=None, compact_every=COMPACT_EVERY):
+    """
+    Writes the changes buffered in the journal, and folds the journal into a new snapshot
+    once compact_every changes have piled up. Only the shards holding records changed
+    since their last snapshot are written again.
+
+    The books are only touched while holding lock, so this can run on a background thread
+    while commands keep changing them; the snapshot itself is written after the lock is released.
+
+    Args:
+        data (tuple): The address book and the note book, None for one not loaded.
+        filename (str): The snapshot file.
+        journal (Journal): The journal the books are being logged to.
+        lock: Lock guarding the books, if they are shared with another thread.
+        compact_every (int): Number of journaled changes that triggers a new snapshot.
+
+    Raises:
+        ValueError: If a book with changes to fold is not loaded.
+    """
+    lock = lock if lock is not None else nullcontext()
+    with lock:
+        journal.flush()
+        if journal.entries < compact_every:
+            return
+        seq = journal.seq
+        dumps = _dump_sections(filename, dict(zip(SECTIONS, data)), journal.books)
+
+    _write_sections(filename, dumps, seq)
+    with lock:
+        journal.reset(seq)
+
+
+def _load(filename, sections=SECTIONS):
+    """
+    Reads the books in sections and replays the journal over them.
+
+    Returns:
+        tuple: The address book and the note book, None for one not read, the sequence
+        number of the last journal entry, and the records changed since their snapshot,
+        as Journal.books: those the journal has entries for, and the whole of the books
+        that still have to be written to their shards.
+    """
+    books, seqs, changed = {}, {}, {}
+    for section in SECTIONS:
+        if section in sections:
+            books[section], seqs[section] = _load_section(filename, section)
+        else:
+            seqs[section] = _section_seqs(filename, section)
+        if _moved(filename, section):
+            mark_changed(changed, section)
+    seq = max(max(section_seqs) for section_seqs in seqs.values())
+
+    for entry in read_journal(journal_path(filename), min(min(section_seqs) for section_seqs in seqs.values())):
+        section = entry["book"]
+        if section not in seqs:
+            raise ValueError(f"Unknown journal book {section}.")
+        if not _folded(entry, seqs[section]):
+            mark_changed(changed, section, entry["key"])
+            if section in books:
+                _apply(entry, books)
+        seq = max(seq, entry["seq"])
+    return books.get("contacts"), books.get("notes"), seq, changed
+
+
+def load_data(filename="data.pkl", sections=SECTIONS):
+    """
+    Loads the books, with the changes journaled since the last snapshot.
+
+    Args:
+        sections (tuple): The books to load, "contacts" and/or "notes"; the other one
+            is returned as None and not read from disk at all.
+    """
+    address_book, note_book, _, _ = _load(filename, sections)
+    return address_book, note_book
+
+
+def open_data(filename="data.pkl", sections=SECTIONS):
+    """
+    Loads the books and starts journaling every change made to them.
+
+    Args:
+        sections (tuple): The books to load now; open_section loads the other one later.
+
+    Returns:
+        tuple: The address book, the note book, None for one not loaded, and the
+        Journal they are logged to.
+    """
+    address_book, note_book, seq, changed = _load(filename, sections)
+    repair_journal(journal_path(filename))
+    journal = Journal(journal_path(filename), seq)
+    journal.books = changed
+    for book in (address_book, note_book):
+        if book is not None:
+            book.subscribe(journal)
+    return address_book, note_book, journal
+
+
+def open_section(filename, section, journal):
+    """
+    Loads a book that open_data left out, with the journal entries written so far, and
+    logs its changes to journal too.
+    """
+    book, seqs = _load_section(filename, section)
+    for entry in read_journal(journal_path(filename), min(seqs)):
+        if entry["book"] == section and not _folded(entry, seqs):
+            _apply(entry, {section: book})
+    book.subscribe(journal)
+    return book
+
+
+class PickleStore:
+    """
+    Books kept in snapshot files plus the journal of the changes made since they were written.
+
+    Each book has a snapshot file of its own, and is only read when it is first used,
+    so a session that only looks up contacts never reads the notes. When the journal
+    is folded into the snapshot, only the books it has changes for are written again.
+
+    Several sessions may share the files. They take turns through an advisory lock on
+    the data file's .lock file, and every command runs in a transaction: it catches up
+    with the journal entries the other sessions appended since this one last looked,
+    runs, and appends its own changes before the lock is let go. The books in every
+    session thus see the changes in the order they have in the journal. Changes made
+    outside a transaction are only safe while no other session is writing.
+
+    A session only reads what is new: the snapshot and the journal are compared with
+    the versions it saw last by inode, size and modification time, and only the bytes
+    appended to the journal since then are replayed. The books are loaded again as a
+    whole only when another session folded changes this one never saw into a new snapshot.
+    """
+
+    def __init__(self, filename="data.pkl", compact_every=COMPACT_EVERY):
+        self.filename = filename
+        self.compact_every = compact_every
+        self.journal = None
+        self.file_lock = FileLock(lock_path(filename))
+        self._books = {}  # the books loaded so far, by kind
+        self._on_load = []  # called with every book as it is loaded
+        self._snapshot_id = None  # version of the snapshot this session is up to date with
+        self._journal_offset = 0  # bytes of the journal this session has replayed or written
+
+    def open(self, sections=SECTIONS):
+        """
+        Starts the session, loading the books in sections now and the other ones when
+        they are first used.
+
+        Returns:
+            tuple: The address book and the note book, None for one not loaded yet.
+        """
+        with self.file_lock:
+            address_book, note_book, self.journal = open_data(self.filename, sections)
+            self._books = {section: book for section, book in zip(SECTIONS, (address_book, note_book)) if book is not None}
+            self._seen()
+        return address_book, note_book
+
+    @property
+    def address_book(self):
+        return self.load("contacts")
+
+    @property
+    def note_book(self):
+        return self.load("notes")
+
+    def load(self, section):
+        """
+        Returns the book of section, "contacts" or "notes", reading it on first use.
+        """
+        book = self._books.get(section)
+        if book is None:
+            with self.file_lock:
+                book = self._books.get(section)
+                if book is None:
+                    self.journal.flush()
+                    self.refresh()  # so that the journal entries the new book replays are not applied again
+                    try:
+                        book = open_section(self.filename, section, self.journal)
+                    except (ValueError, KeyError, IndexError) as e:
+                        raise LoadError(f"The {section} could not be loaded: {e}") from e
+                    self._books[section] = book
+                    for callback in self._on_load:
+                        callback(book)
+        return book
+
+    def on_load(self, callback):
+        """
+        Calls callback(book) for every book loaded so far and every one loaded later.
+        """
+        self._on_load.append(callback)
+        for book in list(self._books.values()):
+            callback(book)
+
+    def _data(self):
+        return self._books.get("contacts"), self._books.get("notes")
+
+    def _load_changed(self):
+        """
+        Loads the books the journal has changes for, so that they can be folded into their snapshots.
+        """
+        for section in sorted(self.journal.books):
+            self.load(section)
+
+    def _seen(self):
+        """
+        Remembers the current versions of the files as the ones the books match.
+        """
+        self._snapshot_id = snapshot_id(self.filename)
+        self._seen_journal()
+
+    def _seen_journal(self):
+        filename = journal_path(self.filename)
+        self._journal_offset = os.path.getsize(filename) if os.path.exists(filename) else 0
+
+    def stale(self) -> bool:
+        """
+        Tells whether the files changed since this session last read or wrote them,
+        without taking the lock; refresh() then brings the books up to date.
+        """
+        filename = journal_path(self.filename)
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        return size != self._journal_offset or snapshot_id(self.filename) != self._snapshot_id
+
+    def refresh(self):
+        """
+        Applies the changes other sessions saved since this one last read or wrote the files.
+        Must be called holding file_lock, with this session's own changes already written.
+
+        Returns:
+            int: The number of changes applied, or -1 if the books were loaded again.
+        """
+        snapshot = snapshot_id(self.filename)
+        if snapshot != self._snapshot_id:
+            if snapshot_seq(self.filename) > self.journal.seq:
+                return self._reload()  # the changes this session missed are only in the snapshot
+            self._snapshot_id = snapshot
+            self._journal_offset = 0  # the journal was emptied when the snapshot was written
+            self.journal.folded()
+
+        filename = journal_path(self.filename)
+        size = os.path.getsize(filename) if os.path.exists(filename) else 0
+        if size == self._journal_offset:
+            return 0
+        entries, offset = read_journal_from(filename, min(self._journal_offset, size), self.journal.seq)
+        if offset < size:
+            repair_journal(filename)  # a session died halfway through a write
+        with ExitStack() as stack:
+            for book in self._books.values():
+                stack.enter_context(book.batch())  # not to be journaled again
+            for entry, end in entries:
+                if entry["book"] in self._books:  # the others read them when they are loaded
+                    _apply(entry, self._books)
+                self.journal.changed(entry["book"], entry["key"])
+                self.journal.entries += 1
+                self.journal.seq, self._journal_offset = entry["seq"], end  # an entry that fails is tried again
+        self._journal_offset = offset
+        return len(entries)
+
+    def _reload(self):
+        address_book, note_book, seq, changed = _load(self.filename, tuple(self._books))
+        for section, book in zip(SECTIONS, (address_book, note_book)):
+            if book is not None:
+                self._books[section].replace_data(book.data)
+        self.journal.seq = seq
+        self.journal.entries = 0
+        self.journal.books = changed
+        self._seen()
+        return -1
+
+    @contextmanager
+    def transaction(self):
+        """
+        Holds the files for one command: brings the books up to date before it runs and
+        writes its changes to the journal after.
+        """
+        with self.file_lock:
+            self.refresh()
+            try:
+                yield
+            finally:
+                self.journal.flush()
+                self._seen_journal()
+
+    def save(self, lock=None):
+        """
+        Writes the journal, and folds it into the snapshot once compact_every changes have
+        piled up. Only taking the changed shards out of the books holds lock and the
+        files: they are written next to the snapshot while commands keep running, in this
+        session and the others, and then put in place. The entries logged meanwhile stay
+        in the journal. If another session wrote the snapshot first, the files are dropped.
+        """
+        lock = lock if lock is not None else nullcontext()
+        with lock, self.file_lock:
+            self.journal.flush()
+            self.refresh()
+            if self.journal.entries < self.compact_every:
+                self._seen()
+                return
+            self._load_changed()
+            seq, snapshot = self.journal.seq, snapshot_id(self.filename)
+            dumps = _dump_sections(self.filename, dict(zip(SECTIONS, self._data())), self.journal.books)
+
+        staged = {section: [(_staged_path(path), columns) for path, columns in dump] for section, dump in dumps.items()}
+        try:
+            for section, dump in staged.items():
+                write_shards(dump, section, seq)
+            with lock, self.file_lock:
+                if snapshot_id(self.filename) != snapshot:
+                    return
+                self.journal.flush()
+                self.refresh()  # the entries logged meanwhile, kept by reset
+                for section, dump in dumps.items():
+                    for path, _ in dump:
+                        os.replace(_staged_path(path), path)
+                _remove_replaced(self.filename, dumps)
+                self.journal.reset(seq)
+                self._seen()
+        finally:
+            for dump in staged.values():
+                for path, _ in dump:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+    def checkpoint(self, lock=None):
+        """
+        Writes a full snapshot of the books loaded now, for changes that were made without
+        being journaled. Changes other sessions journaled meanwhile are applied first, so
+        none are lost.
+        """
+        with lock if lock is not None else nullcontext(), self.file_lock:
+            self.journal.flush()
+            self.refresh()
+            self._load_changed()
+            save_data(self._data(), self.filename, self.journal)
+            self._seen()
+
+    def close(self):
+        with self.file_lock:
+            self.journal.flush()
+            self.refresh()
+            self._load_changed()
+            flush_data(self._data(), self.filename, self.journal, None, compact_every=0)
+        self.journal.close()
+        self.file_lock.close()
@@ -0,0 +1,138 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from src.utils.importer import detect_format
+
+WRITE_BUFFER = 1 << 20  # bytes collected before each write to the file
+CONTACT_COLUMNS = ["name", "phones", "email", "birthday", "address"]
+NOTE_COLUMNS = ["id", "title", "text", "tags"]
+
+
+def vcard_escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def vcard_lines(record):
+    """
+    Yields the lines of the vCard 3.0 card of one contact.
+    """
+    yield "BEGIN:VCARD"
+    yield "VERSION:3.0"
+    yield f"FN:{vcard_escape(record.name.value)}"
+    for phone in record.phones:
+        yield f"TEL;TYPE=cell:{phone.value}"
+    if record.email:
+        yield f"EMAIL:{vcard_escape(record.email.email)}"
+    if record.birthday:
+        yield f"BDAY:{record.birthday.value.isoformat()}"
+    if record.address:
+        try:
+            parts = record.address.address
+            fields = [parts["street"], parts["city"], parts["state"], parts["postal_code"], parts["country"]]
+        except IndexError:  # a lazily kept address that does not parse
+            fields = [record.address.raw, "", "", "", ""]
+        yield "ADR;TYPE=home:;;" + ";".join(vcard_escape(field or "") for field in fields)
+        if record.address.raw:
+            yield f"LABEL;TYPE=home:{vcard_escape(record.address.raw)}"  # the address as it was entered
+    yield "END:VCARD"
+
+
+def write_csv(rows, f, columns):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(
+            ";".join(value) if isinstance(value, list) else ("" if value is None else value)
+            for value in (row[column] for column in columns)
+        )
+        count += 1
+    return count
+
+
+def write_jsonl(rows, f):
+    count = 0
+    for row in rows:
+        f.write(json.dumps(row, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_vcard(records, f):
+    count = 0
+    for record in records:
+        for line in vcard_lines(record):
+            f.write(line)
+            f.write("\r\n")
+        count += 1
+    return count
+
+
+@contextmanager
+def open_target(target):
+    """
+    Opens the file to export to with a large write buffer; "-" stands for standard output.
+    """
+    if target == "-":
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    with open(target, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER) as f:
+        yield f
+
+
+def _target_format(target, file_format):
+    if file_format:
+        return file_format
+    if target == "-":
+        return "jsonl"
+    return detect_format(target)
+
+
+def export_contacts(book, target, file_format=None) -> int:
+    """
+    Writes the contacts one at a time to a CSV, vCard or JSONL file, or to standard output.
+
+    Records are read from the book as they are written, so memory use does not grow
+    with the size of the book.
+
+    Args:
+        book (AddressBook): The address book to export.
+        target (str): The file to write, or "-" for standard output.
+        file_format (str): csv, vcard or jsonl; guessed from the file extension if not given.
+
+    Returns:
+        int: The number of contacts written.
+    """
+    file_format = _target_format(target, file_format)
+    if file_format not in ("csv", "vcard", "jsonl"):
+        raise ValueError(f"Unknown format {file_format}. Use one of: csv, vcard, jsonl.")
+    records = book.data.values()
+    with open_target(target) as f:
+        if file_format == "vcard":
+            return write_vcard(records, f)
+        rows = (record.to_dict() for record in records)
+        if file_format == "csv":
+            return write_csv(rows, f, CONTACT_COLUMNS)
+        return write_jsonl(rows, f)
+
+
+def export_notes(note_book, target, file_format=None) -> int:
+    """
+    Writes the notes one at a time to a CSV or JSONL file, or to standard output.
+
+    Returns:
+        int: The number of notes written.
+    """
+    file_format = _target_format(target, file_format)
+    if file_format not in ("csv", "jsonl"):
+        raise ValueError("Notes can be exported as csv or jsonl.")
+    notes = (note.to_dict() for note in note_book.data.values())
+    with open_target(target) as f:
+        if file_format == "csv":
+            return write_csv(notes, f, NOTE_COLUMNS)
+        return write_jsonl(notes, f)
@@ -0,0 +1,271 @@
+import csv
+import json
+import os
+import re
+from collections import deque
+from itertools import islice
+from src.models.phone_index import normalize_phone
+from src.models.record import Record
+
+CHUNK_SIZE = 1000  # rows sent to a worker at a time
+FORMATS = {".csv": "csv", ".vcf": "vcard", ".vcard": "vcard", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+ANSI_CODES = re.compile(r"\x1b\[[0-9;]*m")
+UNDECODED = re.compile("[\udc80-\udcff]")  # bytes that were not UTF-8, kept by surrogateescape
+
+
+def detect_format(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown file type {extension or filename}. Use one of: {', '.join(FORMATS)}.")
+    return FORMATS[extension]
+
+
+def read_csv(f):
+    """
+    Yields (line number, row) for a CSV file with a header of name, phones, email,
+    birthday and address columns. Several phones are separated by semicolons.
+    """
+    reader = csv.DictReader(f)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:  # reported for its line like any other bad row
+            yield reader.line_num, ValueError(f"Not valid CSV: {e}")
+            continue
+        phones = row.get("phones") or row.get("phone") or ""
+        yield reader.line_num, {
+            "name": (row.get("name") or "").strip(),
+            "phones": [phone.strip() for phone in phones.split(";") if phone.strip()],
+            "email": row.get("email") or None,
+            "birthday": row.get("birthday") or None,
+            "address": row.get("address") or None,
+        }
+
+
+def read_jsonl(f):
+    """
+    Yields (line number, line) for every non-empty line; the lines are decoded by the workers.
+    """
+    for line_number, line in enumerate(f, 1):
+        if line.strip():
+            yield line_number, line
+
+
+def _vcard_birthday(value: str) -> str:
+    digits = value.replace("-", "")
+    if len(digits) == 8 and digits.isdigit():
+        return f"{digits[6:8]}.{digits[4:6]}.{digits[:4]}"
+    return value
+
+
+VCARD_ESCAPES = re.compile(r"\\([\\;,nN])")
+VCARD_SEPARATOR = re.compile(r"(?<!\\);")
+
+
+def vcard_unescape(value: str) -> str:
+    return VCARD_ESCAPES.sub(lambda match: "\n" if match[1] in "nN" else match[1], value)
+
+
+def _vcard_address(value: str) -> str:
+    parts = [vcard_unescape(part) for part in VCARD_SEPARATOR.split(value)]
+    _, _, street, city, region, postal_code, *_ = (parts + [""] * 7)[:7]
+    return f"{street}, {city}, {region} {postal_code}".strip(", ")
+
+
+def _unfold(f):
+    """
+    Yields (line number, line) with folded vCard lines joined back together.
+    """
+    pending = None
+    for line_number, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and pending:
+            pending = (pending[0], pending[1] + line[1:])
+            continue
+        if pending:
+            yield pending
+        pending = (line_number, line)
+    if pending:
+        yield pending
+
+
+def read_vcard(f):
+    """
+    Yields (line number of BEGIN:VCARD, row) for every card, reading the FN, TEL,
+    EMAIL, BDAY and ADR properties. A LABEL, the address as written, wins over the ADR parts.
+    """
+    row, start = None, 0
+    for line_number, line in _unfold(f):
+        key, _, value = line.partition(":")
+        prop = key.split(";")[0].upper()
+        if prop == "BEGIN" and value.strip().upper() == "VCARD":
+            row = {"name": "", "phones": [], "email": None, "birthday": None, "address": None}
+            start = line_number
+        elif row is None:
+            continue
+        elif prop == "END":
+            yield start, row
+            row = None
+        elif prop == "FN":
+            row["name"] = vcard_unescape(value.strip())
+        elif prop == "TEL":
+            row["phones"].append(normalize_phone(value))  # "+1 (555) 123-4567" too
+        elif prop == "EMAIL" and not row["email"]:
+            row["email"] = vcard_unescape(value.strip())
+        elif prop == "BDAY":
+            row["birthday"] = _vcard_birthday(value.strip())
+        elif prop == "ADR" and not row["address"]:
+            row["address"] = _vcard_address(value)
+        elif prop == "LABEL":
+            row["address"] = vcard_unescape(value.strip())
+
+
+READERS = {"csv": read_csv, "vcard": read_vcard, "jsonl": read_jsonl}
+
+
+def validate_row(row):
+    """
+    Builds the Record for one imported row, checking every field on the way.
+
+    Returns:
+        tuple: The Record and None, or None and the reason the row was rejected.
+    """
+    try:
+        if isinstance(row, Exception):  # the line could not be read
+            raise row
+        if _undecoded(row):
+            raise ValueError("Not valid UTF-8 text.")
+        if isinstance(row, str):
+            row = json.loads(row)
+        if not isinstance(row, dict) or not row.get("name"):
+            raise ValueError("Missing name.")
+        return Record.from_dict(row), None
+    except IndexError:  # pyap found no address in the text
+        return None, "Address not recognized as a US address."
+    except (ValueError, TypeError, AttributeError) as e:
+        return None, ANSI_CODES.sub("", str(e)).strip() or type(e).__name__
+
+
+def _undecoded(value) -> bool:
+    if isinstance(value, str):
+        return UNDECODED.search(value) is not None
+    if isinstance(value, dict):
+        return any(_undecoded(item) for item in value.values())
+    if isinstance(value, list):
+        return any(_undecoded(item) for item in value)
+    return False
+
+
+def validate_chunk(chunk):
+    """
+    Validates a list of (line number, row) pairs; runs in the worker processes.
+    """
+    return [(line_number, *validate_row(row)) for line_number, row in chunk]
+
+
+class ImportReport:
+    """
+    Outcome of an import: the number of contacts added and replaced, and the rows
+    that were rejected with the reason why.
+    """
+
+    def __init__(self):
+        self.added = 0
+        self.replaced = 0
+        self.errors = []  # (line number, message)
+
+    @property
+    def rows(self):
+        return self.added + self.replaced + len(self.errors)
+
+    def write_errors(self, filename):
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "error"])
+            writer.writerows(self.errors)
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows read: {self.added} contacts added, {self.replaced} replaced, "
+            f"{len(self.errors)} rows rejected."
+        )
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _validated(chunks, workers):
+    """
+    Yields the validated chunks in order. With more than one worker, the chunks are
+    validated in a process pool while only a few of them are in flight at a time.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield validate_chunk(chunk)
+        return
+
+    import multiprocessing  # only loaded for parallel imports
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Workers are spawned rather than forked: the bot's autosave thread may hold a lock at fork time
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(validate_chunk, chunk))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def import_contacts(filename, book, file_format=None, workers=None, chunk_size=CHUNK_SIZE, report=None) -> ImportReport:
+    """
+    Streams contacts from a CSV, vCard or JSONL file into the address book.
+
+    The file is read a chunk at a time and the rows are validated in worker processes,
+    where addresses are parsed. Valid rows replace any contact with the same name;
+    the others, including lines that are not valid UTF-8 or CSV, are listed in the
+    report. The book's listeners are not told about each contact, so the caller saves
+    the whole book once the import is done, or stops part way.
+
+    Args:
+        filename (str): The file to import.
+        book (AddressBook): The address book to add the contacts to.
+        file_format (str): csv, vcard or jsonl; guessed from the file extension if not given.
+        workers (int): Number of worker processes; defaults to the number of CPUs.
+        chunk_size (int): Number of rows handed to a worker at a time.
+        report (ImportReport): Filled in as the rows are imported, so that the caller
+            knows what was added even if reading the file fails part way.
+
+    Returns:
+        ImportReport: The counts of added and replaced contacts and the rejected rows.
+    """
+    file_format = file_format or detect_format(filename)
+    if file_format not in READERS:
+        raise ValueError(f"Unknown format {file_format}. Use one of: {', '.join(READERS)}.")
+    workers = workers if workers is not None else os.cpu_count() or 1
+    report = report if report is not None else ImportReport()
+    with open(filename, encoding="utf-8", errors="surrogateescape", newline="") as f, book.batch():
+        rows = READERS[file_format](f)
+        for results in _validated(_chunks(rows, chunk_size), workers):
+            for line_number, record, error in results:
+                if error:
+                    report.errors.append((line_number, error))
+                    continue
+                replaced = record.name.value in book.data
+                try:
+                    book.add_record(record)
+                except ValueError as e:  # a phone that belongs to someone else
+                    report.errors.append((line_number, str(e)))
+                    continue
+                if replaced:
+                    report.replaced += 1
+                else:
+                    report.added += 1
+    return report
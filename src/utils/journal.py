@@ -0,0 +1,217 @@
+import json
+import os
+from src.models.note import Note
+from src.models.record import Record
+
+# Record methods a "contacts" journal entry may replay; everything else is a book operation
+RECORD_OPS = {
+    "add_phone",
+    "change_phone",
+    "delete_phone",
+    "add_email",
+    "change_email",
+    "delete_email",
+    "add_birthday",
+    "change_birthday",
+    "add_address",
+    "change_address",
+    "delete_address",
+}
+NOTE_OPS = {"edit", "add_tag", "delete_tag"}
+# Record methods given addresses, which are replayed as kept: a session that parses
+# addresses as they are entered still loads those another one kept without parsing
+ADDRESS_OPS = {"add_address", "change_address"}
+
+
+class Journal:
+    """
+    Append-only log of the changes made to the books since the last snapshot.
+
+    Each line is one JSON object: {"seq": n, "book": ..., "op": ..., "key": ..., "args": [...]}.
+    The journal subscribes to the books and buffers their changes; flush() appends the
+    buffered lines with one write instead of rewriting the whole data file.
+    """
+
+    def __init__(self, filename: str, seq: int = 0, fsync: bool = False):
+        self.filename = filename
+        self.seq = seq  # sequence number of the last entry logged
+        self.fsync = fsync
+        self.entries = 0  # entries logged since the last snapshot
+        self.books = {}  # book kind -> keys of its records changed since its snapshot, None for all of them
+        self._pending = []  # (seq, book, key, line) not written yet
+        self._file = None
+
+    def __call__(self, book, op, key, args):
+        self.append(book, op, key, args)
+
+    def append(self, book, op, key, args):
+        self.seq += 1
+        entry = {"seq": self.seq, "book": book, "op": op, "key": key, "args": args}
+        self._pending.append((self.seq, book, key, json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"))
+        self.entries += 1
+        self.changed(book, key)
+
+    def changed(self, book, key=None):
+        mark_changed(self.books, book, key)
+
+    def flush(self):
+        """
+        Writes the buffered entries with a single write call.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        if self._file is None:
+            self._file = open(self.filename, "a", encoding="utf-8")
+        self._file.write("".join(line for *_, line in pending))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def reset(self, seq: int = None):
+        """
+        Drops the entries up to seq once they have been folded into a snapshot. Entries
+        logged after seq, by this session or by others while the snapshot was written,
+        stay in the journal, or buffered if they were not written yet.
+        """
+        if seq is None:
+            seq = self.seq
+        self._pending = [pending for pending in self._pending if pending[0] > seq]
+        self._close_file()
+        with open(self.filename, "a+b") as f:  # rewritten in place: other sessions keep it open to append
+            f.seek(0)
+            kept = [line for line in f if line.endswith(b"\n") and json.loads(line)["seq"] > seq]
+            f.truncate(0)
+            f.write(b"".join(kept))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.folded()
+
+    def folded(self):
+        """
+        Forgets the entries folded into a snapshot, by this session or another one, and
+        counts those left in the journal and buffered as the changes since the snapshot.
+        Entries newer than seq are left for the session to count as it replays them.
+        """
+        self.entries = 0
+        self.books = {}
+        for entry in read_journal(self.filename):
+            if entry["seq"] <= self.seq:
+                self.entries += 1
+                self.changed(entry["book"], entry["key"])
+        for _, book, key, _ in self._pending:
+            self.entries += 1
+            self.changed(book, key)
+
+    def close(self):
+        self.flush()
+        self._close_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def mark_changed(books: dict, book, key=None):
+    """
+    Marks the record key of book, or the whole book if key is None, as changed since
+    the book's last snapshot.
+
+    Args:
+        books (dict): The keys of the records changed in each book, None for all of them.
+    """
+    if key is None:
+        books[book] = None
+        return
+    keys = books.setdefault(book, set())
+    if keys is not None:
+        keys.add(key)
+
+
+def read_journal(filename: str, after_seq: int = 0):
+    """
+    Yields the journal entries newer than after_seq.
+
+    A torn last line, left by a crash in the middle of a write, ends the journal.
+    """
+    try:
+        f = open(filename, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            entry = json.loads(line)
+            if entry["seq"] > after_seq:
+                yield entry
+
+
+def read_journal_from(filename: str, offset: int = 0, after_seq: int = 0):
+    """
+    Reads the complete entries written past byte offset of the journal.
+
+    Returns:
+        tuple: The entries newer than after_seq, each with the offset just past its line,
+        and the offset just past the last complete line; a torn line after it is left unread.
+    """
+    entries = []
+    try:
+        f = open(filename, "rb")
+    except FileNotFoundError:
+        return entries, 0
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            entry = json.loads(line)
+            if entry["seq"] > after_seq:
+                entries.append((entry, offset))
+    return entries, offset
+
+
+def repair_journal(filename: str):
+    """
+    Cuts off a torn last line so that new entries are not appended to it.
+    """
+    try:
+        with open(filename, "rb+") as f:
+            content = f.read()
+            if content and not content.endswith(b"\n"):
+                f.truncate(content.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+
+def apply_entry(entry: dict, address_book, note_book):
+    """
+    Replays one journal entry on the books.
+    """
+    op, key, args = entry["op"], entry["key"], entry["args"]
+    if address_book is not None and entry["book"] == address_book.kind:
+        with address_book.replaying():
+            if op == "add_record":
+                address_book.add_record(Record.from_dict(args[0]))
+            elif op == "delete":
+                address_book.delete(key)
+            elif op in ADDRESS_OPS:
+                getattr(address_book.find(key), op)(*args, lazy=True)
+            elif op in RECORD_OPS:
+                getattr(address_book.find(key), op)(*args)
+            else:
+                raise ValueError(f"Unknown journal operation {op}.")
+    elif note_book is not None and entry["book"] == note_book.kind:
+        if op == "add_record":
+            note_book.add_record(Note.from_dict(args[0]))
+        elif op == "delete":
+            note_book.delete(key)
+        elif op in NOTE_OPS:
+            getattr(note_book, op)(key, *args)
+        else:
+            raise ValueError(f"Unknown journal operation {op}.")
+    else:
+        raise ValueError(f"Unknown journal book {entry['book']}.")
@@ -0,0 +1,180 @@
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+
+PHASES = ("parse", "exec", "render", "save")
+
+
+class Histogram:
+    """
+    Streaming latency histogram with logarithmic buckets. Not thread-safe: Metrics adds
+    to its histograms under a lock.
+
+    Every bucket is GROWTH times wider than the one before, so percentiles are known to
+    within a few percent while memory stays at a few hundred counters however many
+    times are added.
+    """
+
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._buckets = {}  # bucket number -> count
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        bucket = math.floor(math.log(max(seconds * 1e6, 1.0), self.GROWTH))
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, p: float) -> float:
+        """
+        Returns the time in seconds that p percent of the added times do not exceed.
+        """
+        if not self.count:
+            return 0.0
+        rank = math.ceil(p / 100 * self.count)
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(self.GROWTH ** (bucket + 1) / 1e6, self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 4),
+            "p95_ms": round(self.percentile(95) * 1000, 4),
+            "p99_ms": round(self.percentile(99) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4),
+        }
+
+
+class Metrics:
+    """
+    Latency histograms for every command and phase: parse (splitting the input and the
+    command's arguments), exec (the command itself), render (printing the result) and
+    save (writing the books).
+    """
+
+    def __init__(self):
+        self.histograms = {}  # (command, phase) -> Histogram
+        self._local = threading.local()  # commands may run on several threads in server mode
+        self._lock = threading.Lock()  # guards histograms and their counters against those threads
+
+    @property
+    def parse_time(self) -> float:
+        """
+        Time spent parsing arguments inside the command running on this thread, moved from exec to parse.
+        """
+        return getattr(self._local, "parse_time", 0.0)
+
+    @parse_time.setter
+    def parse_time(self, seconds: float):
+        self._local.parse_time = seconds
+
+    def record(self, command: str, phase: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get((command, phase))
+            if histogram is None:
+                histogram = self.histograms[(command, phase)] = Histogram()
+            histogram.add(seconds)
+
+    def record_command(self, command: str, parse: float, run: float, render: float):
+        """
+        Records the phases of one command; argument parsing done while it ran counts as parse.
+        """
+        arguments, self.parse_time = self.parse_time, 0.0
+        self.record(command, "parse", parse + arguments)
+        self.record(command, "exec", max(run - arguments, 0.0))
+        self.record(command, "render", render)
+
+    def to_dict(self) -> dict:
+        from src.models.address import parse_stats
+
+        commands = {}
+        with self._lock:
+            for (command, phase), histogram in sorted(self.histograms.items()):
+                commands.setdefault(command, {})[phase] = histogram.to_dict()
+        return {"commands": commands, "address_parse_cache": parse_stats()}
+
+    def report(self) -> str:
+        data = self.to_dict()
+        if not data["commands"]:
+            return "No commands timed yet."
+        lines = [f"{'command':<18}{'phase':<8}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for command, phases in data["commands"].items():
+            for phase in PHASES:
+                if phase in phases:
+                    h = phases[phase]
+                    lines.append(
+                        f"{command:<18}{phase:<8}{h['count']:>8}{h['p50_ms']:>10.3f}"
+                        f"{h['p95_ms']:>10.3f}{h['p99_ms']:>10.3f}{h['max_ms']:>10.3f}"
+                    )
+        cache = data["address_parse_cache"]
+        lines.append(
+            f"address parse cache: {cache['hits']} hits, {cache['misses']} misses, "
+            f"{cache['size']}/{cache['max_size']} entries"
+        )
+        return "\n".join(lines)
+
+    def dump(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class SlowestProfiles:
+    """
+    Runs commands under cProfile and keeps the profiles of the slowest ones.
+    """
+
+    def __init__(self, keep: int = 5):
+        self.keep = keep
+        self._slowest = []  # heap of (seconds, order, command, profile), fastest first
+        self._order = itertools.count()
+        self._lock = threading.Lock()  # commands may finish on several threads at once
+
+    def run(self, command: str, func):
+        import cProfile  # only loaded when profiling is asked for
+
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profile.runcall(func)
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                entry = (seconds, next(self._order), command, profile)
+                if len(self._slowest) < self.keep:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+
+    def dump(self, directory: str) -> list:
+        """
+        Writes the kept profiles to directory, slowest first, for pstats or snakeviz.
+
+        Returns:
+            list: The files written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        filenames = []
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+        for rank, (seconds, _, command, profile) in enumerate(slowest, 1):
+            filename = os.path.join(directory, f"{rank:02d}-{command}-{seconds * 1000:.0f}ms.prof")
+            profile.dump_stats(filename)
+            filenames.append(filename)
+        return filenames
+
+
+metrics = Metrics()  # the bot's timings, shown by the stats command
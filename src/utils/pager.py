@@ -0,0 +1,95 @@
+import threading
+from colorama import Fore, Style
+
+PAGE_SIZE = 20  # entries shown per page unless --limit says otherwise
+
+
+def paging_options(args):
+    """
+    Takes --page and --limit out of the command arguments.
+
+    Returns:
+        tuple: The remaining arguments, the page number (from 1) and the page size.
+
+    Raises:
+        ValueError: If --page or --limit is not followed by a positive number.
+    """
+    rest, options = [], {"--page": 1, "--limit": PAGE_SIZE}
+    args = iter(args)
+    for arg in args:
+        if arg in options:
+            value = next(args, "")
+            if not value.isdigit() or int(value) < 1:
+                raise ValueError(f"{arg} needs a positive number.")
+            options[arg] = int(value)
+        else:
+            rest.append(arg)
+    return rest, options["--page"], options["--limit"]
+
+
+class Pager(threading.local):
+    """
+    Renders a listing one page at a time and remembers where it stopped, so `more`
+    continues it. Every thread has a listing of its own.
+
+    The listing is a list of keys taken when it starts; entries are looked up and
+    formatted only when their page is shown, so the first page of a huge book appears
+    as fast as the first page of a small one.
+    """
+
+    def __init__(self):
+        self.continued = True  # False where `more` cannot follow, such as on a server, which points to --page instead
+        self._items = []
+        self._render = None
+        self._position = 0
+        self._limit = PAGE_SIZE
+
+    @property
+    def has_more(self) -> bool:
+        return self._position < len(self._items)
+
+    def start(self, items, render, page=1, limit=PAGE_SIZE, header="") -> str:
+        """
+        Starts a new listing and returns its first requested page.
+
+        Args:
+            items (list): The keys or objects to list, in order.
+            render (callable): Called as render(number, item) to format an entry;
+                returns None for entries that are gone.
+            page (int): The page to show first, counting from 1.
+            limit (int): The number of entries per page.
+            header (str): Text shown above the first page.
+        """
+        self._items = items
+        self._render = render
+        self._limit = limit
+        self._position = (page - 1) * limit
+        return header + self.next_page()
+
+    def next_page(self) -> str:
+        """
+        Returns the next page of the current listing, with a footer telling what is left.
+        """
+        if not self.has_more:
+            self._items = []
+            return f"{Fore.MAGENTA}Nothing more to show.{Style.RESET_ALL}"
+        first = self._position
+        last = min(first + self._limit, len(self._items))
+        lines = []
+        for number in range(first, last):
+            text = self._render(number + 1, self._items[number])
+            if text is not None:
+                lines.append(text)
+        self._position = last
+        footer = f"{Fore.BLUE}Showing {first + 1}-{last} of {len(self._items)}."
+        if self.has_more and self.continued:
+            footer += " Type `more` for the next page."
+        elif self.has_more:
+            limit = f" --limit {self._limit}" if self._limit != PAGE_SIZE else ""
+            footer += f" Add --page {last // self._limit + 1}{limit} for the next page."
+        else:
+            self._items = []  # drop the finished listing
+        return "\n".join(lines + [footer + Style.RESET_ALL])
+
+
+pager = Pager()  # the listing `more` continues
@@ -0,0 +1,69 @@
+import threading
+
+
+class ReadWriteLock:
+    """
+    Lets any number of threads read the books at once, or one thread change them.
+
+    Writers take turns and are let in ahead of readers that arrive after them, so a
+    steady stream of reads cannot hold off a write forever. The writer may take the
+    lock again while holding it, as commands that save the books do.
+
+    reader and writer are context managers, so writer can be passed wherever a lock
+    guarding the books is expected.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None  # thread holding the write lock
+        self._depth = 0
+        self._waiting_writers = 0
+        self.reader = _Side(self.acquire_read, self.release_read)
+        self.writer = _Side(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                if self._writer is threading.current_thread():
+                    break  # the writer reading what it holds
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._condition:
+            self._readers -= 1
+            if not self._readers:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.current_thread()
+        with self._condition:
+            if self._writer is me:
+                self._depth += 1
+                return
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer, self._depth = me, 1
+
+    def release_write(self):
+        with self._condition:
+            self._depth -= 1
+            if not self._depth:
+                self._writer = None
+                self._condition.notify_all()
+
+
+class _Side:
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
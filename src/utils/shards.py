@@ -0,0 +1,166 @@
+"""
+Books split into shards, so that a very large book is read and written by several
+processes at once and only the parts that changed are written again.
+
+A record goes to the shard picked by a stable hash of its key, the name of a contact
+or the ID of a note, so it stays in the same shard from one run to the next. Each
+shard is a data file of its own, in the format of src.utils.binary_format, named after
+the file of its book and the number of shards: data.pkl.contacts.3-of-8. A book kept
+in a single shard is simply data.pkl.contacts.
+
+The shards of a book are read in a pool of processes, each of them reading, checking
+and decoding some of the files; the records are rebuilt from the decoded columns and
+merged into one book in the calling process. Saving works the other way round. Only
+the file work is shared out: building the records and the indexes of the book, most
+of the time a load takes, stays in the calling process. The pool is started once and
+kept, so that saves do not pay for starting processes again.
+"""
+import glob
+import os
+import re
+import threading
+import zlib
+from src.utils.binary_format import build_records, encode_section, gc_paused, read_section
+
+SHARDS = 1  # shards a book is written in
+WORKERS = 1  # processes reading and writing the shards; 1 does it all in this process
+
+_pool = None  # the number of workers and the pool of processes, once started
+_pool_lock = threading.Lock()  # loads and saves may start it from different threads
+
+_SHARD_SUFFIX = re.compile(r"\.(\d+)-of-(\d+)$")
+
+
+def shard_of(key, count: int) -> int:
+    """
+    Returns the shard of the record with key, out of count.
+    """
+    if count == 1:
+        return 0
+    return zlib.crc32(str(key).encode("utf-8", "surrogatepass")) % count
+
+
+def shard_paths(filename, count: int) -> list:
+    """
+    Returns the files of a book, kept in filename, written in count shards.
+    """
+    if count == 1:
+        return [filename]
+    return [f"{filename}.{index + 1}-of-{count}" for index in range(count)]
+
+
+def find_layouts(filename) -> dict:
+    """
+    Finds the sets of shards the book kept in filename has on disk.
+
+    Returns:
+        dict: The files of every complete set of shards, by the number of shards.
+    """
+    found = {}
+    for name in glob.glob(glob.escape(filename) + ".*-of-*"):
+        match = _SHARD_SUFFIX.search(name)
+        if match and name[:match.start()] == filename:
+            found.setdefault(int(match.group(2)), set()).add(name)
+    layouts = {count: shard_paths(filename, count) for count, names in found.items() if len(names) == count}
+    if os.path.exists(filename):
+        layouts[1] = [filename]
+    return layouts
+
+
+def split(data: dict, count: int) -> list:
+    """
+    Deals the records of a book's data out to count shards.
+
+    Returns:
+        list: The records of each shard.
+    """
+    if count == 1:
+        return [list(data.values())]
+    shards = [[] for _ in range(count)]
+    for key, record in data.items():
+        shards[shard_of(key, count)].append(record)
+    return shards
+
+
+def write_file(filename, content: bytes):
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "wb") as f:
+        f.write(content)
+    os.replace(temp_filename, filename)  # a crash never leaves a half-written file
+
+
+def _write_shard(filename, section, columns, seq):
+    write_file(filename, encode_section(section, columns, seq))
+
+
+def _map(func, *iterables, jobs: int):
+    """
+    Calls func like map(), in the pool of WORKERS processes, or in this process when
+    there are not several jobs to share out.
+    """
+    if min(WORKERS, jobs) <= 1:
+        return map(func, *iterables)
+    return _worker_pool().map(func, *iterables)
+
+
+def _worker_pool():
+    """
+    Returns the pool of WORKERS processes, started on first use and kept until the bot
+    exits, so that every load and save after the first one finds them ready.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool[0] != WORKERS:
+            _pool[1].shutdown()
+            _pool = None
+        if _pool is None:
+            import atexit
+            import multiprocessing  # only loaded for books kept in shards
+            from concurrent.futures import ProcessPoolExecutor
+
+            # spawned rather than forked: the bot may be running other threads, such as the autosaver
+            _pool = WORKERS, ProcessPoolExecutor(WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(close_pool)
+        return _pool[1]
+
+
+def close_pool():
+    """
+    Stops the worker processes, if they were started.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool[1].shutdown()
+            _pool = None
+
+
+def read_shards(paths, section):
+    """
+    Reads the shards of a book, several at a time.
+
+    Returns:
+        tuple: The records of all the shards, keyed like the data of their book, and the
+        sequence number of the last journal entry folded into each shard.
+    """
+    records, seqs = {}, []
+    results = _map(read_section, paths, [section] * len(paths), jobs=len(paths))
+    with gc_paused():
+        for columns, seq in results:
+            records.update(build_records(section, columns))
+            seqs.append(seq)
+    return records, seqs
+
+
+def write_shards(shards, section, seq):
+    """
+    Writes shards of a book, several at a time.
+
+    Args:
+        shards (list): The file of every shard to write and its records, taken out into
+            columns by binary_format.section_columns.
+        seq (int): Sequence number of the last journal entry the records include.
+    """
+    paths, columns = [path for path, _ in shards], [columns for _, columns in shards]
+    for _ in _map(_write_shard, paths, [section] * len(paths), columns, [seq] * len(paths), jobs=len(shards)):
+        pass
@@ -0,0 +1,72 @@
+import os
+from contextlib import nullcontext
+from src.models.sqlite_books import SQLiteAddressBook, SQLiteNoteBook, connect
+from src.utils.data_handler import load_data, snapshot_id
+
+
+def migrate_to_sqlite(pickle_filename="data.pkl", db_filename="data.db"):
+    """
+    Copies the books from a data file, and its journal, into an SQLite database.
+
+    Returns:
+        tuple: The number of contacts and notes copied.
+    """
+    address_book, note_book = load_data(pickle_filename)
+    connection = connect(db_filename)
+    try:
+        with connection:
+            db_address_book = SQLiteAddressBook(connection)
+            db_note_book = SQLiteNoteBook(connection)
+            for record in address_book.data.values():
+                db_address_book.add_record(record)
+            for note in note_book.data.values():
+                db_note_book.add_record(note)
+    finally:
+        connection.close()
+    return len(address_book), len(note_book)
+
+
+class SQLiteStore:
+    """
+    Books kept in an SQLite database. Changes are written to the database as they happen
+    and committed by save(), so a burst of changes costs one commit.
+    """
+
+    def __init__(self, filename="data.db", migrate_from="data.pkl"):
+        self.filename = filename
+        self.migrate_from = migrate_from
+        self.connection = None
+
+    def open(self, sections=None):
+        """
+        Opens the database; sections is ignored, the books only read what they are asked for.
+        """
+        if not os.path.exists(self.filename) and self.migrate_from and any(snapshot_id(self.migrate_from)):
+            migrate_to_sqlite(self.migrate_from, self.filename)
+        self.connection = connect(self.filename)
+        self.address_book = SQLiteAddressBook(self.connection)
+        self.note_book = SQLiteNoteBook(self.connection)
+        return self.address_book, self.note_book
+
+    def on_load(self, callback):
+        """
+        Calls callback(book) for both books, which are open as soon as the database is.
+        """
+        callback(self.address_book)
+        callback(self.note_book)
+
+    def save(self, lock=None):
+        with lock if lock is not None else nullcontext():
+            self.connection.commit()
+
+    checkpoint = save  # every change is already in the database, waiting for a commit
+
+    def transaction(self):
+        return nullcontext()  # SQLite does its own locking between sessions
+
+    def stale(self):
+        return False  # the books read the database itself
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
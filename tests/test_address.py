@@ -0,0 +1,30 @@
+# Tests for address parsing
+import unittest
+
+ADDRESS = "225 E. John Carpenter Freeway, Suite 1500 Irving, Texas 75062"
+
+
+class TestAddress(unittest.TestCase):
+    def test_parse_results_are_reused(self):
+        from src.models.address import Address, parse_stats
+        first = Address(ADDRESS)
+        before = parse_stats()
+        second = Address(ADDRESS.replace(", ", ",   "))
+        after = parse_stats()
+        self.assertEqual(first.address, second.address)
+        self.assertEqual(after["hits"], before["hits"] + 1)
+        self.assertEqual(after["misses"], before["misses"])
+        second.address["city"] = "Changed"
+        self.assertEqual(Address(ADDRESS).address["city"], first.address["city"])
+
+    def test_lazy_address_is_parsed_when_read(self):
+        from src.models.address import Address
+        address = Address(ADDRESS, lazy=True)
+        self.assertEqual(address.to_text(), ADDRESS)
+        self.assertEqual(address.address["postal_code"], "75062")
+        self.assertIn("75062", str(address))
+        self.assertIn("not recognized", str(Address("nowhere", lazy=True)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# Tests for the address book
+import unittest
+
+
+class TestAddressBook(unittest.TestCase):
+    def setUp(self):
+        from src.models.address_book import AddressBook
+        from src.models.record import Record
+        self.book = AddressBook()
+        for name in ["John Smith", "Johnny Bravo", "Anna Johnson", "Bob"]:
+            self.book.add_record(Record(name))
+
+    def names(self, records):
+        return [record.name.value for record in records]
+
+    def test_find_all_uses_substrings_ignoring_case(self):
+        self.assertEqual(self.names(self.book.find_all("JOHN")), ["Anna Johnson", "John Smith", "Johnny Bravo"])
+        self.assertEqual(self.names(self.book.find_all("n s")), ["John Smith"])
+        self.assertEqual(self.names(self.book.find_all("bo")), ["Bob"])
+        self.assertEqual(self.book.find_all("xyz"), [])
+
+    def test_find_all_follows_adds_and_deletes(self):
+        from src.models.record import Record
+        self.book.delete("John Smith")
+        self.book.add_record(Record("Joan Smithers"))
+        self.assertEqual(self.names(self.book.find_all("smith")), ["Joan Smithers"])
+
+    def test_index_is_rebuilt_after_unpickling(self):
+        import pickle
+        book = pickle.loads(pickle.dumps(self.book))
+        self.assertEqual(self.names(book.find_all("bravo")), ["Johnny Bravo"])
+
+    def test_find_similar_forgives_typos(self):
+        from src.models.record import Record
+
+        def similar(name, max_distance=None):
+            return [(distance, record.name.value) for distance, record in self.book.find_similar(name, max_distance)]
+
+        self.assertEqual(similar("jonh"), [(2, "John Smith")])
+        self.assertEqual(similar("Jhon Smiht"), [])  # four typos in all
+        self.assertEqual(similar("Jhon Smiht", 4), [(4, "John Smith")])
+        self.assertEqual(similar("Bbo"), [])  # one typo at most in a three-letter word
+        self.assertEqual(similar("jonh", 0), [])
+
+        self.book.delete("John Smith")
+        self.book.add_record(Record("Jon Smyth"))
+        self.assertEqual(similar("john smith"), [(2, "Jon Smyth")])
+
+    def test_search_lists_close_matches_after_exact_ones(self):
+        from src.commands.contact_commands import search_contact
+        result = search_contact(["johnny"], self.book)
+        self.assertIn("Search results - 2", result)
+        self.assertLess(result.index("Johnny Bravo"), result.index("Close match, 2 typos away"))
+        self.assertLess(result.index("Close match, 2 typos away"), result.index("John Smith"))
+        self.assertIn("No contact found", search_contact(["jonh", "--max-distance", "0"], self.book))
+
+    def test_upcoming_birthdays_are_sorted_and_wrap_past_year_end(self):
+        from datetime import date
+        from src.models.birthday_index import BirthdayIndex
+        index = BirthdayIndex([
+            ("New Year", date(1990, 1, 2)),
+            ("Christmas", date(1985, 12, 25)),
+            ("Late", date(1980, 2, 1)),
+            ("Eve", date(1970, 12, 31)),
+        ])
+        upcoming = index.upcoming(10, today=date(2023, 12, 24))
+        self.assertEqual(upcoming, [
+            (date(2023, 12, 25), "Christmas"),
+            (date(2023, 12, 31), "Eve"),
+            (date(2024, 1, 2), "New Year"),
+        ])
+        index.remove("Christmas")
+        self.assertEqual(index.upcoming(1, today=date(2023, 12, 24)), [])
+
+    def test_leap_day_birthdays(self):
+        from datetime import date
+        from src.models.birthday_index import BirthdayIndex
+        index = BirthdayIndex([("Leap", date(2000, 2, 29))])
+        self.assertEqual(index.upcoming(0, today=date(2023, 2, 28)), [(date(2023, 2, 28), "Leap")])
+        self.assertEqual(index.upcoming(1, today=date(2024, 2, 28)), [(date(2024, 2, 29), "Leap")])
+        self.assertEqual(index.upcoming(30, today=date(2023, 3, 1)), [])
+
+    def test_birthday_changes_update_upcoming_birthdays(self):
+        from datetime import date, timedelta
+        today = date.today()
+        soon = today + timedelta(days=2)
+        if (soon.month, soon.day) == (2, 29):
+            soon += timedelta(days=1)
+        record = self.book.find("Bob")
+        record.add_birthday(soon.replace(year=1990).strftime("%d.%m.%Y"))
+        self.assertEqual([name for name, _ in self.book.get_upcoming_birthdays(7)], ["Bob"])
+        record.change_birthday((today + timedelta(days=30)).replace(year=1990).strftime("%d.%m.%Y"))
+        self.assertEqual(self.book.get_upcoming_birthdays(7), [])
+        self.book.delete("Bob")
+        self.assertEqual(self.book.get_upcoming_birthdays(365), [])
+
+
+    def test_reverse_phone_lookup_follows_phone_changes(self):
+        john, bob = self.book.find("John Smith"), self.book.find("Bob")
+        john.add_phone("0123456789")
+        bob.add_phone("0123456789")
+        self.assertEqual(self.names(self.book.find_by_phone("+1 (012) 345-6789")), ["Bob", "John Smith"])
+        john.change_phone("0123456789", "1111111111")
+        bob.delete_phone("0123456789")
+        self.assertEqual(self.book.find_by_phone("0123456789"), [])
+        self.assertEqual(self.names(self.book.find_by_phone("1111111111")), ["John Smith"])
+        self.book.delete("John Smith")
+        self.assertEqual(self.book.find_by_phone("1111111111"), [])
+
+    def test_unique_phones(self):
+        from src.models.fields import Phone
+        from src.models.record import Record
+        self.book.unique_phones = True
+        self.book.find("Bob").add_phone("0123456789")
+        with self.assertRaises(ValueError):
+            self.book.find("John Smith").add_phone("0123456789")
+        with self.assertRaises(ValueError):
+            self.book.add_record(Record("Eve", phones=[Phone("0123456789")]))
+        self.assertIn("already exists", self.book.find("Bob").add_phone("0123456789"))
+
+
+if __name__ == '__main__':
+    unittest.main()
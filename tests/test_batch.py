@@ -0,0 +1,40 @@
+import io
+import os
+import tempfile
+import unittest
+
+
+class TestBatch(unittest.TestCase):
+    def test_commands_run_in_order_and_are_saved_at_checkpoints(self):
+        from src.cli.interface import run_batch
+        from src.cli.registry import CommandContext
+        from src.utils.data_handler import PickleStore, journal_path, load_data
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "data.pkl")
+            store = PickleStore(filename)
+            address_book, note_book = store.open()
+            script = io.StringIO(
+                "# nightly sync\n"
+                "add John 1234567890\n"
+                "\n"
+                "add-email --name John --email john@example.com\n"
+                "add-note --title Call --text Call John\n"
+                "exit\n"
+                "add Jane\n"
+            )
+            output = io.StringIO()
+
+            count, elapsed = run_batch(script, CommandContext(address_book, note_book, store), checkpoint=2, output=output)
+
+            self.assertEqual(count, 3)
+            self.assertEqual(len(output.getvalue().splitlines()), 4)  # add also reports the phone it added
+            self.assertGreater(os.path.getsize(journal_path(filename)), 0)  # saved after two commands
+            store.close()
+            address_book, note_book = load_data(filename)
+            self.assertEqual(address_book.find("John").email.email, "john@example.com")
+            self.assertNotIn("Jane", address_book)
+            self.assertEqual(note_book.get_by_id(1).title, "Call")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+
+class TestCommandParser(unittest.TestCase):
+    def test_options_take_the_words_after_them(self):
+        from src.utils.command_parser import parse_book_command
+        keys = [{"key_name": "oldphone", "help": ""}, {"key_name": "newphone", "help": ""}]
+        self.assertEqual(
+            parse_book_command(["--name", "John", "Smith", "--old", "1234567890", "--newphone=0987654321"], "change-phone", keys),
+            ("John Smith", {"oldphone": "1234567890", "newphone": "0987654321"}),
+        )
+        self.assertEqual(parse_book_command(["--name", "John"], "show-phone"), ("John", {}))
+        for args in (["John"], ["--name"], ["--name", "John", "--oldphone", "1"], ["--name", "John", "--phone", "1"]):
+            with self.assertRaises(ValueError):
+                parse_book_command(args, "change-phone", keys)
+
+    def test_registry_drives_dispatch_and_help(self):
+        from src.cli.interface import run_command
+        from src.cli.registry import COMMAND_NAMES, CommandContext
+        from src.models.address_book import AddressBook
+        from src.models.note_book import NoteBook
+        context = CommandContext(AddressBook(), NoteBook())
+        run_command("add", ["John", "1234567890"], context)
+        self.assertIn("1234567890", run_command("phone", ["--name", "John"], context))
+        self.assertIn("who-called [phone]:", run_command("help", [], context))
+        self.assertTrue(run_command("nope", [], context).startswith("Invalid command."))
+        self.assertIn("exit", COMMAND_NAMES)
+
+
+if __name__ == '__main__':
+    unittest.main()
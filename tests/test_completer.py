@@ -0,0 +1,51 @@
+import unittest
+
+
+class TestCommandCompleter(unittest.TestCase):
+    def setUp(self):
+        from src.cli.completer import CommandCompleter
+        from src.cli.registry import CommandContext
+        from src.models.address_book import AddressBook
+        from src.models.note import Note
+        from src.models.note_book import NoteBook
+        from src.models.record import Record
+        address_book, note_book = AddressBook(), NoteBook()
+        for name in ["John Smith", "johnny Bravo", "Anna Johnson"]:
+            address_book.add_record(Record(name))
+        for note_id in [1, 2, 10, 12, 105]:
+            note_book.add_record(Note(note_id, f"Note {note_id}", "text", ["work", "Weekly"] if note_id < 10 else []))
+        self.context = CommandContext(address_book, note_book)
+        self.completer = CommandCompleter(self.context)
+
+    def complete(self, text):
+        from prompt_toolkit.document import Document
+        return [completion.text for completion in self.completer.get_completions(Document(text), None)]
+
+    def test_commands(self):
+        self.assertEqual(self.complete("add-n"), ["add-note", "add-note-tag"])
+        self.assertEqual(self.complete("xyz"), [])
+
+    def test_contact_names(self):
+        self.assertEqual(self.complete("phone --name jo"), ["John Smith", "johnny Bravo"])
+        self.assertEqual(self.complete("phone --name John S"), ["John Smith"])
+        self.assertEqual(self.complete("phone --name=An"), ["Anna Johnson"])
+        self.assertEqual(self.complete("phone --name"), [])  # still typing the option
+        self.context.address_book.delete("John Smith")
+        self.assertEqual(self.complete("phone --name jo"), ["johnny Bravo"])
+
+    def test_note_ids_and_tags(self):
+        self.assertEqual(self.complete("edit-note --id 1"), ["1", "10", "12", "105"])
+        self.assertEqual(self.complete("edit-note --id 10"), ["10", "105"])
+        self.assertEqual(self.complete("edit-note --id 10 --title x"), [])
+        self.assertEqual(self.complete("add-note-tag --id 1 --tag w"), ["Weekly", "work"])
+        self.assertEqual(self.complete("add-note --title x --tags work we"), ["Weekly"])
+
+        self.context.note_book.data[1].delete_tag("work")
+        self.assertEqual(self.complete("add-note-tag --id 1 --tag wo"), ["work"])  # note 2 still has it
+        self.context.note_book.delete(2)
+        self.assertEqual(self.complete("add-note-tag --id 1 --tag wo"), [])
+        self.assertEqual(self.complete("edit-note --id "), ["1", "10", "12", "105"])
+
+
+if __name__ == "__main__":
+    unittest.main()
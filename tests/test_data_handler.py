@@ -0,0 +1,442 @@
+# Tests for saving and loading the books
+import os
+import pickle
+import tempfile
+import unittest
+
+
+class _Pickled:
+    """ pickles as an instance of cls with state as its __dict__, like objects pickled before __slots__ """
+
+    def __init__(self, cls, state):
+        self.cls = cls
+        self.state = state
+
+    def __reduce__(self):
+        import copyreg
+        return copyreg._reconstructor, (self.cls, object, None), self.state
+
+
+def _add_contacts(filename, prefix, count):
+    """ one session adding contacts, each in its own transaction; runs in a child process """
+    from src.models.record import Record
+    from src.utils.data_handler import PickleStore
+    store = PickleStore(filename, compact_every=7)
+    address_book, _ = store.open()
+    for index in range(count):
+        with store.transaction():
+            address_book.add_record(Record(f"{prefix} {index}"))
+        store.save()
+    store.close()
+
+
+class TestDataHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp.name, "data.pkl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_changes(self, address_book, note_book):
+        from src.models.note import Note
+        from src.models.record import Record
+        address_book.add_record(Record("John Smith", email="john@example.com"))
+        address_book.find("John Smith").add_phone("0123456789")
+        address_book.find("John Smith").add_birthday("01.02.1990")
+        address_book.add_record(Record("Jane"))
+        address_book.delete("Jane")
+        note_book.add_record(Note(1, "title", "text"))
+        note_book.add_tag(1, "work")
+        note_book.edit(1, None, "new text")
+
+    def assert_changes(self, address_book, note_book):
+        record = address_book.find("John Smith")
+        self.assertEqual([phone.value for phone in record.phones], ["0123456789"])
+        self.assertEqual(str(record.email), "john@example.com")
+        self.assertEqual(record.birthday.value.strftime("%d.%m.%Y"), "01.02.1990")
+        self.assertNotIn("Jane", address_book)
+        self.assertEqual(note_book.get_by_id(1).tags, ["work"])
+        self.assertEqual(note_book.get_by_id(1).text, "new text")
+
+    def test_journal_is_replayed_over_snapshot(self):
+        from src.utils.data_handler import load_data, open_data, journal_path
+        address_book, note_book, journal = open_data(self.filename)
+        self.make_changes(address_book, note_book)
+        journal.close()
+
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertTrue(os.path.exists(journal_path(self.filename)))
+        self.assert_changes(*load_data(self.filename))
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        from src.utils.data_handler import load_data, open_data, save_data, journal_path
+        address_book, note_book, journal = open_data(self.filename)
+        self.make_changes(address_book, note_book)
+        save_data((address_book, note_book), self.filename, journal)
+        self.assertEqual(os.path.getsize(journal_path(self.filename)), 0)
+
+        address_book.find("John Smith").add_phone("9876543210")
+        journal.close()
+        address_book, note_book = load_data(self.filename)
+        phones = [phone.value for phone in address_book.find("John Smith").phones]
+        self.assertEqual(phones, ["0123456789", "9876543210"])
+        self.assertEqual(note_book.get_by_id(1).tags, ["work"])
+
+    def test_entries_already_in_snapshot_are_not_replayed(self):
+        from src.utils.data_handler import load_data, open_data, journal_path
+        address_book, note_book, journal = open_data(self.filename)
+        self.make_changes(address_book, note_book)
+        journal.close()
+        # Crash between writing the snapshot and emptying the journal
+        with open(self.filename, "wb") as f:
+            pickle.dump((address_book, note_book), f)
+            pickle.dump({"journal_seq": journal.seq}, f)
+
+        address_book, note_book = load_data(self.filename)
+        self.assertEqual(note_book.get_by_id(1).tags, ["work"])
+
+    def test_loads_snapshot_without_journal_seq(self):
+        from src.models.address_book import AddressBook
+        from src.models.note_book import NoteBook
+        from src.models.record import Record
+        from src.utils.data_handler import load_data
+        address_book = AddressBook()
+        address_book.add_record(Record("John"))
+        with open(self.filename, "wb") as f:
+            pickle.dump((address_book, NoteBook()), f)
+
+        address_book, _ = load_data(self.filename)
+        self.assertIs(address_book.find("John")._book, address_book)
+
+    def test_loads_records_pickled_before_slots(self):
+        from datetime import date
+        from src.models.address import Address
+        from src.models.address_book import AddressBook
+        from src.models.birthday import Birthday
+        from src.models.email_ import Email
+        from src.models.fields import Name, Phone
+        from src.models.note import Note
+        from src.models.note_book import NoteBook
+        from src.models.record import Record
+        from src.utils.data_handler import load_data
+        parts = {"street": "225 E. John Carpenter Freeway", "city": "Irving", "state": "Texas",
+                 "postal_code": "75062", "country": "US"}
+        record = _Pickled(Record, {
+            "name": _Pickled(Name, {"value": "John"}),
+            "address": _Pickled(Address, {"_Address__address": parts}),
+            "phones": [_Pickled(Phone, {"value": "1234567890"})],
+            "email": _Pickled(Email, {"_Email__email": "john@example.com"}),
+            "birthday": _Pickled(Birthday, {"value": date(1990, 5, 17)}),
+        })
+        note = _Pickled(Note, {"id": 1, "title": "Title", "text": "Text", "tags": ["work"]})
+        address_book = _Pickled(AddressBook, {"data": {"John": record}})
+        note_book = _Pickled(NoteBook, {"data": {1: note}})
+        with open(self.filename, "wb") as f:
+            pickle.dump((address_book, note_book), f)
+
+        address_book, note_book = load_data(self.filename)
+        john = address_book.find("John")
+        self.assertIs(john._book, address_book)
+        self.assertEqual(john.address.address, parts)
+        self.assertIsNone(john.address.raw)
+        self.assertEqual(john.email.email, "john@example.com")
+        self.assertEqual(address_book.find_by_phone("1234567890"), [john])
+        self.assertEqual(str(note_book.get_by_id(1)), "1. Title: Text [work]")
+        self.assertFalse(hasattr(john, "__dict__"))
+
+    def test_pickles_are_saved_again_in_the_binary_format(self):
+        from src.models.address import Address
+        from src.models.address_book import AddressBook
+        from src.models.note import Note
+        from src.models.note_book import NoteBook
+        from src.models.record import Record
+        from src.utils.binary_format import MAGIC
+        from src.utils.data_handler import load_data, save_data, segment_path
+        address_book, note_book = AddressBook(), NoteBook()
+        self.make_changes(address_book, note_book)
+        parts = {"street": "225 E. John Carpenter Freeway", "city": "Irving", "state": "Texas",
+                 "postal_code": "75062", "country": "US"}
+        address_book.find("John Smith").address = Address.restore("225 E. John Carpenter Freeway, Irving", parts)
+        address_book.add_record(Record("Олена"))
+        address_book.find("Олена").address = Address("somewhere", lazy=True)
+        note_book.add_record(Note(7, "Нотатка", "a\0b", ["x", "y"]))
+        with open(self.filename, "wb") as f:
+            pickle.dump((address_book, note_book), f)
+
+        save_data(load_data(self.filename), self.filename)
+        for section in ("contacts", "notes"):
+            with open(segment_path(self.filename, section), "rb") as f:
+                self.assertEqual(f.read(len(MAGIC)), MAGIC)
+        self.assertFalse(os.path.exists(self.filename))
+        address_book, note_book = load_data(self.filename)
+        self.assert_changes(address_book, note_book)
+        self.assertEqual(address_book.find("John Smith").address.address, parts)
+        self.assertEqual(address_book.find("Олена").address.raw, "somewhere")
+        self.assertIsNone(address_book.find("Олена").email)
+        self.assertEqual(note_book.get_by_id(7).to_dict(), {"id": 7, "title": "Нотатка", "text": "a\0b", "tags": ["x", "y"]})
+        self.assertIs(note_book.get_by_id(7)._book, note_book)
+
+    def test_sections_not_asked_for_are_skipped(self):
+        from src.utils.data_handler import load_data, open_data, save_data
+        address_book, note_book, journal = open_data(self.filename)
+        self.make_changes(address_book, note_book)
+        save_data((address_book, note_book), self.filename, journal)
+        note_book.add_tag(1, "home")  # journaled after the snapshot
+        journal.close()
+
+        address_book, note_book = load_data(self.filename, sections=("contacts",))
+        self.assertIsNone(note_book)
+        self.assertIn("John Smith", address_book)
+        address_book, note_book = load_data(self.filename, sections=("notes",))
+        self.assertIsNone(address_book)
+        self.assertEqual(note_book.get_by_id(1).tags, ["work", "home"])
+
+    def test_damaged_file_is_refused(self):
+        from src.models.address_book import AddressBook
+        from src.models.note_book import NoteBook
+        from src.utils.binary_format import FormatError
+        from src.utils.data_handler import load_data, save_data, segment_path, snapshot_seq
+        address_book, note_book = AddressBook(), NoteBook()
+        self.make_changes(address_book, note_book)
+        save_data((address_book, note_book), self.filename)
+        with open(segment_path(self.filename, "notes"), "r+b") as f:
+            f.seek(-3, os.SEEK_END)
+            f.write(b"?")
+        self.assertEqual(snapshot_seq(self.filename), 0)  # the header is intact
+        self.assertIn("John Smith", load_data(self.filename, sections=("contacts",))[0])
+        with self.assertRaises(FormatError):
+            load_data(self.filename)
+
+    def test_books_are_loaded_and_saved_apart(self):
+        from src.models.record import Record
+        from src.utils.data_handler import PickleStore, load_data, segment_path
+        store = PickleStore(self.filename)
+        self.make_changes(*store.open())
+        store.close()
+        notes_file = segment_path(self.filename, "notes")
+        notes_written = os.stat(notes_file).st_mtime_ns
+
+        store = PickleStore(self.filename)
+        self.assertEqual(store.open(sections=()), (None, None))
+        with store.transaction():
+            store.address_book.add_record(Record("Ann"))
+        store.close()
+        self.assertNotIn("notes", store._books)  # never read
+        self.assertEqual(os.stat(notes_file).st_mtime_ns, notes_written)  # nor written again
+        address_book, note_book = load_data(self.filename)
+        self.assertIn("Ann", address_book)
+        self.assert_changes(address_book, note_book)
+
+        store = PickleStore(self.filename)
+        store.open(sections=())
+        with store.transaction():
+            store.note_book.add_tag(1, "home")
+        store.close()
+        self.assertEqual(load_data(self.filename)[1].get_by_id(1).tags, ["work", "home"])
+
+    def test_books_are_split_into_shards(self):
+        from unittest.mock import patch
+        from src.models.record import Record
+        from src.utils import shards
+        from src.utils.data_handler import PickleStore, load_data, segment_path
+        from src.utils.shards import shard_of, shard_paths
+        contacts = segment_path(self.filename, "contacts")
+        self.addCleanup(shards.close_pool)
+        with patch.object(shards, "SHARDS", 4), patch.object(shards, "WORKERS", 2):
+            store = PickleStore(self.filename)
+            address_book, note_book = store.open()
+            self.make_changes(address_book, note_book)
+            for index in range(40):
+                address_book.add_record(Record(f"Contact {index}"))
+            store.close()
+            pool = shards._pool
+            paths = shard_paths(contacts, 4)
+            written = [os.stat(path).st_mtime_ns for path in paths]
+
+            store = PickleStore(self.filename)
+            address_book, _ = store.open()
+            self.assertEqual(len(address_book), 41)
+            with store.transaction():
+                address_book.find("Contact 7").add_phone("0987654321")
+            store.close()
+            self.assertIs(shards._pool, pool)  # the workers are started once
+            changed = shard_of("Contact 7", 4)
+            for index, path in enumerate(paths):
+                self.assertEqual(os.stat(path).st_mtime_ns != written[index], index == changed)
+            address_book, note_book = load_data(self.filename)
+            self.assertEqual(address_book.find_by_phone("0987654321"), [address_book.find("Contact 7")])
+            self.assert_changes(address_book, note_book)
+
+        store = PickleStore(self.filename)  # back to one file per book
+        store.open()
+        store.close()
+        self.assertTrue(os.path.exists(contacts))
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertEqual(len(load_data(self.filename)[0]), 41)
+
+    def test_autosaver_coalesces_a_burst_into_one_save(self):
+        from src.models.record import Record
+        from src.utils.autosave import AutoSaver
+        from src.utils.data_handler import flush_data, load_data, open_data
+        address_book, note_book, journal = open_data(self.filename)
+        saves = []
+
+        def save():
+            saves.append(journal.seq)
+            flush_data((address_book, note_book), self.filename, journal, saver.lock)
+
+        saver = AutoSaver(save, idle_delay=60, max_delay=60).start()  # never due during the test
+        address_book.subscribe(saver)
+        for i in range(20):
+            with saver.lock:
+                address_book.add_record(Record(f"Contact {i}"))
+        self.assertEqual(saves, [])
+        saver.flush()
+        saver.flush()  # nothing left to save
+        self.assertEqual(saves, [20])
+        self.assertEqual(len(load_data(self.filename)[0]), 20)
+
+        address_book.find("Contact 0").add_phone("0123456789")
+        saver.close()
+        journal.close()
+        self.assertEqual(saves, [20, 21])
+        self.assertEqual(len(load_data(self.filename)[0].find("Contact 0").phones), 1)
+
+    def test_autosave_failures_are_reported_and_tried_again(self):
+        from src.utils.autosave import AutoSaver
+        errors, saves = [], []
+
+        def save():
+            if not errors:
+                raise OSError("disk full")
+            saves.append(True)
+
+        saver = AutoSaver(save, on_error=errors.append)
+        saver.mark_dirty()
+        saver.flush()
+        self.assertEqual([str(error) for error in errors], ["disk full"])
+        self.assertTrue(saver.dirty)
+        saver.flush()
+        self.assertEqual(saves, [True])
+        self.assertFalse(saver.dirty)
+
+    def test_commands_run_while_the_snapshot_is_written(self):
+        import threading
+        from unittest import mock
+        from src.models.record import Record
+        from src.utils import data_handler
+        from src.utils.data_handler import PickleStore, load_data
+        store = PickleStore(self.filename, compact_every=1)
+        address_book, _ = store.open()
+        lock = threading.RLock()
+        with lock, store.transaction():
+            address_book.add_record(Record("Ann"))
+        write_shards = data_handler.write_shards
+
+        def add_meanwhile(*args):
+            def command():
+                with lock, store.transaction():
+                    address_book.add_record(Record("Bob"))
+            thread = threading.Thread(target=command)
+            thread.start()
+            thread.join(5)
+            self.assertFalse(thread.is_alive())  # neither the books nor the files are held
+            write_shards(*args)
+
+        with mock.patch.object(data_handler, "write_shards", add_meanwhile):
+            store.save(lock)
+        self.assertEqual(sorted(data_handler.load_books(data_handler.segment_path(self.filename, "contacts"), ("contacts",))[0]), ["Ann"])
+        self.assertEqual(store.journal.entries, 1)  # Bob, still in the journal
+        store.close()
+        self.assertEqual(sorted(load_data(self.filename)[0]), ["Ann", "Bob"])
+
+    def test_addresses_kept_without_parsing_load_in_a_parsing_session(self):
+        from unittest.mock import patch
+        from src.models import address as address_model
+        from src.models.record import Record
+        from src.utils.data_handler import PickleStore
+        store = PickleStore(self.filename)
+        address_book, _ = store.open()
+        with patch.object(address_model, "LAZY_PARSING", True), store.transaction():
+            address_book.add_record(Record("Ann"))
+            address_book.find("Ann").add_address("nowhere at all")
+            address_book.add_record(Record.from_dict({"name": "Bob", "address": "nowhere either"}))
+        store.journal.close()  # left in the journal, as by a session that was killed
+
+        store = PickleStore(self.filename)
+        store.open(sections=())
+        self.assertIn("not recognized", str(store.address_book.find("Ann").address))
+        self.assertEqual(store.address_book.find("Bob").address.raw, "nowhere either")
+        store.close()
+
+    def test_changes_of_other_sessions_are_not_checked_again(self):
+        from src.models.record import Record
+        from src.utils.data_handler import PickleStore
+        strict, lenient = PickleStore(self.filename), PickleStore(self.filename)
+        strict_book, _ = strict.open()
+        strict_book.unique_phones = True
+        lenient_book, _ = lenient.open()
+        with strict.transaction():
+            strict_book.add_record(Record("Ann"))
+            strict_book.find("Ann").add_phone("5551234567")
+        with lenient.transaction():
+            lenient_book.add_record(Record("Bob"))
+            lenient_book.find("Bob").add_phone("5551234567")
+        with strict.transaction():
+            self.assertEqual(len(strict_book.find_by_phone("5551234567")), 2)
+            strict_book.add_record(Record("Eve"))
+            with self.assertRaises(ValueError):  # still checked in this session
+                strict_book.find("Eve").add_phone("5551234567")
+        strict.close()
+        lenient.close()
+
+    def test_sessions_see_each_others_changes(self):
+        from src.models.record import Record
+        from src.utils.data_handler import PickleStore, journal_path, load_data
+        first, second = PickleStore(self.filename), PickleStore(self.filename)
+        first_book, _ = first.open()
+        second_book, second_notes = second.open()
+
+        with first.transaction():
+            first_book.add_record(Record("John"))
+        with second.transaction():
+            second_book.find("John").add_phone("0123456789")
+        with first.transaction():
+            self.assertEqual([phone.value for phone in first_book.find("John").phones], ["0123456789"])
+
+        second.checkpoint()  # a snapshot of changes the first session has all seen
+        with first.transaction():
+            first_book.add_record(Record("Jane"))
+        self.assertEqual(first.refresh(), 0)
+        with second.transaction():
+            self.assertIn("Jane", second_book)
+            second_book.delete("John")
+        second.checkpoint()  # now the snapshot holds a change the first session missed
+        with first.transaction():
+            self.assertNotIn("John", first_book)
+            self.assertEqual(first_book.find_all("Ja")[0].name.value, "Jane")
+
+        with open(journal_path(self.filename), "a") as f:
+            f.write('{"seq": 99, "book"')  # a session killed in the middle of a write
+        with second.transaction():
+            second_book.add_record(Record("Ann"))
+        first.close()
+        second.close()
+        self.assertEqual(sorted(load_data(self.filename)[0]), ["Ann", "Jane"])
+
+    def test_concurrent_sessions_lose_no_changes(self):
+        import multiprocessing
+        from src.utils.data_handler import load_data
+        context = multiprocessing.get_context("spawn")
+        sessions = [context.Process(target=_add_contacts, args=(self.filename, f"Session{i}", 30)) for i in range(3)]
+        for session in sessions:
+            session.start()
+        for session in sessions:
+            session.join()
+        self.assertEqual([session.exitcode for session in sessions], [0, 0, 0])
+        self.assertEqual(len(load_data(self.filename)[0]), 90)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+
+class TestExporter(unittest.TestCase):
+    def setUp(self):
+        from src.models.address_book import AddressBook
+        from src.models.fields import Phone
+        from src.models.record import Record
+        self.directory = tempfile.TemporaryDirectory()
+        self.book = AddressBook()
+        self.book.add_record(Record(
+            "John Smith", "123 Main Street, Springfield, IL 62704",
+            [Phone("1234567890"), Phone("0987654321")], "john@example.com", "17.05.1990",
+        ))
+        self.book.add_record(Record("O'Brien; Jr, Pat"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_every_format_imports_back(self):
+        from src.models.address_book import AddressBook
+        from src.utils.exporter import export_contacts
+        from src.utils.importer import import_contacts
+        for extension in ("csv", "vcf", "jsonl"):
+            filename = os.path.join(self.directory.name, f"contacts.{extension}")
+            self.assertEqual(export_contacts(self.book, filename), 2)
+            book = AddressBook()
+            report = import_contacts(filename, book, workers=1)
+            self.assertEqual((report.added, report.errors), (2, []), extension)
+            self.assertEqual(
+                [record.to_dict() for record in book.data.values()],
+                [record.to_dict() for record in self.book.data.values()],
+                extension,
+            )
+
+    def test_notes_to_stdout(self):
+        import json
+        from src.models.note import Note
+        from src.models.note_book import NoteBook
+        from src.utils.exporter import export_notes
+        note_book = NoteBook()
+        note_book.add_record(Note(1, "Title", "Text, with \"quotes\"", ["work"]))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(export_notes(note_book, "-"), 1)
+        self.assertEqual(json.loads(output.getvalue()), note_book.get_by_id(1).to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+
+class TestImporter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        filename = os.path.join(self.directory.name, name)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(text)
+        return filename
+
+    def test_csv_rows_are_imported_and_bad_rows_reported(self):
+        from src.models.address_book import AddressBook
+        from src.utils.importer import import_contacts
+        filename = self.write("contacts.csv", (
+            "name,phones,email,birthday,address\n"
+            "John Smith,1234567890;0987654321,john@example.com,17.05.1990,\"123 Main Street, Springfield, IL 62704\"\n"
+            "Jane,12345,,,\n"
+            ",1234567890,,,\n"
+            "Bob,,bob@example,,\n"
+        ))
+        book = AddressBook()
+        events = []
+        book.subscribe(lambda *event: events.append(event))
+
+        report = import_contacts(filename, book, workers=1)
+
+        john = book.find("John Smith")
+        self.assertEqual([phone.value for phone in john.phones], ["1234567890", "0987654321"])
+        self.assertEqual(john.address.address["city"], "Springfield")
+        self.assertEqual(book.find_by_phone("0987654321"), [john])
+        self.assertEqual((report.added, report.replaced), (1, 0))
+        self.assertEqual([line for line, _ in report.errors], [3, 4, 5])
+        self.assertEqual(report.errors[2][1], "Invalid Email")
+        self.assertEqual(events, [])  # saved as a whole by the caller
+
+    def test_vcard_and_jsonl_in_worker_processes(self):
+        from src.models.address_book import AddressBook
+        from src.utils.importer import import_contacts
+        vcard = self.write("contacts.vcf", (
+            "BEGIN:VCARD\r\nVERSION:3.0\r\nFN:John\r\n  Smith\r\nTEL;TYPE=cell:(123) 456-7890\r\n"
+            "EMAIL:john@example.com\r\nBDAY:1990-05-17\r\n"
+            "ADR;TYPE=home:;;123 Main Street;Springfield;IL;62704;USA\r\nEND:VCARD\r\n"
+        ))
+        jsonl = self.write("contacts.jsonl", (
+            '{"name": "John Smith", "phones": ["1112223333"]}\n'
+            '\n'
+            '{"name": "Jane", "birthday": "31.02.1990"}\n'
+            'not json\n'
+        ))
+        book = AddressBook()
+
+        report = import_contacts(vcard, book, workers=2, chunk_size=1)
+        john = book.find("John Smith")
+        self.assertEqual(john.phones[0].value, "1234567890")
+        self.assertEqual(john.birthday.value.isoformat(), "1990-05-17")
+        self.assertEqual(john.address.address["postal_code"], "62704")
+        self.assertEqual(report.added, 1)
+
+        report = import_contacts(jsonl, book, workers=2, chunk_size=1)
+        self.assertEqual(book.find("John Smith").phones[0].value, "1112223333")
+        self.assertEqual(report.replaced, 1)
+        self.assertEqual([line for line, _ in report.errors], [3, 4])
+
+    def test_bad_bytes_and_international_phones(self):
+        from src.models.address_book import AddressBook
+        from src.utils.importer import import_contacts
+        jsonl = os.path.join(self.directory.name, "contacts.jsonl")
+        with open(jsonl, "wb") as f:
+            f.write(b'{"name": "John", "phones": ["1112223333"]}\n{"name": "J\xffne"}\n{"name": "Ann"}\n')
+        vcard = self.write("contacts.vcf", "BEGIN:VCARD\r\nFN:Bob\r\nTEL:+1 (555) 123-4567\r\nEND:VCARD\r\n")
+        book = AddressBook()
+
+        report = import_contacts(jsonl, book, workers=1)
+        self.assertEqual((report.added, report.errors), (2, [(2, "Not valid UTF-8 text.")]))
+        report = import_contacts(vcard, book, workers=1)
+        self.assertEqual(book.find("Bob").phones[0].value, "5551234567")
+
+    def test_contacts_added_before_a_failure_are_saved(self):
+        from unittest.mock import patch
+        from src.commands.contact_commands import import_contacts
+        from src.models.address_book import AddressBook
+        filename = self.write("contacts.jsonl", '{"name": "John"}\n{"name": "Ann"}\n')
+        book = AddressBook()
+        checkpoints = []
+
+        def fail(rows, size):
+            yield [next(iter(rows))]
+            raise OSError(5, "Input/output error")
+
+        with patch("src.utils.importer._chunks", fail):
+            result = import_contacts([filename, "--workers", "1"], book, lambda: checkpoints.append(len(book)))
+        self.assertIn("Could not read", result)
+        self.assertEqual(checkpoints, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
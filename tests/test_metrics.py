@@ -0,0 +1,59 @@
+import unittest
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_percentiles(self):
+        from src.utils.metrics import Histogram
+        histogram = Histogram()
+        for ms in range(1, 101):
+            histogram.add(ms / 1000)
+        self.assertEqual(histogram.count, 100)
+        self.assertAlmostEqual(histogram.percentile(50), 0.050, delta=0.050 * Histogram.GROWTH - 0.050)
+        self.assertAlmostEqual(histogram.percentile(99), 0.099, delta=0.099 * Histogram.GROWTH - 0.099)
+        self.assertEqual(histogram.percentile(100), 0.1)
+
+    def test_argument_parsing_counts_as_parse(self):
+        from src.utils.metrics import Metrics
+        metrics = Metrics()
+        metrics.parse_time = 0.002
+        metrics.record_command("add", 0.001, 0.010, 0.001)
+        data = metrics.to_dict()["commands"]["add"]
+        self.assertAlmostEqual(data["parse"]["mean_ms"], 3.0)
+        self.assertAlmostEqual(data["exec"]["mean_ms"], 8.0)
+        self.assertEqual(metrics.parse_time, 0.0)
+
+    def test_threads_lose_no_times(self):
+        import threading
+        from src.utils.metrics import Metrics
+        metrics = Metrics()
+
+        def record():
+            for index in range(2000):
+                metrics.record(f"command{index % 50}", "exec", 0.001)
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(histogram.count for histogram in metrics.histograms.values()), 16000)
+
+    def test_stats_command(self):
+        from src.cli.interface import run_line
+        from src.cli.registry import CommandContext
+        from src.models.address_book import AddressBook
+        from src.models.note_book import NoteBook
+        from src.utils.metrics import metrics
+        import io
+        context = CommandContext(AddressBook(), NoteBook())
+        run_line("hello", context, io.StringIO())
+        run_line("search-notes x", context, io.StringIO())
+        output = io.StringIO()
+        run_line("stats", context, output)
+        self.assertIn("hello", output.getvalue())
+        self.assertIn("search-notes", output.getvalue())
+        self.assertIn("address parse cache", output.getvalue())
+        self.assertIn(("search-notes", "parse"), metrics.histograms)
+
+
+if __name__ == "__main__":
+    unittest.main()
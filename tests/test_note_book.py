@@ -0,0 +1,47 @@
+# Tests for the note book
+import unittest
+
+
+class TestNoteBook(unittest.TestCase):
+    def setUp(self):
+        from src.models.note import Note
+        from src.models.note_book import NoteBook
+        self.book = NoteBook()
+        self.book.add_record(Note(1, "Groceries", "buy milk, eggs and a birthday cake for the party"))
+        self.book.add_record(Note(2, "Birthday party", "invite everyone"))
+        self.book.add_record(Note(3, "Work", "prepare the quarterly report", ["office"]))
+
+    def ids(self, results):
+        return [int(result.split(".")[0]) for result in results]
+
+    def test_title_matches_rank_first(self):
+        results = self.book.search("birthday")
+        self.assertEqual(self.ids(results), [2, 1])
+        self.assertEqual(results[0], '2. "Birthday party" (title: Birthday party)')
+        self.assertIn("text:..", results[1])
+
+    def test_index_follows_changes(self):
+        self.book.edit(3, None, "plan the birthday lunch")
+        self.book.add_tag(1, "weekly")
+        self.book.delete(2)
+        self.assertCountEqual(self.ids(self.book.search("birthday")), [1, 3])
+        self.assertEqual(self.ids(self.book.search("weekly")), [1])
+        self.book.delete_tag(1, "weekly")
+        self.assertEqual(self.book.search("weekly"), [])
+        self.assertEqual(self.book.search("report"), [])
+
+    def test_prefixes_and_limit(self):
+        self.assertEqual(self.ids(self.book.search("quart")), [3])
+        self.assertEqual(len(self.book.search("birthday", limit=1)), 1)
+        self.assertEqual(self.book.search("nothing"), [])
+
+    def test_generate_id_follows_the_newest_note(self):
+        self.assertEqual(self.book.generate_id(), 4)
+        self.book.delete(3)
+        self.assertEqual(self.book.generate_id(), 3)
+        self.book.delete(1)
+        self.assertEqual(self.book.generate_id(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,12 @@
+import unittest
+
+
+class TestOptions(unittest.TestCase):
+    def test_defaults_are_those_of_the_parser(self):
+        from src.cli.options import get_options, parse_options
+        self.assertEqual(vars(get_options([])), vars(parse_options([])))
+        self.assertEqual(vars(get_options(["phone", "--name", "John"])), vars(parse_options(["phone", "--name", "John"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
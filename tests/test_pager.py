@@ -0,0 +1,42 @@
+import unittest
+
+
+class TestPager(unittest.TestCase):
+    def setUp(self):
+        from src.models.address_book import AddressBook
+        from src.models.record import Record
+        self.book = AddressBook()
+        for index in range(5):
+            self.book.add_record(Record(f"Contact {index}"))
+
+    def test_all_is_shown_a_page_at_a_time(self):
+        from src.commands.contact_commands import show_all
+        from src.utils.pager import pager
+        first = show_all(["--limit", "2"], self.book)
+        self.assertIn("There are 5 contacts", first)
+        self.assertIn("Contact 1", first)
+        self.assertNotIn("Contact 2", first)
+        self.assertIn("Showing 1-2 of 5", first)
+
+        self.book.delete("Contact 2")  # gone before its page is shown
+        second = pager.next_page()
+        self.assertNotIn("Contact 2", second)
+        self.assertIn("Contact 3", second)
+        self.assertIn("Showing 3-4 of 5", second)
+        self.assertIn("Showing 5-5 of 5", pager.next_page())
+        self.assertFalse(pager.has_more)
+
+    def test_page_and_limit_options(self):
+        from src.commands.contact_commands import search_contact
+        from src.utils.pager import paging_options
+        self.assertEqual(paging_options(["John", "--page", "3", "Smith"]), (["John", "Smith"], 3, 20))
+        with self.assertRaises(ValueError):
+            paging_options(["--limit", "0"])
+        result = search_contact(["contact", "--page", "2", "--limit", "3"], self.book)
+        self.assertIn("Search results - 5", result)
+        self.assertIn("Contact 4", result)
+        self.assertNotIn("Contact 2", result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import os
+import tempfile
+import threading
+import unittest
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        import asyncio
+        from src.cli.registry import CommandContext
+        from src.cli.server import BookServer, serve
+        from src.utils.data_handler import PickleStore
+        self.tmp = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.tmp.name, "bot.sock")
+        self.store = PickleStore(os.path.join(self.tmp.name, "data.pkl"))
+        address_book, note_book = self.store.open()
+        self.server = BookServer(CommandContext(address_book, note_book, self.store))
+        self.loop = asyncio.new_event_loop()
+        self.stop = asyncio.Event()
+        ready = threading.Event()
+        self.thread = threading.Thread(
+            target=self.loop.run_until_complete, args=(serve(self.server, self.address, ready.set, self.stop),)
+        )
+        self.thread.start()
+        ready.wait(5)
+
+    def tearDown(self):
+        self.loop.call_soon_threadsafe(self.stop.set)
+        self.thread.join()
+        self.loop.close()
+        self.server.close()
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_clients_share_the_books(self):
+        from src.cli.client import Client
+        with Client(self.address) as first, Client(self.address) as second:
+            self.assertIn("added", first.run("add John 0123456789"))
+            answer = first.run("add John 0123456789 12345")  # per-phone results come back too
+            self.assertIn("already exists", answer)
+            self.assertIn("must be 10 digits", answer)
+            self.assertIn("0123456789", second.run("phone --name John"))
+            answer = second.request("")
+            self.assertTrue(answer["ok"])
+            self.assertIn("Invalid command", answer["result"])
+            answer = second.request("more")  # listings are not kept between requests
+            self.assertEqual(answer["id"], 3)
+            self.assertIn("--page", answer["result"])
+            for index in range(25):
+                first.run(f"add Contact{index}")
+            listing = first.run("all")
+            self.assertIn("--page 2", listing)
+            self.assertNotIn("more", listing)
+        self.assertGreater(os.path.getsize(os.path.join(self.tmp.name, "data.pkl.journal")), 0)
+
+    def test_commands_on_files_are_refused(self):
+        from src.cli.client import Client
+        target = os.path.join(self.tmp.name, "contacts.csv")
+        with Client(self.address) as client:
+            self.assertIn("without a server", client.run(f"export {target}"))
+            self.assertIn("without a server", client.run(f"import {target}"))
+        self.assertFalse(os.path.exists(target))
+
+    def test_bad_requests_get_an_error(self):
+        import socket
+        with socket.socket(socket.AF_UNIX) as connection:
+            connection.connect(self.address)
+            connection.sendall(b"not json\n")
+            self.assertIn(b'"ok": false', connection.makefile("rb").readline())
+
+    def test_reads_see_what_other_sessions_saved(self):
+        from src.cli.client import Client
+        from src.models.record import Record
+        from src.utils.data_handler import PickleStore
+        other = PickleStore(os.path.join(self.tmp.name, "data.pkl"))
+        address_book, _ = other.open()
+        with other.transaction():
+            address_book.add_record(Record("Jane"))
+            address_book.find("Jane").add_phone("0987654321")
+        other.journal.close()
+        with Client(self.address) as client:
+            self.assertIn("0987654321", client.run("phone --name Jane"))
+
+    def test_stops_when_idle(self):
+        import asyncio
+        from src.cli.server import stop_when_idle
+        stop = asyncio.Event()
+        self.server.last_active -= 10
+        asyncio.run(asyncio.wait_for(stop_when_idle(self.server, 5, stop), 1))
+        self.assertTrue(stop.is_set())
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        self.runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+        os.chdir(self.tmp.name)
+        os.environ["XDG_RUNTIME_DIR"] = self.tmp.name
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        if self.runtime_dir is None:
+            del os.environ["XDG_RUNTIME_DIR"]
+        else:
+            os.environ["XDG_RUNTIME_DIR"] = self.runtime_dir
+        self.tmp.cleanup()
+
+    @unittest.skipUnless(os.name == "posix", "the daemon listens on a Unix socket")
+    def test_commands_run_on_one_daemon_until_it_is_idle(self):
+        import io
+        import time
+        from contextlib import redirect_stdout
+        from src.cli.daemon import daemon_address, main_command
+        from src.cli.options import get_options
+        from src.utils.data_handler import load_data
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(main_command(get_options(["--idle-timeout", "1", "add", "John", "0123456789"])), 0)
+            self.assertEqual(main_command(get_options(["phone", "--name", "John"])), 0)
+        self.assertIn("0123456789", output.getvalue())
+        address = daemon_address(get_options(["phone"]))
+        self.assertEqual(os.stat(os.path.dirname(address)).st_mode & 0o777, 0o700)
+        deadline = time.monotonic() + 30
+        while not os.path.exists("data.pkl.contacts") and time.monotonic() < deadline:
+            time.sleep(0.1)  # the daemon saves the books as it stops
+        self.assertFalse(os.path.exists(address))
+        address_book, _ = load_data("data.pkl")
+        self.assertIsNotNone(address_book.find("John"))
+        umask = os.umask(0)
+        os.umask(umask)
+        self.assertEqual(os.stat("data.pkl.contacts").st_mode & 0o777, 0o666 & ~umask)  # shared like any other
+
+    @unittest.skipUnless(os.name == "posix", "the daemon listens on a Unix socket")
+    def test_a_directory_others_can_use_is_refused(self):
+        from src.cli.client import runtime_dir
+        os.mkdir(os.path.join(self.tmp.name, f"contact_bot-{os.getuid()}"), 0o777)
+        os.chmod(os.path.join(self.tmp.name, f"contact_bot-{os.getuid()}"), 0o777)
+        with self.assertRaises(PermissionError):
+            runtime_dir()
+
+
+class TestReadWriteLock(unittest.TestCase):
+    def test_writer_waits_for_readers_and_keeps_them_out(self):
+        from src.utils.rwlock import ReadWriteLock
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_read()
+        lock.acquire_read()  # readers share the lock
+
+        def write():
+            with lock.writer:
+                with lock.writer:  # taken again by the same thread
+                    events.append("write")
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        writer.join(0.1)
+        self.assertEqual(events, [])
+        lock.release_read()
+        lock.release_read()
+        writer.join()
+        self.assertEqual(events, ["write"])
+        with lock.reader:
+            events.append("read")
+        self.assertEqual(events, ["write", "read"])
+
+
+if __name__ == "__main__":
+    unittest.main()
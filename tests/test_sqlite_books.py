@@ -0,0 +1,133 @@
+# Tests for the SQLite storage backend
+import os
+import pickle
+import tempfile
+import unittest
+from datetime import date, timedelta
+
+
+class TestSQLiteBooks(unittest.TestCase):
+    def setUp(self):
+        from src.models.sqlite_books import SQLiteAddressBook, SQLiteNoteBook, connect
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "data.db")
+        self.connection = connect(self.db)
+        self.address_book = SQLiteAddressBook(self.connection)
+        self.note_book = SQLiteNoteBook(self.connection)
+
+    def tearDown(self):
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def reopen(self):
+        from src.models.sqlite_books import SQLiteAddressBook, SQLiteNoteBook, connect
+        self.connection.commit()
+        self.connection.close()
+        self.connection = connect(self.db)
+        self.address_book = SQLiteAddressBook(self.connection)
+        self.note_book = SQLiteNoteBook(self.connection)
+
+    def test_record_changes_are_written_through(self):
+        from src.models.record import Record
+        self.address_book.add_record(Record("John Smith"))
+        record = self.address_book.find("John Smith")
+        record.add_phone("0123456789")
+        record.add_email("john@example.com")
+        self.address_book.add_record(Record("Jane Doe"))
+        self.address_book.delete("Jane Doe")
+        self.reopen()
+
+        record = self.address_book.find("John Smith")
+        self.assertEqual([phone.value for phone in record.phones], ["0123456789"])
+        self.assertEqual(str(record.email), "john@example.com")
+        self.assertNotIn("Jane Doe", self.address_book)
+        self.assertEqual(len(self.address_book), 1)
+        self.assertEqual([r.name.value for r in self.address_book.find_by_phone("0123456789")], ["John Smith"])
+
+    def test_unrecognized_address_leaves_the_record_unchanged(self):
+        from unittest.mock import patch
+        from src.models import address as address_model
+        from src.models.record import Record
+        self.address_book.add_record(Record("John Smith"))
+        record = self.address_book.find("John Smith")
+        with patch.object(address_model, "LAZY_PARSING", True), self.assertRaises(ValueError):
+            record.add_address("nowhere at all")
+        self.assertIsNone(record.address)
+
+    def test_find_all_and_upcoming_birthdays(self):
+        from src.models.record import Record
+        soon = (date.today() + timedelta(days=3)).replace(year=1990)
+        self.address_book.add_record(Record("Bob Jones", birthday=soon.strftime("%d.%m.%Y")))
+        self.address_book.add_record(Record("Alice Jones"))
+        self.address_book.add_record(Record("Carol"))
+
+        self.assertEqual([r.name.value for r in self.address_book.find_all("jones")], ["Alice Jones", "Bob Jones"])
+        upcoming = self.address_book.get_upcoming_birthdays(7)
+        self.assertEqual([name for name, _ in upcoming], ["Bob Jones"])
+        self.assertEqual(self.address_book.complete_name("a"), ["Alice Jones"])
+        self.assertEqual([r.name.value for _, r in self.address_book.find_similar("Jnoes")], ["Alice Jones", "Bob Jones"])
+        self.assertEqual([(d, r.name.value) for d, r in self.address_book.find_similar("carl")], [(1, "Carol")])
+        self.address_book.delete("Carol")
+        self.assertEqual(self.address_book.find_similar("carl"), [])
+
+    def test_notes(self):
+        from src.models.note import Note
+        self.note_book.add_record(Note(self.note_book.generate_id(), "Shopping", "milk and bread"))
+        self.note_book.add_record(Note(self.note_book.generate_id(), "Work", "call Bob", ["urgent"]))
+        self.note_book.add_tag(1, "home")
+        self.reopen()
+
+        self.assertEqual(self.note_book.generate_id(), 3)
+        self.assertEqual(self.note_book.get_by_id(1).tags, ["home"])
+        self.assertEqual(len(self.note_book.search("BREAD")), 1)
+        self.assertEqual(len(self.note_book.search("urgent")), 1)
+        self.assertEqual([note.id for note in self.note_book.find_by_tag("home")], [1])
+        self.assertEqual(self.note_book.complete_id(""), [1, 2])
+        self.assertEqual(self.note_book.complete_tag("h"), ["home"])
+        self.note_book.add_tag(2, "Weekly")
+        self.note_book.add_tag(1, "work")
+        self.assertEqual(self.note_book.complete_tag("w"), ["Weekly", "work"])
+
+    def test_tags_of_older_databases_are_lowercased(self):
+        import sqlite3
+        from src.models.sqlite_books import SQLiteNoteBook, connect
+        self.connection.close()
+        db = os.path.join(self.tmp.name, "old.db")
+        with sqlite3.connect(db) as connection:
+            connection.executescript(
+                "CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT NOT NULL, text TEXT NOT NULL,"
+                " tags TEXT NOT NULL, search_text TEXT NOT NULL);"
+                "CREATE TABLE note_tags (tag TEXT NOT NULL, note_id INTEGER NOT NULL);"
+                "INSERT INTO notes VALUES (1, 'Plan', 'text', '[\"Été\"]', '');"
+                "INSERT INTO note_tags VALUES ('Été', 1);"
+            )
+        connection.close()
+        self.connection = connect(db)
+        self.assertEqual(SQLiteNoteBook(self.connection).complete_tag("é"), ["Été"])
+
+    def test_migration_from_legacy_pickle(self):
+        from src.models.address_book import AddressBook
+        from src.models.note import Note
+        from src.models.note_book import NoteBook
+        from src.models.record import Record
+        from src.utils.sqlite_store import migrate_to_sqlite
+        address_book, note_book = AddressBook(), NoteBook()
+        address_book.add_record(Record("John", birthday="01.02.1990"))
+        note_book.add_record(Note(1, "title", "text"))
+        # Old data files expect Birthday in src.models.fields
+        data = pickle.dumps((address_book, note_book), protocol=0)
+        data = data.replace(b"src.models.birthday\n", b"src.models.fields\n")
+        pickle_filename = os.path.join(self.tmp.name, "data.pkl")
+        with open(pickle_filename, "wb") as f:
+            f.write(data)
+
+        db = os.path.join(self.tmp.name, "migrated.db")
+        self.assertEqual(migrate_to_sqlite(pickle_filename, db), (1, 1))
+        self.db = db
+        self.reopen()
+        self.assertEqual(self.address_book.find("John").birthday.value, date(1990, 2, 1))
+        self.assertEqual(self.note_book.get_by_id(1).title, "title")
+
+
+if __name__ == '__main__':
+    unittest.main()